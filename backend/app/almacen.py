@@ -0,0 +1,241 @@
+"""Almacén persistente de facturas pregeneradas en SQLite.
+
+Cada factura se guarda ya serializada (JSON con las claves ordenadas) junto
+con su ETag en una tabla indexada por `numero_factura`, así que una consulta
+es una búsqueda por clave primaria más una deserialización. Los campos por los
+que se filtra el listado (fecha, total, cliente y NIT) se guardan además en
+columnas propias para construir los índices sin deserializar nada. Cada hilo
+abre su propia conexión de solo lectura con el archivo mapeado en memoria
+(`PRAGMA mmap_size`). Delante del almacén sigue la caché LRU del backend y,
+para los números que no están, la generación al vuelo.
+
+Las facturas guardadas son idénticas a las que se generan al vuelo para los
+números que faltan (mismas fechas y mismos ETag), siempre que el almacén se
+haya llenado con la misma `GENERADOR_FECHA_REFERENCIA` y las mismas semillas.
+
+El almacén se llena con la línea de comandos, repartiendo la generación y la
+serialización entre procesos:
+
+    python almacen.py --ruta facturas.db --cantidad 1000000 --procesos 4
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+
+import orjson
+
+import exportar
+
+ALMACEN_FACTURAS = os.getenv("ALMACEN_FACTURAS", "")
+ALMACEN_MMAP_BYTES = int(os.getenv("ALMACEN_MMAP_BYTES", str(256 * 1024 * 1024)))
+ALMACEN_TAMANO_BLOQUE = int(os.getenv("ALMACEN_TAMANO_BLOQUE", "5000"))
+# Parámetros por consulta IN (...), por debajo del límite de SQLite
+MAX_PARAMETROS = 500
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS facturas (
+    numero_factura TEXT PRIMARY KEY,
+    datos BLOB NOT NULL,
+    etag TEXT NOT NULL,
+    fecha_emision TEXT NOT NULL,
+    total REAL NOT NULL,
+    cliente_nombre TEXT NOT NULL,
+    cliente_documento INTEGER NOT NULL,
+    empresa_nit INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+INSERTAR = "INSERT OR REPLACE INTO facturas VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+# Columnas de los índices del listado, en el orden de IndiceFacturas.agregar
+COLUMNAS_INDICE = (
+    "numero_factura",
+    "fecha_emision",
+    "total",
+    "cliente_nombre",
+    "cliente_documento",
+    "empresa_nit",
+)
+
+
+def serializar(factura):
+    """
+    Devuelve (bytes, etag): JSON con las claves ordenadas, de modo que la
+    misma factura produce siempre los mismos bytes, y su hash
+    """
+    datos = orjson.dumps(factura, option=orjson.OPT_SORT_KEYS)
+    return datos, '"' + hashlib.blake2b(datos, digest_size=16).hexdigest() + '"'
+
+
+def fila(factura):
+    """
+    Fila de la tabla para la factura
+    """
+    return (
+        factura["numero_factura"],
+        *serializar(factura),
+        factura["fecha_emision"],
+        factura["total"],
+        factura["cliente"]["nombre"],
+        factura["cliente"]["documento"],
+        factura["empresa"]["nit"],
+    )
+
+
+class AlmacenFacturas:
+    """
+    Lectura concurrente del almacén: una conexión de solo lectura por hilo
+    """
+
+    def __init__(self, ruta, mmap_bytes=ALMACEN_MMAP_BYTES):
+        if not os.path.isfile(ruta):
+            raise FileNotFoundError(f"No existe el almacén de facturas {ruta}")
+        self.ruta = ruta
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.buscadas = 0
+        self.encontradas = 0
+        self.segundos = 0.0
+        self.facturas = (
+            self._conexion().execute("SELECT count(*) FROM facturas").fetchone()[0]
+        )
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            ruta = urllib.parse.quote(os.path.abspath(self.ruta))
+            conexion = sqlite3.connect(f"file:{ruta}?mode=ro", uri=True)
+            conexion.execute(f"PRAGMA mmap_size = {int(self.mmap_bytes)}")
+            self._local.conexion = conexion
+        return conexion
+
+    def obtener(self, numero_factura):
+        """
+        (factura, etag) guardados, o None si el número no está
+        """
+        return self.obtener_varios([numero_factura]).get(numero_factura)
+
+    def obtener_varios(self, numeros):
+        """
+        Devuelve {numero: (factura, etag)} con los números que están guardados
+        """
+        inicio = time.perf_counter()
+        unicos = list(dict.fromkeys(numeros))
+        conexion = self._conexion()
+        encontradas = {}
+        for i in range(0, len(unicos), MAX_PARAMETROS):
+            tramo = unicos[i : i + MAX_PARAMETROS]
+            consulta = (
+                "SELECT numero_factura, datos, etag FROM facturas "
+                f"WHERE numero_factura IN ({','.join('?' * len(tramo))})"
+            )
+            for numero, datos, etag in conexion.execute(consulta, tramo):
+                encontradas[numero] = (orjson.loads(datos), etag)
+        segundos = time.perf_counter() - inicio
+        with self._lock:
+            self.consultas += 1
+            self.buscadas += len(unicos)
+            self.encontradas += len(encontradas)
+            self.segundos += segundos
+        return encontradas
+
+    def filas_indice(self):
+        """
+        Recorre las columnas de COLUMNAS_INDICE de todas las facturas
+        """
+        cursor = self._conexion().execute(
+            f"SELECT {', '.join(COLUMNAS_INDICE)} FROM facturas"
+        )
+        while filas := cursor.fetchmany(10000):
+            yield from filas
+
+    def estadisticas(self):
+        with self._lock:
+            consultas, buscadas = self.consultas, self.buscadas
+            encontradas, segundos = self.encontradas, self.segundos
+        return {
+            "ruta": self.ruta,
+            "facturas": self.facturas,
+            "consultas": consultas,
+            "buscadas": buscadas,
+            "encontradas": encontradas,
+            "tasa_aciertos": encontradas / buscadas if buscadas else 0.0,
+            "latencia_media_ms": 1000 * segundos / consultas if consultas else 0.0,
+        }
+
+
+def filas_bloque(inicio, fin):
+    """
+    Genera y serializa las facturas inicio..fin-1 como filas de la tabla,
+    ordenadas por clave para insertarlas en el índice con menos saltos
+    """
+    facturas = exportar.obtener_generador().generar_lote(range(inicio, fin))
+    return sorted(fila(f) for f in facturas)
+
+
+def cargar(
+    ruta,
+    cantidad,
+    inicio=1,
+    procesos=1,
+    tamano_bloque=ALMACEN_TAMANO_BLOQUE,
+):
+    """
+    Genera las facturas inicio..inicio+cantidad-1 y las guarda en una sola
+    transacción, sustituyendo las que ya estuvieran; devuelve
+    (facturas, segundos)
+    """
+    comienzo = time.perf_counter()
+    fin = inicio + cantidad
+    tareas = (
+        (desde, min(desde + tamano_bloque, fin))
+        for desde in range(inicio, fin, tamano_bloque)
+    )
+    if procesos > 1:
+        bloques = exportar.en_orden(filas_bloque, tareas, procesos)
+    else:
+        bloques = (filas_bloque(desde, hasta) for desde, hasta in tareas)
+
+    conexion = sqlite3.connect(ruta)
+    total = 0
+    try:
+        # El almacén se puede reconstruir: no hace falta esperar al disco
+        conexion.execute("PRAGMA synchronous = OFF")
+        conexion.execute(ESQUEMA)
+        with conexion:
+            for filas in bloques:
+                conexion.executemany(INSERTAR, filas)
+                total += len(filas)
+    finally:
+        conexion.close()
+    return total, time.perf_counter() - comienzo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ruta", default=ALMACEN_FACTURAS or "facturas.db")
+    parser.add_argument("--cantidad", type=int, required=True)
+    parser.add_argument("--inicio", type=int, default=1)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tamano-bloque", type=int, default=ALMACEN_TAMANO_BLOQUE)
+    args = parser.parse_args(argv)
+
+    facturas, segundos = cargar(
+        args.ruta, args.cantidad, args.inicio, args.procesos, args.tamano_bloque
+    )
+    por_segundo = facturas / segundos if segundos else 0.0
+    print(
+        f"{facturas} facturas en {args.ruta} en {segundos:.2f} s "
+        f"({por_segundo:.0f} facturas/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
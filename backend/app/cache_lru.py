@@ -0,0 +1,69 @@
+"""Caché LRU en memoria acotada por número de entradas y con caducidad (TTL)."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """
+    Caché LRU segura entre hilos.
+
+    Las entradas caducan `ttl` segundos después de guardarse (0 desactiva la
+    caducidad) y, al superar `capacidad`, se descarta la menos usada.
+    """
+
+    def __init__(self, capacidad, ttl=0):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Devuelve el valor guardado o None si no existe o ha caducado."""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                valor, expira = entrada
+                if not expira or expira > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.hits += 1
+                    return valor
+                del self._datos[clave]
+            self.misses += 1
+            return None
+
+    def guardar(self, clave, valor):
+        if self.capacidad <= 0:
+            return
+        expira = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._datos[clave] = (valor, expira)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+    def obtener_o_calcular(self, clave, calcular):
+        """Devuelve el valor en caché o lo calcula con `calcular()` y lo guarda."""
+        valor = self.obtener(clave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(clave, valor)
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.hits = self.misses = 0
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "tamano": len(self._datos),
+                "capacidad": self.capacidad,
+                "ttl": self.ttl,
+            }
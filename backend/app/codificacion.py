@@ -0,0 +1,167 @@
+"""Negociación del formato de las respuestas con el frontend.
+
+Según `Accept`, las facturas se envían en JSON (serializado con orjson) o en
+MessagePack; según `Accept-Encoding`, las respuestas de más de
+`COMPRESION_MIN_BYTES` se comprimen con zstd o gzip. Sin cabeceras la
+respuesta es la de siempre: JSON sin comprimir.
+
+En streaming, MessagePack se envía como una secuencia de objetos
+concatenados y la compresión se vacía al final de cada bloque, de modo que
+el cliente puede decodificar cada bloque en cuanto llega.
+"""
+
+import os
+import zlib
+
+import msgpack
+import orjson
+import zstandard
+from fastapi import Response
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+NDJSON = "application/x-ndjson"
+# Alias habituales de MessagePack
+_TIPOS = {JSON: JSON, MSGPACK: MSGPACK, "application/x-msgpack": MSGPACK}
+_COMPRESIONES = ("zstd", "gzip")
+
+COMPRESION_MIN_BYTES = int(os.getenv("COMPRESION_MIN_BYTES", "4096"))
+NIVEL_ZSTD = int(os.getenv("NIVEL_ZSTD", "3"))
+NIVEL_GZIP = int(os.getenv("NIVEL_GZIP", "6"))
+VARY = "Accept, Accept-Encoding"
+
+
+def _preferencias(cabecera):
+    """
+    Lista de (valor, q) de una cabecera Accept o Accept-Encoding
+    """
+    preferencias = []
+    for parte in (cabecera or "").split(","):
+        valor, *parametros = [p.strip() for p in parte.split(";")]
+        if not valor:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            nombre, _, dato = parametro.partition("=")
+            if nombre.strip() == "q":
+                try:
+                    q = float(dato)
+                except ValueError:
+                    q = 0.0
+        preferencias.append((valor.lower(), q))
+    return preferencias
+
+
+def negociar_tipo(accept):
+    """
+    MSGPACK si el cliente lo prefiere explícitamente; JSON en otro caso
+    """
+    mejor, mejor_q = JSON, 0.0
+    for valor, q in _preferencias(accept):
+        tipo = _TIPOS.get(valor)
+        if tipo and q > mejor_q:
+            mejor, mejor_q = tipo, q
+    return mejor
+
+
+def negociar_compresion(accept_encoding):
+    """
+    "zstd" o "gzip" según las preferencias del cliente, o None
+    """
+    preferencias = dict(_preferencias(accept_encoding))
+    candidatas = [c for c in _COMPRESIONES if preferencias.get(c, 0) > 0]
+    if not candidatas:
+        return None
+    return max(candidatas, key=lambda c: preferencias[c])
+
+
+def codificar(datos, tipo):
+    if tipo == MSGPACK:
+        return msgpack.packb(datos)
+    return orjson.dumps(datos)
+
+
+def comprimir(cuerpo, compresion):
+    if compresion == "zstd":
+        return zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(cuerpo)
+    compresor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compresor.compress(cuerpo) + compresor.flush()
+
+
+def variante_etag(etag, tipo, compresion):
+    """
+    ETag propio de cada representación, para que las cachés no las mezclen;
+    `compresion` es la aplicada de verdad al cuerpo, no la aceptada
+    """
+    sufijos = [s for s in ("msgpack" if tipo == MSGPACK else "", compresion) if s]
+    if not sufijos:
+        return etag
+    return etag[:-1] + "-" + "-".join(sufijos) + '"'
+
+
+def representacion(request):
+    """
+    (tipo, compresión) negociados para la petición
+    """
+    return (
+        negociar_tipo(request.headers.get("accept")),
+        negociar_compresion(request.headers.get("accept-encoding")),
+    )
+
+
+def preparar(datos, request):
+    """
+    (tipo, cuerpo sin comprimir, compresión que se le aplicará o None):
+    los cuerpos por debajo de COMPRESION_MIN_BYTES viajan sin comprimir
+    """
+    tipo, compresion = representacion(request)
+    cuerpo = codificar(datos, tipo)
+    if len(cuerpo) < COMPRESION_MIN_BYTES:
+        compresion = None
+    return tipo, cuerpo, compresion
+
+
+def respuesta(tipo, cuerpo, compresion, cabeceras=None, status_code=200):
+    cabeceras = {**(cabeceras or {}), "Vary": VARY}
+    if compresion:
+        cuerpo = comprimir(cuerpo, compresion)
+        cabeceras["Content-Encoding"] = compresion
+    return Response(cuerpo, status_code, cabeceras, media_type=tipo)
+
+
+def responder(datos, request, cabeceras=None, status_code=200):
+    """
+    Codifica `datos` en el formato negociado y comprime si merece la pena
+    """
+    return respuesta(*preparar(datos, request), cabeceras, status_code)
+
+
+def codificar_secuencia(lotes, tipo):
+    """
+    Genera un bloque de bytes por cada lote de objetos: NDJSON o
+    MessagePack concatenado
+    """
+    if tipo == MSGPACK:
+        empaquetador = msgpack.Packer()
+        for lote in lotes:
+            yield b"".join(empaquetador.pack(objeto) for objeto in lote)
+    else:
+        for lote in lotes:
+            yield b"".join(orjson.dumps(objeto) + b"\n" for objeto in lote)
+
+
+def comprimir_secuencia(bloques, compresion):
+    """
+    Comprime al vuelo, vaciando el compresor tras cada bloque
+    """
+    if compresion == "zstd":
+        compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD).compressobj()
+        vaciar = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        for bloque in bloques:
+            yield compresor.compress(bloque) + compresor.flush(vaciar)
+        yield compresor.flush()
+    else:
+        compresor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for bloque in bloques:
+            yield compresor.compress(bloque) + compresor.flush(zlib.Z_SYNC_FLUSH)
+        yield compresor.flush()
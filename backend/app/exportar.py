@@ -0,0 +1,269 @@
+"""Exportación masiva de facturas sintéticas en NDJSON o CSV.
+
+Las facturas se generan por bloques de números consecutivos y cada bloque se
+serializa a bytes en cuanto está listo, así que la memoria es constante sea
+cual sea la cantidad pedida. Con varios procesos, los bloques se reparten en
+un pool con una ventana acotada de bloques en vuelo y se emiten en orden.
+
+También se puede usar como línea de comandos:
+
+    python exportar.py --cantidad 1000000 --formato csv --gzip -o facturas.csv.gz
+"""
+
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from generador import SEMILLA_MAX, Generador
+
+FORMATOS = ("ndjson", "csv")
+MAX_FACTURAS_EXPORT = int(os.getenv("MAX_FACTURAS_EXPORT", "10000000"))
+EXPORT_PROCESOS = int(os.getenv("EXPORT_PROCESOS", "1"))
+EXPORT_TAMANO_BLOQUE = int(os.getenv("EXPORT_TAMANO_BLOQUE", "1000"))
+# forkserver evita hacer fork de un worker de uvicorn con hilos en marcha
+EXPORT_INICIO = os.getenv("EXPORT_INICIO", "forkserver")
+
+# Una fila por línea de detalle con los datos de la factura repetidos
+COLUMNAS_CSV = (
+    "numero_factura",
+    "fecha_emision",
+    "empresa_nombre",
+    "empresa_direccion",
+    "empresa_telefono",
+    "empresa_email",
+    "empresa_nit",
+    "cliente_nombre",
+    "cliente_direccion",
+    "cliente_telefono",
+    "cliente_email",
+    "cliente_documento",
+    "linea",
+    "descripcion",
+    "cantidad",
+    "precio_unitario",
+    "total_linea",
+    "subtotal",
+    "impuesto",
+    "total",
+)
+
+_generador = None
+
+
+class Estadisticas:
+    """
+    Contadores de una exportación; se completan al agotar el generador
+    """
+
+    def __init__(self):
+        self.facturas = 0
+        self.filas = 0
+        self.bytes = 0
+        self.inicio = time.perf_counter()
+        self.segundos = 0.0
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas / self.segundos if self.segundos else 0.0
+
+    def resumen(self):
+        return (
+            f"{self.facturas} facturas, {self.filas} filas, {self.bytes} bytes "
+            f"en {self.segundos:.2f} s ({self.filas_por_segundo:.0f} filas/s)"
+        )
+
+
+def obtener_generador():
+    # Un generador por proceso (compartido con almacen): los pools se
+    # construyen en el primer bloque
+    global _generador
+    if _generador is None:
+        _generador = Generador()
+    return _generador
+
+
+def serializar_ndjson(facturas):
+    texto = "".join(json.dumps(f, ensure_ascii=False) + "\n" for f in facturas)
+    return texto.encode(), len(facturas)
+
+
+def serializar_csv(facturas):
+    salida = io.StringIO()
+    escritor = csv.writer(salida, lineterminator="\n")
+    filas = 0
+    for f in facturas:
+        empresa, cliente = f["empresa"], f["cliente"]
+        cabecera = (
+            f["numero_factura"],
+            f["fecha_emision"],
+            empresa["nombre"],
+            empresa["direccion"],
+            empresa["telefono"],
+            empresa["email"],
+            empresa["nit"],
+            cliente["nombre"],
+            cliente["direccion"],
+            cliente["telefono"],
+            cliente["email"],
+            cliente["documento"],
+        )
+        importes = (f"{f['subtotal']:.2f}", f"{f['impuesto']:.2f}", f"{f['total']:.2f}")
+        for linea, item in enumerate(f["detalle"], start=1):
+            escritor.writerow(
+                cabecera
+                + (
+                    linea,
+                    item["descripcion"],
+                    item["cantidad"],
+                    f"{item['precio_unitario']:.2f}",
+                    f"{item['total']:.2f}",
+                )
+                + importes
+            )
+        filas += len(f["detalle"])
+    return salida.getvalue().encode(), filas
+
+
+SERIALIZADORES = {"ndjson": serializar_ndjson, "csv": serializar_csv}
+
+
+def generar_bloque(inicio, fin, formato, semilla=0, generador=None):
+    """
+    Genera y serializa las facturas inicio..fin-1; devuelve
+    (bytes, facturas, filas)
+    """
+    generador = generador or obtener_generador()
+    facturas = generador.generar_lote(range(inicio, fin), semilla)
+    contenido, filas = SERIALIZADORES[formato](facturas)
+    return contenido, len(facturas), filas
+
+
+def _bloques(cantidad, inicio, tamano_bloque):
+    fin = inicio + cantidad
+    for desde in range(inicio, fin, tamano_bloque):
+        yield desde, min(desde + tamano_bloque, fin)
+
+
+def en_orden(funcion, tareas, procesos):
+    """
+    Ejecuta `funcion(*tarea)` para cada tarea en un pool de procesos y
+    devuelve los resultados en orden, con como mucho dos tareas en vuelo por
+    proceso
+    """
+    contexto = multiprocessing.get_context(EXPORT_INICIO)
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+        en_vuelo = deque()
+        try:
+            for tarea in tareas:
+                en_vuelo.append(pool.submit(funcion, *tarea))
+                if len(en_vuelo) >= 2 * procesos:
+                    yield en_vuelo.popleft().result()
+            while en_vuelo:
+                yield en_vuelo.popleft().result()
+        finally:
+            for futuro in en_vuelo:
+                futuro.cancel()
+
+
+def exportar(
+    cantidad,
+    formato="ndjson",
+    semilla=0,
+    inicio=1,
+    procesos=EXPORT_PROCESOS,
+    tamano_bloque=EXPORT_TAMANO_BLOQUE,
+    generador=None,
+    estadisticas=None,
+):
+    """
+    Genera el contenido de la exportación por bloques de bytes.
+
+    Las facturas llevan los números inicio..inicio+cantidad-1; con la misma
+    `semilla` la salida es idéntica byte a byte, con uno o varios procesos.
+    """
+    if formato not in SERIALIZADORES:
+        raise ValueError(f"Formato no soportado: {formato}")
+    estadisticas = estadisticas or Estadisticas()
+    if formato == "csv":
+        cabecera = (",".join(COLUMNAS_CSV) + "\n").encode()
+        estadisticas.bytes += len(cabecera)
+        yield cabecera
+
+    if procesos > 1:
+        tareas = (
+            (desde, hasta, formato, semilla)
+            for desde, hasta in _bloques(cantidad, inicio, tamano_bloque)
+        )
+        resultados = en_orden(generar_bloque, tareas, procesos)
+    else:
+        resultados = (
+            generar_bloque(desde, hasta, formato, semilla, generador)
+            for desde, hasta in _bloques(cantidad, inicio, tamano_bloque)
+        )
+    for contenido, facturas, filas in resultados:
+        estadisticas.facturas += facturas
+        estadisticas.filas += filas
+        estadisticas.bytes += len(contenido)
+        yield contenido
+    estadisticas.segundos = time.perf_counter() - estadisticas.inicio
+
+
+def comprimir_gzip(bloques, nivel=6):
+    """
+    Comprime al vuelo un generador de bloques de bytes en formato gzip
+    """
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cantidad", type=int, required=True)
+    parser.add_argument("--formato", choices=FORMATOS, default="ndjson")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--inicio", type=int, default=1)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tamano-bloque", type=int, default=EXPORT_TAMANO_BLOQUE)
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("-o", "--salida", help="archivo de salida (stdout por defecto)")
+    args = parser.parse_args(argv)
+    if not 0 <= args.semilla <= SEMILLA_MAX:
+        parser.error(f"--semilla debe estar entre 0 y {SEMILLA_MAX}")
+
+    estadisticas = Estadisticas()
+    bloques = exportar(
+        args.cantidad,
+        args.formato,
+        args.semilla,
+        args.inicio,
+        args.procesos,
+        args.tamano_bloque,
+        estadisticas=estadisticas,
+    )
+    if args.gzip:
+        bloques = comprimir_gzip(bloques)
+
+    salida = open(args.salida, "wb") if args.salida else sys.stdout.buffer
+    try:
+        for bloque in bloques:
+            salida.write(bloque)
+    finally:
+        if args.salida:
+            salida.close()
+    print(estadisticas.resumen(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Motor de generación de facturas sintéticas.
+
+Los valores de Faker (empresas, direcciones, teléfonos, emails y frases) se
+generan una sola vez por proceso, con una semilla fija para que todos los
+procesos y reinicios tengan los mismos pools, y después se eligen por índice.
+Faker (y sus proveedores `es_ES`) solo se carga al crear los pools, en la
+primera generación o en la fase de preparación del servicio, no al importar.
+
+Cada factura depende solo de su número: de él se deriva una semilla y de ella,
+con un mezclador splitmix64 aplicado sobre arrays de numpy, todos los índices
+y cantidades. Así un lote completo de facturas se calcula en unas pocas
+operaciones vectorizadas. Los importes se calculan en céntimos enteros, así
+que el redondeo a dos decimales es exacto; el IVA se redondea igual que antes.
+La fecha de emisión cae en el año anterior a una fecha de referencia fija
+(`GENERADOR_FECHA_REFERENCIA`), no al día actual, para que la factura y su
+ETag no cambien de un día para otro.
+"""
+
+import hashlib
+import os
+import threading
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+TAMANO_POOL = int(os.getenv("GENERADOR_TAMANO_POOL", "2048"))
+SEMILLA_POOLS = int(os.getenv("GENERADOR_SEMILLA_POOLS", "20250101"))
+FECHA_REFERENCIA = date.fromisoformat(
+    os.getenv("GENERADOR_FECHA_REFERENCIA", "2025-12-31")
+)
+TASA_IVA = 0.19
+# semilla_extra va en la sal de blake2b: 16 bytes sin signo
+SEMILLA_MAX = 2**128 - 1
+
+# Campos que se derivan de la semilla de cada factura
+(
+    _EMPRESA_NOMBRE,
+    _EMPRESA_DIRECCION,
+    _EMPRESA_TELEFONO,
+    _EMPRESA_EMAIL,
+    _EMPRESA_NIT,
+    _CLIENTE_NOMBRE,
+    _CLIENTE_DIRECCION,
+    _CLIENTE_TELEFONO,
+    _CLIENTE_EMAIL,
+    _CLIENTE_DOCUMENTO,
+    _NUM_ITEMS,
+    _FECHA,
+) = range(12)
+_NUM_CAMPOS = 12
+# Campos de cada línea de detalle
+_ITEM_CANTIDAD, _ITEM_PRECIO, _ITEM_DESCRIPCION = range(3)
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def semilla(numero_factura: str, semilla_extra: int = 0) -> int:
+    """
+    Semilla estable entre procesos y reinicios derivada del número de factura
+    """
+    digest = hashlib.blake2b(
+        numero_factura.encode(), digest_size=8, salt=semilla_extra.to_bytes(16, "big")
+    ).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _mezclar(x):
+    """Finalizador de splitmix64 sobre un array uint64 (aritmética módulo 2**64)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _derivar(semillas, campos):
+    """Matriz (len(semillas), campos) de enteros pseudoaleatorios uint64."""
+    indices = np.arange(1, campos + 1, dtype=np.uint64) * _GOLDEN
+    return _mezclar(semillas[:, None] + indices[None, :])
+
+
+class Generador:
+    """
+    Genera facturas a partir de pools de valores de Faker precalculados.
+
+    Los pools se crean una sola vez, en la primera generación o al llamar a
+    `preparar`; después no hay estado mutable, así que una instancia se puede
+    compartir entre hilos.
+    """
+
+    def __init__(
+        self,
+        tamano_pool=TAMANO_POOL,
+        semilla_pools=SEMILLA_POOLS,
+        fecha_referencia=FECHA_REFERENCIA,
+    ):
+        self.tamano_pool = tamano_pool
+        self.semilla_pools = semilla_pools
+        self.fecha_referencia = fecha_referencia
+        self._pools = None
+        self._lock = threading.Lock()
+
+    def preparar(self):
+        """
+        Crea los pools si aún no existen y los devuelve
+        """
+        if self._pools is None:
+            with self._lock:
+                if self._pools is None:
+                    self._pools = self._crear_pools()
+        return self._pools
+
+    def _crear_pools(self):
+        from faker import Faker
+
+        fake = Faker("es_ES")
+        fake.seed_instance(self.semilla_pools)
+        n = self.tamano_pool
+        return SimpleNamespace(
+            empresas=[fake.company() for _ in range(n)],
+            direcciones=[fake.address() for _ in range(n)],
+            telefonos=[fake.phone_number() for _ in range(n)],
+            emails=[fake.company_email() for _ in range(n)],
+            frases=[fake.catch_phrase() for _ in range(n)],
+        )
+
+    def generar(self, numero_factura: str, semilla_extra: int = 0):
+        return self.generar_lote([numero_factura], semilla_extra)[0]
+
+    def generar_lote(self, numeros, semilla_extra: int = 0):
+        """
+        Genera las facturas de una lista de números de forma vectorizada.
+
+        Con `semilla_extra` distinta se obtiene otro conjunto igual de
+        reproducible para los mismos números.
+        """
+        numeros = [str(numero) for numero in numeros]
+        if not numeros:
+            return []
+        pools = self.preparar()
+        semillas = np.array(
+            [semilla(numero, semilla_extra) for numero in numeros], dtype=np.uint64
+        )
+        campos = _derivar(semillas, _NUM_CAMPOS)
+        pool = np.uint64(self.tamano_pool)
+        indices = (campos % pool).astype(np.int64).tolist()
+        nits = (campos[:, _EMPRESA_NIT] % np.uint64(900000) + 100000).tolist()
+        documentos = (
+            campos[:, _CLIENTE_DOCUMENTO] % np.uint64(900000) + 100000
+        ).tolist()
+        dias = (campos[:, _FECHA] % np.uint64(366)).astype(np.int64).tolist()
+
+        # Entre 1 y 5 ítems por factura; todas las líneas del lote a la vez
+        num_items = (campos[:, _NUM_ITEMS] % np.uint64(5) + 1).astype(np.int64)
+        inicios = np.concatenate(([0], np.cumsum(num_items)[:-1]))
+        posicion = np.arange(num_items.sum()) - np.repeat(inicios, num_items)
+        semillas_items = _mezclar(
+            np.repeat(semillas, num_items) ^ (posicion.astype(np.uint64) + np.uint64(1))
+        )
+        items = _derivar(semillas_items, 3)
+        cantidades = (items[:, _ITEM_CANTIDAD] % np.uint64(10) + 1).astype(np.int64)
+        # Precio unitario entre 50.00 y 500.00, en céntimos
+        precios = (items[:, _ITEM_PRECIO] % np.uint64(45001) + 5000).astype(np.int64)
+        descripciones = (items[:, _ITEM_DESCRIPCION] % pool).astype(np.int64).tolist()
+        totales = cantidades * precios
+        subtotales = np.add.reduceat(totales, inicios).tolist()
+        cantidades, precios, totales = (
+            cantidades.tolist(),
+            precios.tolist(),
+            totales.tolist(),
+        )
+
+        referencia = self.fecha_referencia
+        facturas = []
+        linea = 0
+        for i, numero in enumerate(numeros):
+            idx = indices[i]
+            detalle = []
+            for j in range(linea, linea + int(num_items[i])):
+                detalle.append(
+                    {
+                        "descripcion": pools.frases[descripciones[j]],
+                        "cantidad": cantidades[j],
+                        "precio_unitario": precios[j] / 100,
+                        "total": totales[j] / 100,
+                    }
+                )
+            linea += len(detalle)
+
+            subtotal = subtotales[i] / 100
+            impuesto = round(subtotal * TASA_IVA, 2)
+            facturas.append(
+                {
+                    "numero_factura": numero,
+                    "fecha_emision": str(referencia - timedelta(days=dias[i])),
+                    "empresa": {
+                        "nombre": pools.empresas[idx[_EMPRESA_NOMBRE]],
+                        "direccion": pools.direcciones[idx[_EMPRESA_DIRECCION]],
+                        "telefono": pools.telefonos[idx[_EMPRESA_TELEFONO]],
+                        "email": pools.emails[idx[_EMPRESA_EMAIL]],
+                        "nit": nits[i],
+                    },
+                    "cliente": {
+                        "nombre": pools.empresas[idx[_CLIENTE_NOMBRE]],
+                        "direccion": pools.direcciones[idx[_CLIENTE_DIRECCION]],
+                        "telefono": pools.telefonos[idx[_CLIENTE_TELEFONO]],
+                        "email": pools.emails[idx[_CLIENTE_EMAIL]],
+                        "documento": documentos[i],
+                    },
+                    "detalle": detalle,
+                    "subtotal": subtotal,
+                    "impuesto": impuesto,
+                    "total": round(subtotal + impuesto, 2),
+                }
+            )
+        return facturas
@@ -0,0 +1,38 @@
+"""Configuración de gunicorn para el modo multiproceso del backend.
+
+Generar facturas ocupa la CPU y las rutas síncronas de FastAPI se ejecutan en
+un pool de hilos que comparte el GIL, así que un solo proceso no pasa de un
+núcleo. Aquí se arrancan `API_WORKERS` procesos de uvicorn (uno por núcleo
+por defecto). Cada worker importa `main` por su cuenta y tiene su propio
+Generador, caché de facturas, conexiones al almacén e índices del listado;
+como cada factura se genera a partir de su número, todos los workers
+devuelven la misma factura (y el mismo ETag) para el mismo número.
+
+Las métricas de Prometheus se comparten entre workers a través de
+`PROMETHEUS_MULTIPROC_DIR`, que se vacía al arrancar el master.
+"""
+
+import os
+import shutil
+
+bind = os.getenv("API_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("API_WORKERS", "0")) or os.cpu_count() or 1
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = int(os.getenv("API_TIMEOUT", "120"))
+keepalive = int(os.getenv("API_KEEPALIVE", "5"))
+accesslog = os.getenv("API_ACCESSLOG", "-") or None
+
+# Debe estar definido antes de que los workers importen prometheus_client
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/metricas_backend")
+
+
+def on_starting(server):
+    directorio = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,366 @@
+"""Índices en memoria para el listado de las facturas del almacén.
+
+Cada factura recibe un id interno (su posición de carga) y sus campos de
+búsqueda se guardan en arrays compactos indexados por ese id:
+
+- la fecha de emisión (ordinal) y el total (en céntimos) tienen además un
+  índice ordenado: arrays paralelos de claves e ids ordenados por (clave, id)
+  que se consultan con bisect;
+- el cliente (nombre sin distinguir mayúsculas), el documento y el NIT tienen
+  un diccionario de cada valor a su id, o a la lista de ids si se repite.
+
+Cada consulta elige qué recorrer: la lista más corta de un filtro exacto, el
+tramo de un índice ordenado o el propio orden pedido, según lo que cueste
+menos, y comprueba el resto de filtros factura a factura. La paginación es por
+cursor (clave e id de la última factura devuelta), así que una página
+cualquiera cuesta lo mismo que la primera.
+
+Añadir facturas actualiza los índices sobre la marcha: pocas se insertan una a
+una con bisect; muchas de golpe se ordenan junto con las existentes.
+"""
+
+import base64
+import binascii
+import heapq
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from itertools import chain, islice
+
+import orjson
+
+ORDENES = ("fecha", "-fecha", "total", "-total")
+
+
+def _anadir(mapa, clave, id_):
+    actual = mapa.get(clave)
+    if actual is None:
+        mapa[clave] = id_
+    elif isinstance(actual, int):
+        mapa[clave] = sorted((actual, id_))
+    else:
+        insort(actual, id_)
+
+
+def _quitar(mapa, clave, id_):
+    actual = mapa[clave]
+    if isinstance(actual, int):
+        del mapa[clave]
+    else:
+        actual.remove(id_)
+        if len(actual) == 1:
+            mapa[clave] = actual[0]
+
+
+def _ids(mapa, clave):
+    actual = mapa.get(clave, ())
+    return (actual,) if isinstance(actual, int) else actual
+
+
+def _centimos(importe, redondeo):
+    return None if importe is None else redondeo(round(importe * 100, 6))
+
+
+def escribir_cursor(orden, clave, id_):
+    return base64.urlsafe_b64encode(orjson.dumps([orden, clave, id_])).decode()
+
+
+def leer_cursor(cursor, orden):
+    """
+    (clave, id) de la última factura de la página anterior
+    """
+    try:
+        orden_cursor, clave, id_ = orjson.loads(base64.urlsafe_b64decode(cursor))
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Cursor no válido") from None
+    if orden_cursor != orden or not all(type(v) is int for v in (clave, id_)):
+        raise ValueError("Cursor no válido para este orden")
+    return clave, id_
+
+
+class _IndiceOrdenado:
+    """
+    Ids ordenados por (valores[id], id), con sus claves en un array paralelo
+    """
+
+    def __init__(self, valores):
+        self.valores = valores
+        self.claves = array(valores.typecode)
+        self.ids = array("i")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posicion(self, clave, id_):
+        """
+        Posición de (clave, id), o la que le tocaría si no está
+        """
+        inicio = bisect_left(self.claves, clave)
+        fin = bisect_right(self.claves, clave, inicio)
+        return bisect_left(self.ids, id_, inicio, fin)
+
+    def insertar(self, ids):
+        if len(ids) * 64 > len(self.ids):
+            # Ordenar por id y después, de forma estable, por clave
+            ordenados = sorted(chain(self.ids, ids))
+            ordenados.sort(key=self.valores.__getitem__)
+            self.ids = array("i", ordenados)
+            self.claves = array(
+                self.claves.typecode, map(self.valores.__getitem__, ordenados)
+            )
+            return
+        for id_ in ids:
+            clave = self.valores[id_]
+            posicion = self.posicion(clave, id_)
+            self.claves.insert(posicion, clave)
+            self.ids.insert(posicion, id_)
+
+    def quitar(self, id_):
+        posicion = self.posicion(self.valores[id_], id_)
+        del self.claves[posicion]
+        del self.ids[posicion]
+
+    def tramo(self, minimo, maximo):
+        """
+        (inicio, fin) de las posiciones con minimo <= clave <= maximo
+        """
+        inicio = 0 if minimo is None else bisect_left(self.claves, minimo)
+        fin = len(self.ids) if maximo is None else bisect_right(self.claves, maximo)
+        return inicio, max(inicio, fin)
+
+    def recorrer(self, inicio, fin, despues=None, descendente=False):
+        """
+        Ids de las posiciones inicio..fin-1 en orden, empezando tras el
+        cursor (clave, id)
+        """
+        if descendente:
+            if despues is not None:
+                fin = min(fin, self.posicion(*despues))
+            return (self.ids[i] for i in range(fin - 1, inicio - 1, -1))
+        if despues is not None:
+            clave, id_ = despues
+            inicio = max(inicio, self.posicion(clave, id_ + 1))
+        return (self.ids[i] for i in range(inicio, fin))
+
+
+class IndiceFacturas:
+    """
+    Índices secundarios de un conjunto de facturas; seguro entre hilos
+    """
+
+    def __init__(self):
+        self.numeros = []
+        self._ids = {}
+        self.fechas = array("i")
+        self.totales = array("q")
+        self.clientes = array("i")
+        self.documentos = array("q")
+        self.nits = array("q")
+        self._codigos_cliente = {}
+        self._ordinales = {}
+        self.por_fecha = _IndiceOrdenado(self.fechas)
+        self.por_total = _IndiceOrdenado(self.totales)
+        self.por_cliente = {}
+        self.por_documento = {}
+        self.por_nit = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.numeros)
+
+    def agregar(self, filas):
+        """
+        Añade o sustituye facturas dadas como filas (numero_factura,
+        fecha_emision, total, cliente, documento, nit); devuelve cuántas
+        """
+        with self._lock:
+            nuevos = []
+            pendientes = set()
+            for numero, fecha, total, cliente, documento, nit in filas:
+                id_ = self._ids.get(numero)
+                if id_ is None:
+                    id_ = self._ids[numero] = len(self.numeros)
+                    self.numeros.append(numero)
+                    for valores in self._columnas():
+                        valores.append(0)
+                else:
+                    self._quitar(id_, ordenados=id_ not in pendientes)
+                self._guardar(id_, fecha, total, cliente, documento, nit)
+                if id_ not in pendientes:
+                    pendientes.add(id_)
+                    nuevos.append(id_)
+            self.por_fecha.insertar(nuevos)
+            self.por_total.insertar(nuevos)
+            return len(nuevos)
+
+    def _columnas(self):
+        return self.fechas, self.totales, self.clientes, self.documentos, self.nits
+
+    def _guardar(self, id_, fecha, total, cliente, documento, nit):
+        ordinal = self._ordinales.get(fecha)
+        if ordinal is None:
+            ordinal = self._ordinales[fecha] = date.fromisoformat(fecha).toordinal()
+        nombre = cliente.casefold()
+        codigo = self._codigos_cliente.setdefault(nombre, len(self._codigos_cliente))
+        self.fechas[id_] = ordinal
+        self.totales[id_] = round(total * 100)
+        self.clientes[id_] = codigo
+        self.documentos[id_] = documento
+        self.nits[id_] = nit
+        _anadir(self.por_cliente, codigo, id_)
+        _anadir(self.por_documento, documento, id_)
+        _anadir(self.por_nit, nit, id_)
+
+    def _quitar(self, id_, ordenados=True):
+        if ordenados:
+            self.por_fecha.quitar(id_)
+            self.por_total.quitar(id_)
+        _quitar(self.por_cliente, self.clientes[id_], id_)
+        _quitar(self.por_documento, self.documentos[id_], id_)
+        _quitar(self.por_nit, self.nits[id_], id_)
+
+    def buscar(
+        self,
+        fecha_desde=None,
+        fecha_hasta=None,
+        total_min=None,
+        total_max=None,
+        cliente=None,
+        documento=None,
+        nit=None,
+        orden=None,
+        limite=50,
+        cursor=None,
+    ):
+        """
+        Devuelve (numeros, cursor) de la página pedida: los números de factura
+        que cumplen todos los filtros, en el orden indicado (el de carga por
+        defecto), y el cursor de la página siguiente o None si es la última
+        """
+        if orden is not None and orden not in ORDENES:
+            raise ValueError(f"orden debe ser uno de {ORDENES}")
+        for nombre, importe in (("total_min", total_min), ("total_max", total_max)):
+            if importe is not None and not math.isfinite(importe):
+                raise ValueError(f"{nombre} debe ser un número finito")
+        despues = leer_cursor(cursor, orden) if cursor else None
+        # Comprobaciones (valores, mínimo, máximo) de cada filtro
+        rangos = {
+            "fecha": (
+                fecha_desde.toordinal() if fecha_desde else None,
+                fecha_hasta.toordinal() if fecha_hasta else None,
+            ),
+            "total": (
+                _centimos(total_min, math.ceil),
+                _centimos(total_max, math.floor),
+            ),
+        }
+        with self._lock:
+            exactos = []
+            comprobaciones = []
+            if cliente is not None:
+                codigo = self._codigos_cliente.get(cliente.casefold(), -1)
+                exactos.append(_ids(self.por_cliente, codigo))
+                comprobaciones.append((self.clientes, codigo, codigo))
+            for mapa, valores, valor in (
+                (self.por_documento, self.documentos, documento),
+                (self.por_nit, self.nits, nit),
+            ):
+                if valor is not None:
+                    exactos.append(_ids(mapa, valor))
+                    comprobaciones.append((valores, valor, valor))
+            tramos = {}
+            for campo, indice in (("fecha", self.por_fecha), ("total", self.por_total)):
+                minimo, maximo = rangos[campo]
+                if minimo is not None or maximo is not None:
+                    tramos[campo] = indice.tramo(minimo, maximo)
+                    comprobaciones.append(
+                        (
+                            indice.valores,
+                            -math.inf if minimo is None else minimo,
+                            math.inf if maximo is None else maximo,
+                        )
+                    )
+
+            def cumple(id_):
+                return all(
+                    minimo <= valores[id_] <= maximo
+                    for valores, minimo, maximo in comprobaciones
+                )
+
+            campo = orden.lstrip("-") if orden else None
+            descendente = bool(orden) and orden.startswith("-")
+            indice_orden = {"fecha": self.por_fecha, "total": self.por_total}.get(campo)
+            pagina = self._pagina(
+                indice_orden,
+                tramos.pop(campo, None),
+                exactos,
+                tramos,
+                cumple,
+                despues,
+                descendente,
+                limite,
+            )
+            if len(pagina) > limite:
+                ultimo = pagina[limite - 1]
+                clave = indice_orden.valores[ultimo] if indice_orden else ultimo
+                siguiente = escribir_cursor(orden, clave, ultimo)
+            else:
+                siguiente = None
+            return [self.numeros[id_] for id_ in pagina[:limite]], siguiente
+
+    def _pagina(
+        self, indice_orden, tramo, exactos, tramos, cumple, despues, descendente, limite
+    ):
+        """
+        Ids de hasta limite+1 facturas que cumplen los filtros, en orden
+        """
+        total = len(self.numeros)
+        if indice_orden is not None:
+            tramo = tramo or (0, len(indice_orden))
+        else:
+            tramo = (0, total)
+
+        # Candidatos más selectivos entre los filtros que no dan el orden
+        candidatos = min(exactos, key=len, default=None)
+        for campo, (inicio, fin) in tramos.items():
+            if candidatos is None or fin - inicio < len(candidatos):
+                indice = self.por_fecha if campo == "fecha" else self.por_total
+                candidatos = indice.ids[inicio:fin]
+
+        # Recorrer el orden pedido cuesta, en promedio, la página dividida
+        # entre la fracción de facturas que pasa el filtro más selectivo;
+        # ordenar los candidatos cuesta lo que haya que comprobar
+        if candidatos is not None:
+            recorrer = (limite + 1) * total / max(len(candidatos), 1)
+            if len(candidatos) < min(recorrer, tramo[1] - tramo[0]):
+                return self._ordenar(
+                    candidatos, indice_orden, cumple, despues, descendente, limite
+                )
+
+        if indice_orden is not None:
+            recorrido = indice_orden.recorrer(*tramo, despues, descendente)
+        else:
+            recorrido = range(despues[1] + 1 if despues else 0, total)
+        return list(islice(filter(cumple, recorrido), limite + 1))
+
+    def _ordenar(self, candidatos, indice_orden, cumple, despues, descendente, limite):
+        if indice_orden is not None:
+            valores = indice_orden.valores
+
+            def clave(id_):
+                return valores[id_], id_
+        else:
+
+            def clave(id_):
+                return id_, id_
+
+        encontrados = filter(cumple, candidatos)
+        if despues is not None:
+            if descendente:
+                encontrados = (i for i in encontrados if clave(i) < despues)
+            else:
+                encontrados = (i for i in encontrados if clave(i) > despues)
+        seleccionar = heapq.nlargest if descendente else heapq.nsmallest
+        return seleccionar(limite + 1, encontrados, key=clave)
@@ -1,58 +1,402 @@
-from fastapi import FastAPI
-from faker import Faker
-import random
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from datetime import date
+from itertools import chain, islice
+import logging
+import os
+import signal
+import threading
+import time
+
+import almacen
+import codificacion
+import exportar
+import indice
+import metricas_api
+from cache_lru import CacheLRU
+from generador import SEMILLA_MAX, Generador
 
 app = FastAPI(title="API de Facturas Fake", version="1.0")
+app.add_middleware(metricas_api.MiddlewareMetricas)
+logger = logging.getLogger("uvicorn.error")
 
-fake = Faker("es_ES")
+generador = Generador()
 
+MAX_FACTURAS_LOTE = int(os.getenv("MAX_FACTURAS_LOTE", "1000"))
+MAX_FACTURAS_STREAM = int(os.getenv("MAX_FACTURAS_STREAM", "1000000"))
+TAMANO_BLOQUE_GENERACION = int(os.getenv("TAMANO_BLOQUE_GENERACION", "1000"))
+CACHE_FACTURAS_TAMANO = int(os.getenv("CACHE_FACTURAS_TAMANO", "10000"))
+CACHE_FACTURAS_TTL = int(os.getenv("CACHE_FACTURAS_TTL", "3600"))
+LISTADO_LIMITE = int(os.getenv("LISTADO_LIMITE", "50"))
+LISTADO_LIMITE_MAX = int(os.getenv("LISTADO_LIMITE_MAX", "500"))
+PREPARACION_ESPERA_MAX = float(os.getenv("PREPARACION_ESPERA_MAX", "30"))
+PREPARACION_INTENTOS = int(os.getenv("PREPARACION_INTENTOS", "5"))
 
-@app.get("/facturas/v1/{numero_factura}")
-def get_factura(numero_factura: str):
-    empresa = {
-        "nombre": fake.company(),
-        "direccion": fake.address(),
-        "telefono": fake.phone_number(),
-        "email": fake.company_email(),
-        "nit": fake.random_int(100000, 999999),
-    }
+cache_facturas = CacheLRU(CACHE_FACTURAS_TAMANO, CACHE_FACTURAS_TTL)
+almacen_facturas = (
+    almacen.AlmacenFacturas(almacen.ALMACEN_FACTURAS)
+    if almacen.ALMACEN_FACTURAS
+    else None
+)
+indice_facturas = indice.IndiceFacturas()
+preparado = threading.Event()
+segundos_preparacion = None
 
-    cliente = {
-        "nombre": fake.company(),
-        "direccion": fake.address(),
-        "telefono": fake.phone_number(),
-        "email": fake.company_email(),
-        "documento": fake.random_int(100000, 999999),
-    }
-    # Generar datos falsos para empresa y cliente
-    # Generar entre 1 y 5 ítems de detalle
-    detalle = []
-    for _ in range(random.randint(1, 5)):
-        cantidad = random.randint(1, 10)
-        precio_unitario = round(random.uniform(50, 500), 2)
-        total = round(cantidad * precio_unitario, 2)
-        detalle.append(
-            {
-                "descripcion": fake.catch_phrase(),
-                "cantidad": cantidad,
-                "precio_unitario": precio_unitario,
-                "total": total,
-            }
+
+def generar_factura(numero_factura: str):
+    """
+    Genera la factura de forma determinista: el mismo número produce siempre
+    la misma factura, también en otro día o en otro proceso
+    """
+    return metricas_api.medir_generacion(
+        "individual", generador.generar, numero_factura
+    )
+
+
+def calcular_etag(factura):
+    return almacen.serializar(factura)[1]
+
+
+def facturas_guardadas(numeros, modo):
+    """
+    {numero: (factura, etag)} de los números que están en el almacén
+    persistente, si hay uno configurado
+    """
+    if almacen_facturas is None or not numeros:
+        return {}
+    return metricas_api.medir_almacen(modo, almacen_facturas, numeros)
+
+
+def obtener_factura(numero_factura: str):
+    """
+    Devuelve (factura, etag) desde la caché o el almacén, generándola si no
+    está en ninguno
+    """
+
+    calculada = False
+
+    def calcular():
+        nonlocal calculada
+        calculada = True
+        guardada = facturas_guardadas([numero_factura], "individual")
+        if numero_factura in guardada:
+            return guardada[numero_factura]
+        factura = generar_factura(numero_factura)
+        return factura, calcular_etag(factura)
+
+    resultado = cache_facturas.obtener_o_calcular(numero_factura, calcular)
+    metricas_api.CACHE_FACTURAS.labels("miss" if calculada else "hit").inc()
+    return resultado
+
+
+def obtener_facturas(numeros):
+    """
+    Devuelve las facturas de la lista usando la caché y el almacén y
+    generando las que falten en un solo lote vectorizado
+    """
+    facturas = {}
+    unicos = list(dict.fromkeys(numeros))
+    for numero in unicos:
+        entrada = cache_facturas.obtener(numero)
+        if entrada is not None:
+            facturas[numero] = entrada[0]
+    faltan = [numero for numero in unicos if numero not in facturas]
+    metricas_api.CACHE_FACTURAS.labels("hit").inc(len(facturas))
+    metricas_api.CACHE_FACTURAS.labels("miss").inc(len(faltan))
+    for numero, entrada in facturas_guardadas(faltan, "lote").items():
+        facturas[numero] = entrada[0]
+        cache_facturas.guardar(numero, entrada)
+    faltan = [numero for numero in faltan if numero not in facturas]
+    for factura in metricas_api.medir_generacion(
+        "lote", generador.generar_lote, faltan
+    ):
+        facturas[factura["numero_factura"]] = factura
+        cache_facturas.guardar(
+            factura["numero_factura"], (factura, calcular_etag(factura))
+        )
+    return [facturas[numero] for numero in numeros]
+
+
+def etag_coincide(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidatos = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+    return "*" in candidatos or etag in candidatos
+
+
+def numeros_lote(numeros, desde, hasta, limite):
+    """
+    Devuelve un iterador con los números pedidos (lista explícita seguida del
+    rango inclusivo desde-hasta) validando que no se supere el límite
+    """
+    if (desde is None) != (hasta is None):
+        raise HTTPException(400, "Se deben indicar desde y hasta a la vez")
+    rango = range(desde, hasta + 1) if desde is not None else range(0)
+    if desde is not None and not rango:
+        raise HTTPException(400, "hasta debe ser mayor o igual que desde")
+    cantidad = len(numeros) + len(rango)
+    if cantidad == 0:
+        raise HTTPException(400, "Debe indicar numeros o un rango desde-hasta")
+    if cantidad > limite:
+        raise HTTPException(400, f"El lote no puede superar {limite} facturas")
+    return chain(numeros, map(str, rango))
+
+
+@app.get("/facturas/v1/batch")
+def get_facturas_lote(
+    request: Request,
+    numeros: list[str] = Query(default=[]),
+    desde: int | None = None,
+    hasta: int | None = None,
+):
+    """
+    Devuelve varias facturas en una sola respuesta
+    """
+    lote = numeros_lote(numeros, desde, hasta, MAX_FACTURAS_LOTE)
+    facturas = obtener_facturas(list(lote))
+    return codificacion.responder(
+        {"total": len(facturas), "facturas": facturas}, request
+    )
+
+
+@app.get("/facturas/v1/batch/stream")
+def get_facturas_lote_stream(
+    request: Request,
+    numeros: list[str] = Query(default=[]),
+    desde: int | None = None,
+    hasta: int | None = None,
+):
+    """
+    Transmite las facturas a medida que se generan: NDJSON (una por línea) o,
+    si se pide con Accept, una secuencia de objetos MessagePack
+    """
+    lote = numeros_lote(numeros, desde, hasta, MAX_FACTURAS_STREAM)
+    tipo, compresion = codificacion.representacion(request)
+    bloques = codificacion.codificar_secuencia(bloques_facturas(lote), tipo)
+    cabeceras = {"Vary": codificacion.VARY}
+    if compresion:
+        bloques = codificacion.comprimir_secuencia(bloques, compresion)
+        cabeceras["Content-Encoding"] = compresion
+    media_type = codificacion.NDJSON if tipo == codificacion.JSON else tipo
+    return StreamingResponse(bloques, media_type=media_type, headers=cabeceras)
+
+
+def bloques_facturas(numeros):
+    """
+    Genera las facturas por bloques vectorizados, tomando del almacén las que
+    estén guardadas.
+
+    No pasa por la caché: un rango enorme la vaciaría sin aprovecharla.
+    """
+    numeros = iter(numeros)
+    while bloque := list(islice(numeros, TAMANO_BLOQUE_GENERACION)):
+        guardadas = facturas_guardadas(bloque, "lote")
+        faltan = [numero for numero in bloque if numero not in guardadas]
+        generadas = (
+            metricas_api.medir_generacion("lote", generador.generar_lote, faltan)
+            if faltan
+            else []
+        )
+        if not guardadas:
+            yield generadas
+            continue
+        generadas = iter(generadas)
+        yield [
+            guardadas[numero][0] if numero in guardadas else next(generadas)
+            for numero in bloque
+        ]
+
+
+@app.get("/facturas/v1/export")
+def get_facturas_export(
+    cantidad: int = Query(gt=0),
+    formato: str = "ndjson",
+    semilla: int = Query(default=0, ge=0, le=SEMILLA_MAX),
+    inicio: int = 1,
+    gzip: bool = False,
+):
+    """
+    Exporta `cantidad` facturas (números inicio..inicio+cantidad-1) en NDJSON o
+    CSV con una fila por línea de detalle, opcionalmente comprimidas con gzip
+    """
+    if formato not in exportar.FORMATOS:
+        raise HTTPException(400, f"formato debe ser uno de {exportar.FORMATOS}")
+    if cantidad > exportar.MAX_FACTURAS_EXPORT:
+        raise HTTPException(
+            400, f"La exportación no puede superar {exportar.MAX_FACTURAS_EXPORT}"
+        )
+
+    estadisticas = exportar.Estadisticas()
+
+    def contenido():
+        yield from exportar.exportar(
+            cantidad,
+            formato,
+            semilla,
+            inicio,
+            generador=generador,
+            estadisticas=estadisticas,
         )
+        logger.info("Exportación %s: %s", formato, estadisticas.resumen())
+
+    bloques = contenido()
+    tipo = "application/x-ndjson" if formato == "ndjson" else "text/csv"
+    nombre = f"facturas.{formato}"
+    if gzip:
+        bloques = exportar.comprimir_gzip(bloques)
+        tipo, nombre = "application/gzip", nombre + ".gz"
+    return StreamingResponse(
+        bloques,
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
+    )
+
+
+@app.get("/facturas/v1")
+def get_facturas_listado(
+    request: Request,
+    fecha_desde: date | None = None,
+    fecha_hasta: date | None = None,
+    total_min: float | None = None,
+    total_max: float | None = None,
+    cliente: str | None = None,
+    documento: int | None = None,
+    nit: int | None = None,
+    orden: str | None = None,
+    limite: int = Query(default=LISTADO_LIMITE, gt=0, le=LISTADO_LIMITE_MAX),
+    cursor: str | None = None,
+):
+    """
+    Lista las facturas del almacén que cumplen los filtros, por páginas: la
+    respuesta incluye el cursor de la página siguiente (None en la última).
+
+    Los índices se construyen una vez al arrancar: el almacén no debe
+    cambiar mientras el backend sirve. Si aun así falta alguna factura
+    indexada (el archivo se rehízo en caliente), se omite de la página
+    """
+    if almacen_facturas is None:
+        raise HTTPException(503, "No hay un almacén de facturas configurado")
+    if not preparado.wait(PREPARACION_ESPERA_MAX):
+        raise HTTPException(503, "Los índices del listado se están construyendo")
+    try:
+        numeros, siguiente = indice_facturas.buscar(
+            fecha_desde,
+            fecha_hasta,
+            total_min,
+            total_max,
+            cliente,
+            documento,
+            nit,
+            orden,
+            limite,
+            cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e)) from None
+    guardadas = facturas_guardadas(numeros, "listado")
+    return codificacion.responder(
+        {
+            "facturas": [guardadas[n][0] for n in numeros if n in guardadas],
+            "siguiente": siguiente,
+        },
+        request,
+    )
+
+
+@app.get("/health")
+async def get_health():
+    """
+    El proceso responde; no toca el generador ni el almacén
+    """
+    return {"estado": "ok"}
 
-    subtotal = round(sum(item["total"] for item in detalle), 2)
-    impuesto = round(subtotal * 0.19, 2)
-    total = round(subtotal + impuesto, 2)
-
-    factura = {
-        "numero_factura": numero_factura,
-        "fecha_emision": str(fake.date_between(start_date="-1y", end_date="today")),
-        "empresa": empresa,
-        "cliente": cliente,
-        "detalle": detalle,
-        "subtotal": subtotal,
-        "impuesto": impuesto,
-        "total": total,
+
+@app.get("/ready")
+async def get_ready():
+    """
+    503 hasta que el worker termina su preparación
+    """
+    if not preparado.is_set():
+        raise HTTPException(503, "El worker se está preparando")
+    return {
+        "estado": "preparado",
+        "segundos_preparacion": round(segundos_preparacion, 3),
     }
 
-    return factura
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Métricas en formato de texto de Prometheus
+    """
+    contenido, tipo = metricas_api.exponer()
+    return Response(contenido, media_type=tipo)
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """
+    Contadores de la caché de facturas y, si lo hay, del almacén persistente
+    """
+    estadisticas = cache_facturas.estadisticas()
+    if almacen_facturas is not None:
+        estadisticas["almacen"] = almacen_facturas.estadisticas()
+    return estadisticas
+
+
+@app.get("/facturas/v1/{numero_factura}")
+def get_factura(numero_factura: str, request: Request):
+    factura, etag = obtener_factura(numero_factura)
+    tipo, cuerpo, compresion = codificacion.preparar(factura, request)
+    etag = codificacion.variante_etag(etag, tipo, compresion)
+    cabeceras = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={CACHE_FACTURAS_TTL}",
+    }
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabeceras)
+    return codificacion.respuesta(tipo, cuerpo, compresion, cabeceras)
+
+
+def preparar():
+    """
+    Preparación del worker, en segundo plano para que /health responda desde
+    el primer momento: crea los pools del generador (carga los proveedores
+    es_ES de Faker), genera y serializa una factura de muestra y construye los
+    índices del listado. Las peticiones que necesitan los pools esperan a que
+    estén; el listado espera a los índices.
+
+    Si falla, se reintenta con backoff exponencial; tras PREPARACION_INTENTOS
+    fallos el worker se termina para que gunicorn arranque otro, en lugar de
+    quedarse vivo respondiendo 503 en /ready para siempre
+    """
+    global segundos_preparacion
+    inicio = time.perf_counter()
+    for intento in range(1, PREPARACION_INTENTOS + 1):
+        try:
+            generador.preparar()
+            calcular_etag(generador.generar("0"))
+            if almacen_facturas is not None:
+                # agregar sustituye las filas ya cargadas en un intento anterior
+                indice_facturas.agregar(almacen_facturas.filas_indice())
+                logger.info("Índices del listado: %d facturas", len(indice_facturas))
+            break
+        except Exception:
+            logger.exception(
+                "Fallo al preparar el worker (intento %d de %d)",
+                intento,
+                PREPARACION_INTENTOS,
+            )
+            if intento < PREPARACION_INTENTOS:
+                time.sleep(min(2 ** (intento - 1), 30))
+    else:
+        logger.critical("El worker no se pudo preparar; se termina")
+        os.kill(os.getpid(), signal.SIGTERM)
+        return
+    segundos_preparacion = time.perf_counter() - inicio
+    logger.info("Worker preparado en %.2f s", segundos_preparacion)
+    preparado.set()
+
+
+# Al final del módulo: la preparación usa las funciones definidas arriba
+threading.Thread(target=preparar, name="preparacion", daemon=True).start()
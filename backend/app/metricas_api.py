@@ -0,0 +1,167 @@
+"""Métricas Prometheus del backend.
+
+Un middleware ASGI mide cada petición hasta el último bloque del cuerpo (así
+las respuestas en streaming cuentan completas) y la etiqueta con la plantilla
+de la ruta, no con la URL, para no disparar la cardinalidad. Además se miden
+la generación de facturas, los aciertos de la caché y las consultas al
+almacén persistente.
+
+Si se define `PROMETHEUS_MULTIPROC_DIR`, cada proceso escribe sus valores en
+ese directorio y `/metrics` los agrega.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+
+DURACION_PETICION = Histogram(
+    "backend_peticion_segundos",
+    "Duración de las peticiones HTTP hasta terminar de enviar la respuesta",
+    ["ruta", "metodo", "estado"],
+    buckets=BUCKETS,
+)
+PETICIONES_EN_CURSO = Gauge(
+    "backend_peticiones_en_curso",
+    "Peticiones HTTP en curso",
+    multiprocess_mode="livesum",
+)
+DURACION_GENERACION = Histogram(
+    "backend_generacion_segundos",
+    "Duración de la generación de facturas (una o un lote)",
+    ["modo"],
+    buckets=BUCKETS,
+)
+FACTURAS_GENERADAS = Counter(
+    "backend_facturas_generadas_total", "Facturas generadas", ["modo"]
+)
+CACHE_FACTURAS = Counter(
+    "backend_cache_facturas_total", "Consultas a la caché de facturas", ["resultado"]
+)
+DURACION_ALMACEN = Histogram(
+    "backend_almacen_segundos",
+    "Duración de las consultas al almacén de facturas",
+    ["modo"],
+    buckets=BUCKETS,
+)
+CONSULTAS_ALMACEN = Counter(
+    "backend_almacen_facturas_total",
+    "Facturas buscadas en el almacén",
+    ["resultado"],
+)
+EXCEPCIONES = Counter(
+    "backend_excepciones_total", "Peticiones terminadas con una excepción no controlada"
+)
+
+
+def medir_generacion(modo, funcion, *args):
+    """
+    Llama a `funcion(*args)` registrando su duración y el número de facturas
+    """
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    DURACION_GENERACION.labels(modo).observe(time.perf_counter() - inicio)
+    FACTURAS_GENERADAS.labels(modo).inc(len(resultado) if modo == "lote" else 1)
+    return resultado
+
+
+def medir_almacen(modo, almacen, numeros):
+    """
+    Busca `numeros` en el almacén registrando la duración y los aciertos
+    """
+    inicio = time.perf_counter()
+    guardadas = almacen.obtener_varios(numeros)
+    DURACION_ALMACEN.labels(modo).observe(time.perf_counter() - inicio)
+    CONSULTAS_ALMACEN.labels("hit").inc(len(guardadas))
+    CONSULTAS_ALMACEN.labels("miss").inc(len(set(numeros)) - len(guardadas))
+    return guardadas
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI de latencia por ruta y peticiones en curso
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = "500"
+        observado = False
+
+        def observar():
+            nonlocal observado
+            if observado:
+                return
+            observado = True
+            ruta = getattr(scope.get("route"), "path", "sin_ruta")
+            DURACION_PETICION.labels(ruta, scope["method"], estado).observe(
+                time.perf_counter() - inicio
+            )
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = str(mensaje["status"])
+            await send(mensaje)
+            if mensaje["type"] == "http.response.body" and not mensaje.get(
+                "more_body", False
+            ):
+                observar()
+
+        PETICIONES_EN_CURSO.inc()
+        try:
+            await self.app(scope, receive, enviar)
+        except Exception:
+            EXCEPCIONES.inc()
+            raise
+        finally:
+            PETICIONES_EN_CURSO.dec()
+            observar()
+
+
+def registro():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        agregado = CollectorRegistry()
+        multiprocess.MultiProcessCollector(agregado)
+        return agregado
+    return REGISTRY
+
+
+def exponer():
+    """
+    Devuelve (contenido, tipo) de la exposición en formato texto de Prometheus
+    """
+    return generate_latest(registro()), CONTENT_TYPE_LATEST
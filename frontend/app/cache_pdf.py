@@ -0,0 +1,165 @@
+"""Caché de PDF renderizados.
+
+Tiene un nivel LRU en memoria y un nivel opcional en disco con expulsión por
+tamaño total. La clave combina el id de la factura con un hash de los datos
+recibidos del backend, así que sirve también como ETag: si los datos cambian,
+cambia la clave.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+PDFCacheado = namedtuple("PDFCacheado", ["contenido", "etag", "modificado"])
+
+
+def clave_pdf(id_factura, factura):
+    """
+    Clave (y ETag) del PDF de una factura: hash del id y de sus datos
+    """
+    datos = json.dumps(factura, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(id_factura).encode())
+    digest.update(b"\0")
+    digest.update(datos.encode())
+    return digest.hexdigest()
+
+
+class CachePDF:
+    """
+    Caché de dos niveles segura entre hilos.
+
+    `capacidad_memoria` limita el número de PDF en memoria. Si se indica
+    `directorio`, los PDF también se escriben en disco y, con
+    `max_bytes_disco`, se expulsan los de acceso más antiguo al superarlo.
+    """
+
+    def __init__(self, capacidad_memoria=256, directorio=None, max_bytes_disco=0):
+        self.capacidad_memoria = capacidad_memoria
+        self.directorio = directorio
+        self.max_bytes_disco = max_bytes_disco
+        self.hits = 0
+        self.misses = 0
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes_disco = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            self._bytes_disco = sum(t for _, t, _ in self._archivos_disco())
+
+    def obtener(self, clave):
+        """
+        Busca el PDF primero en memoria y después en disco; None si no está
+        """
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None:
+                self._memoria.move_to_end(clave)
+                self.hits += 1
+                return entrada
+
+        entrada = self._leer_disco(clave)
+        with self._lock:
+            if entrada is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._guardar_memoria(clave, entrada)
+        return entrada
+
+    def guardar(self, clave, contenido):
+        entrada = PDFCacheado(contenido, clave, time.time())
+        self._guardar_memoria(clave, entrada)
+        self._escribir_disco(clave, contenido)
+        return entrada
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memoria": len(self._memoria),
+                "capacidad_memoria": self.capacidad_memoria,
+                "directorio": self.directorio,
+            }
+
+    def _guardar_memoria(self, clave, entrada):
+        if self.capacidad_memoria <= 0:
+            return
+        with self._lock:
+            self._memoria[clave] = entrada
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.capacidad_memoria:
+                self._memoria.popitem(last=False)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pdf")
+
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            modificado = os.stat(ruta).st_mtime
+            # Marca el acceso para que la expulsión sea por uso (LRU)
+            os.utime(ruta, (time.time(), modificado))
+        except OSError:
+            return None
+        return PDFCacheado(contenido, clave, modificado)
+
+    def _escribir_disco(self, clave, contenido):
+        if not self.directorio:
+            return
+        # Escritura atómica: varios procesos pueden compartir el directorio
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(contenido)
+            os.replace(temporal, self._ruta(clave))
+        except OSError:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            return
+        with self._lock:
+            self._bytes_disco += len(contenido)
+            excedido = self.max_bytes_disco and self._bytes_disco > self.max_bytes_disco
+        if excedido:
+            self._expulsar_disco()
+
+    def _archivos_disco(self):
+        archivos = []
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(".pdf"):
+                    try:
+                        info = entrada.stat()
+                    except OSError:
+                        continue
+                    archivos.append((info.st_atime, info.st_size, entrada.path))
+        return archivos
+
+    def _expulsar_disco(self):
+        """
+        Borra los PDF accedidos hace más tiempo hasta quedar bajo el límite.
+
+        Recalcula el total desde el directorio, que otros procesos pueden
+        haber modificado.
+        """
+        archivos = self._archivos_disco()
+        total = sum(tamano for _, tamano, _ in archivos)
+        for _, tamano, ruta in sorted(archivos):
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue
+            total -= tamano
+        with self._lock:
+            self._bytes_disco = total
@@ -0,0 +1,249 @@
+"""Cliente HTTP del backend de facturas.
+
+Reutiliza conexiones keep-alive con un pool de tamaño configurable, aplica
+timeouts de conexión y de lectura, reintenta con backoff exponencial y jitter,
+y abre un cortacircuitos tras varios fallos seguidos para responder 503 al
+instante mientras el backend no está sano.
+
+Pide las facturas en MessagePack y comprimidas con zstd o gzip; `decodificar`
+e `iterar_objetos` entienden cualquier formato que devuelva el backend
+(también JSON sin comprimir).
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import msgpack
+import orjson
+import requests
+import zstandard
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+# docker-compose define BACKEND_API_URL; BACKEND_URL se mantiene por compatibilidad
+BACKEND_URL = os.getenv("BACKEND_API_URL") or os.getenv(
+    "BACKEND_URL", "http://backend:8000"
+)
+
+BACKEND_POOL = int(os.getenv("BACKEND_POOL", "20"))
+BACKEND_TIMEOUT_CONEXION = float(os.getenv("BACKEND_TIMEOUT_CONEXION", "3"))
+BACKEND_TIMEOUT_LECTURA = float(os.getenv("BACKEND_TIMEOUT_LECTURA", "10"))
+BACKEND_REINTENTOS = int(os.getenv("BACKEND_REINTENTOS", "2"))
+BACKEND_BACKOFF = float(os.getenv("BACKEND_BACKOFF", "0.1"))
+BACKEND_CIRCUITO_UMBRAL = int(os.getenv("BACKEND_CIRCUITO_UMBRAL", "5"))
+BACKEND_CIRCUITO_APERTURA = float(os.getenv("BACKEND_CIRCUITO_APERTURA", "30"))
+
+ESTADOS_REINTENTABLES = {502, 503, 504}
+
+ACCEPT = "application/msgpack, application/json;q=0.9"
+# urllib3 descomprime gzip por su cuenta; zstd solo si tiene soporte
+URLLIB3_ZSTD = "zstd" in ACCEPT_ENCODING
+TAMANO_BLOQUE_LECTURA = 64 * 1024
+
+
+class BackendNoDisponible(Exception):
+    """El backend no respondió o el cortacircuitos está abierto."""
+
+
+class Cortacircuitos:
+    """
+    Cortacircuitos por fallos consecutivos.
+
+    Tras `umbral` fallos seguidos se abre durante `tiempo_apertura` segundos;
+    pasado ese tiempo deja pasar una llamada de prueba (semiabierto) que lo
+    cierra si tiene éxito o lo vuelve a abrir si falla.
+    """
+
+    def __init__(self, umbral=5, tiempo_apertura=30):
+        self.umbral = umbral
+        self.tiempo_apertura = tiempo_apertura
+        self.fallos = 0
+        self._abierto_desde = None
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self._abierto_desde is None:
+                return "cerrado"
+            if time.monotonic() - self._abierto_desde < self.tiempo_apertura:
+                return "abierto"
+            return "semiabierto"
+
+    def permitir(self):
+        """Indica si se puede intentar una llamada ahora."""
+        with self._lock:
+            if self._abierto_desde is None:
+                return True
+            if time.monotonic() - self._abierto_desde < self.tiempo_apertura:
+                return False
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def registrar_exito(self):
+        with self._lock:
+            self.fallos = 0
+            self._abierto_desde = None
+            self._prueba_en_curso = False
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos += 1
+            if self._prueba_en_curso or self.fallos >= self.umbral:
+                self._abierto_desde = time.monotonic()
+            self._prueba_en_curso = False
+
+
+class ClienteBackend:
+    """
+    Cliente con sesión compartida; es seguro usarlo desde varios hilos.
+
+    Los errores de requests (conexión, timeout, respuesta cortada...) y las
+    respuestas 502/503/504 se reintentan hasta `reintentos` veces y cuentan
+    para el cortacircuitos.
+    """
+
+    def __init__(
+        self,
+        base_url=BACKEND_URL,
+        tamano_pool=BACKEND_POOL,
+        timeout_conexion=BACKEND_TIMEOUT_CONEXION,
+        timeout_lectura=BACKEND_TIMEOUT_LECTURA,
+        reintentos=BACKEND_REINTENTOS,
+        backoff=BACKEND_BACKOFF,
+        cortacircuitos=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (timeout_conexion, timeout_lectura)
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self.cortacircuitos = cortacircuitos or Cortacircuitos(
+            BACKEND_CIRCUITO_UMBRAL, BACKEND_CIRCUITO_APERTURA
+        )
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=tamano_pool)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.headers["Accept"] = ACCEPT
+        self.sesion.headers["Accept-Encoding"] = "zstd, gzip"
+        self.llamadas = 0
+        self.errores = 0
+        self._latencias = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    def get(self, ruta, **kwargs):
+        """
+        GET a `base_url + ruta`; lanza BackendNoDisponible si no hay respuesta
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        for intento in range(self.reintentos + 1):
+            if not self.cortacircuitos.permitir():
+                raise BackendNoDisponible("Backend no disponible (circuito abierto)")
+            inicio = time.perf_counter()
+            exito = False
+            # Con el circuito semiabierto esta llamada es la prueba: se
+            # registra siempre su resultado, o no se permitiría ninguna otra
+            try:
+                try:
+                    resp = self.sesion.get(f"{self.base_url}{ruta}", **kwargs)
+                except requests.RequestException as e:
+                    error, resp = e, None
+                else:
+                    error = None
+                self._registrar(time.perf_counter() - inicio, resp is not None)
+                exito = (
+                    resp is not None and resp.status_code not in ESTADOS_REINTENTABLES
+                )
+            finally:
+                if exito:
+                    self.cortacircuitos.registrar_exito()
+                else:
+                    self.cortacircuitos.registrar_fallo()
+
+            if exito:
+                return resp
+            if intento < self.reintentos:
+                if resp is not None:
+                    resp.close()
+                # Backoff exponencial con jitter completo
+                time.sleep(random.uniform(0, self.backoff * 2**intento))
+
+        if resp is not None:
+            return resp
+        raise BackendNoDisponible(f"No se pudo conectar con backend: {error}")
+
+    @staticmethod
+    def decodificar(resp):
+        """
+        Decodifica el cuerpo de una respuesta JSON o MessagePack
+        """
+        cuerpo = resp.content
+        if _requiere_zstd(resp):
+            cuerpo = zstandard.ZstdDecompressor().decompressobj().decompress(cuerpo)
+        if _es_msgpack(resp):
+            return msgpack.unpackb(cuerpo)
+        return orjson.loads(cuerpo)
+
+    @staticmethod
+    def iterar_objetos(resp):
+        """
+        Genera los objetos de una respuesta en streaming (NDJSON o secuencia
+        MessagePack) a medida que llegan los bloques
+        """
+        bloques = resp.iter_content(TAMANO_BLOQUE_LECTURA)
+        if _requiere_zstd(resp):
+            descompresor = zstandard.ZstdDecompressor().decompressobj()
+            bloques = map(descompresor.decompress, bloques)
+        if _es_msgpack(resp):
+            desempaquetador = msgpack.Unpacker()
+            for bloque in bloques:
+                desempaquetador.feed(bloque)
+                yield from desempaquetador
+            return
+        pendiente = b""
+        for bloque in bloques:
+            *lineas, pendiente = (pendiente + bloque).split(b"\n")
+            for linea in lineas:
+                if linea.strip():
+                    yield orjson.loads(linea)
+        if pendiente.strip():
+            yield orjson.loads(pendiente)
+
+    def estadisticas(self):
+        with self._lock:
+            latencias = sorted(self._latencias)
+            llamadas, errores = self.llamadas, self.errores
+
+        def percentil(p):
+            if not latencias:
+                return None
+            return round(latencias[int(p * (len(latencias) - 1))] * 1000, 2)
+
+        return {
+            "llamadas": llamadas,
+            "errores": errores,
+            "latencia_ms": {"p50": percentil(0.5), "p95": percentil(0.95)},
+            "circuito": self.cortacircuitos.estado,
+        }
+
+    def _registrar(self, segundos, respondio):
+        with self._lock:
+            self.llamadas += 1
+            if not respondio:
+                self.errores += 1
+            self._latencias.append(segundos)
+
+
+def _es_msgpack(resp):
+    tipo = resp.headers.get("Content-Type", "").split(";")[0].strip()
+    return tipo in ("application/msgpack", "application/x-msgpack")
+
+
+def _requiere_zstd(resp):
+    return not URLLIB3_ZSTD and resp.headers.get("Content-Encoding") == "zstd"
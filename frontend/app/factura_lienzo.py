@@ -0,0 +1,363 @@
+"""Render directo sobre el canvas para las facturas de una sola página.
+
+La maquetación de la plantilla clásica es fija: el alto de cada fila de tabla
+solo depende de cuántas líneas tiene su texto, así que la posición de cada
+bloque se calcula con unas pocas sumas. La parte que no depende de la factura
+(título, fecha y primera sección) se calcula al importar el módulo, y
+`maquetar` añade el resto. `dibujar` pinta la factura directamente sobre un
+canvas de ReportLab, sin construir flowables, medir y partir tablas ni
+recorrer el frame de platypus.
+
+Solo se usa cuando el resultado es el mismo que daría platypus: la factura
+cabe en una página y los párrafos (título y fecha) no llevan marcado ni
+espacios que Paragraph interpretaría, ni necesitan más de una línea. En
+cualquier otro caso `maquetar` devuelve None y la factura se maqueta con
+platypus como siempre.
+"""
+
+from types import SimpleNamespace
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen.canvas import Canvas
+
+from factura_pdf import (
+    ANCHOS_DATOS,
+    ANCHOS_DETALLE,
+    ANCHOS_TOTALES,
+    ENCABEZADO_DETALLE,
+    ESTILOS,
+    MARGEN,
+    moneda,
+)
+
+# Padding interior del frame de SimpleDocTemplate
+PADDING_FRAME = 6
+# Los Spacer(1, 20) que separan los bloques de la plantilla
+SEPARACION = 20
+# Todas las celdas usan el leading por defecto de las tablas (12), sea cual
+# sea su tamaño de letra, y 8 pt de padding vertical
+LEADING_CELDA = 12
+PADDING_CELDA = 8
+# Margen de redondeo al comprobar si un bloque cabe, como el frame de platypus
+HOLGURA = 1e-6
+GRIS_REJILLA = colors.HexColor("#BDC3C7")
+AZUL = colors.HexColor("#3498DB")
+FONDO_CLARO = colors.HexColor("#ECF0F1")
+OSCURO = colors.HexColor("#2C3E50")
+
+
+def _celda(fuente, tamano, color, alineacion, padding):
+    return SimpleNamespace(
+        fuente=fuente,
+        tamano=tamano,
+        color=color,
+        alineacion=alineacion,
+        padding=padding,
+    )
+
+
+# Estilo de cada columna, con los mismos valores que los TableStyle de factura_pdf
+CELDAS_DATOS = (
+    _celda("Helvetica-Bold", 10, OSCURO, "derecha", 10),
+    _celda("Helvetica", 10, colors.black, "izquierda", 10),
+)
+CELDAS_ENCABEZADO = (_celda("Helvetica-Bold", 12, colors.whitesmoke, "centro", 6),) * 4
+CELDAS_DETALLE = (_celda("Helvetica", 10, colors.black, "centro", 6),) * 4
+CELDAS_SUBTOTALES = (_celda("Helvetica-Bold", 11, colors.black, "derecha", 10),) * 2
+CELDAS_TOTAL = (_celda("Helvetica-Bold", 13, colors.whitesmoke, "derecha", 10),) * 2
+# Fondos de cada tabla: (color, columnas, filas)
+FONDOS_DATOS = [(FONDO_CLARO, slice(0, 1), slice(None))]
+FONDOS_DETALLE = [
+    (AZUL, slice(None), slice(0, 1)),
+    (FONDO_CLARO, slice(None), slice(1, None)),
+]
+FONDOS_TOTALES = [(AZUL, slice(None), slice(2, 3))]
+
+
+def calcular_maqueta():
+    """
+    Coordenadas de la parte fija de la página, tal como las calcula el frame
+    de platypus
+    """
+    ancho_pagina, alto_pagina = letter
+    x0 = MARGEN + PADDING_FRAME
+    arriba = alto_pagina - MARGEN - PADDING_FRAME
+
+    # El primer bloque del frame no aplica su spaceBefore
+    titulo = arriba - ESTILOS.titulo.fontSize
+    arriba -= ESTILOS.titulo.leading + ESTILOS.titulo.spaceAfter
+    fecha = arriba - ESTILOS.fecha.fontSize
+    arriba -= ESTILOS.fecha.leading + ESTILOS.fecha.spaceAfter + SEPARACION
+    seccion_empresa, tabla_empresa = _seccion(arriba, ESTILOS.seccion)
+    return SimpleNamespace(
+        x0=x0,
+        ancho=ancho_pagina - 2 * x0,
+        inferior=MARGEN + PADDING_FRAME,
+        titulo=titulo,
+        fecha=fecha,
+        seccion_empresa=seccion_empresa,
+        tabla_empresa=tabla_empresa,
+    )
+
+
+def _seccion(arriba, estilo):
+    """
+    (techo del título de sección, techo de la tabla que le sigue)
+    """
+    arriba -= estilo.spaceBefore
+    return arriba, arriba - estilo.leading - estilo.spaceAfter
+
+
+MAQUETA = calcular_maqueta()
+# Filas de las tablas de empresa y cliente que arma `maquetar`
+FILAS_EMPRESA = 5
+FILAS_CLIENTE = 4
+FILAS_TOTALES = 3
+
+
+def max_filas_detalle():
+    """
+    Cota de las filas de detalle que caben en la página: las que caben si
+    todas las celdas, también las de empresa, cliente y totales, tienen una
+    sola línea. Una factura con más no puede caber
+    """
+    alto_fila = LEADING_CELDA + 2 * PADDING_CELDA
+    alto_encabezado = (
+        max(len(t.split("\n")) for t in ENCABEZADO_DETALLE) * (LEADING_CELDA)
+        + 2 * PADDING_CELDA
+    )
+    _, arriba = _seccion(
+        MAQUETA.tabla_empresa - FILAS_EMPRESA * alto_fila - SEPARACION,
+        ESTILOS.seccion,
+    )
+    _, arriba = _seccion(
+        arriba - FILAS_CLIENTE * alto_fila - SEPARACION, ESTILOS.detalle_seccion
+    )
+    libre = (
+        arriba
+        - alto_encabezado
+        - SEPARACION
+        - FILAS_TOTALES * alto_fila
+        - (MAQUETA.inferior - HOLGURA)
+    )
+    return max(0, int(libre // alto_fila))
+
+
+MAX_FILAS_DETALLE = max_filas_detalle()
+
+
+def _parrafo_simple(texto, estilo):
+    """
+    Indica si Paragraph dibujaría `texto` tal cual, en una sola línea
+    """
+    return (
+        "<" not in texto
+        and "&" not in texto
+        and " ".join(texto.split()) == texto
+        and stringWidth(texto, estilo.fontName, estilo.fontSize) <= MAQUETA.ancho
+    )
+
+
+def _tabla(filas, anchos, estilos_fila, fondos, arriba):
+    filas = [[str(texto).split("\n") for texto in fila] for fila in filas]
+    altos = [
+        max(len(lineas) for lineas in fila) * LEADING_CELDA + 2 * PADDING_CELDA
+        for fila in filas
+    ]
+    return SimpleNamespace(
+        filas=filas,
+        altos=altos,
+        anchos=anchos,
+        estilos_fila=estilos_fila,
+        fondos=fondos,
+        arriba=arriba,
+        abajo=arriba - sum(altos),
+    )
+
+
+def maquetar(datos):
+    """
+    Textos y posiciones de la factura normalizada, o None si no se puede
+    dibujar directamente con el mismo resultado que platypus
+    """
+    # Antes de formatear nada: las facturas grandes nunca caben en una página
+    if len(datos.lineas) > MAX_FILAS_DETALLE:
+        return None
+    titulo = f"FACTURA #{datos.numero}"
+    fecha = f"Fecha de emisión: {datos.fecha_emision}"
+    if not (
+        _parrafo_simple(titulo, ESTILOS.titulo)
+        and _parrafo_simple(fecha, ESTILOS.fecha)
+    ):
+        return None
+
+    empresa, cliente = datos.empresa, datos.cliente
+    filas_empresa = [
+        ["Nombre:", empresa.get("nombre", "-")],
+        ["NIT:", empresa.get("nit", "-")],
+        ["Dirección:", empresa.get("direccion", "-")],
+        ["Teléfono:", empresa.get("telefono", "-")],
+        ["Email:", empresa.get("email", "-")],
+    ]
+    tabla_empresa = _tabla(
+        filas_empresa,
+        ANCHOS_DATOS,
+        [CELDAS_DATOS] * len(filas_empresa),
+        FONDOS_DATOS,
+        MAQUETA.tabla_empresa,
+    )
+
+    seccion_cliente, arriba = _seccion(
+        tabla_empresa.abajo - SEPARACION, ESTILOS.seccion
+    )
+    filas_cliente = [
+        ["Nombre:", cliente.get("nombre", "-")],
+        ["Documento:", datos.documento_cliente],
+        ["Dirección:", cliente.get("direccion", "-")],
+        ["Teléfono:", cliente.get("telefono", "-")],
+    ]
+    tabla_cliente = _tabla(
+        filas_cliente,
+        ANCHOS_DATOS,
+        [CELDAS_DATOS] * len(filas_cliente),
+        FONDOS_DATOS,
+        arriba,
+    )
+
+    seccion_detalle, arriba = _seccion(
+        tabla_cliente.abajo - SEPARACION, ESTILOS.detalle_seccion
+    )
+    filas_detalle = [
+        [qty, desc, moneda(price), moneda(line_total)]
+        for qty, desc, price, line_total in datos.lineas
+    ]
+    tabla_detalle = _tabla(
+        [ENCABEZADO_DETALLE, *filas_detalle],
+        ANCHOS_DETALLE,
+        [CELDAS_ENCABEZADO] + [CELDAS_DETALLE] * len(filas_detalle),
+        FONDOS_DETALLE,
+        arriba,
+    )
+
+    tabla_totales = _tabla(
+        [
+            ["Subtotal:", moneda(datos.subtotal)],
+            ["IVA (19%):", moneda(datos.impuesto)],
+            ["Total:", moneda(datos.total)],
+        ],
+        ANCHOS_TOTALES,
+        [CELDAS_SUBTOTALES, CELDAS_SUBTOTALES, CELDAS_TOTAL],
+        FONDOS_TOTALES,
+        tabla_detalle.abajo - SEPARACION,
+    )
+    if tabla_totales.abajo < MAQUETA.inferior - HOLGURA:
+        return None
+
+    return SimpleNamespace(
+        titulo=titulo,
+        fecha=fecha,
+        titulo_documento=f"Factura #{datos.numero}",
+        autor=empresa.get("nombre", ""),
+        secciones=[
+            ("INFORMACIÓN DE LA EMPRESA", ESTILOS.seccion, MAQUETA.seccion_empresa),
+            ("INFORMACIÓN DEL CLIENTE", ESTILOS.seccion, seccion_cliente),
+            ("DETALLE DE LA FACTURA", ESTILOS.detalle_seccion, seccion_detalle),
+        ],
+        tablas=[tabla_empresa, tabla_cliente, tabla_detalle, tabla_totales],
+    )
+
+
+def _dibujar_parrafo(canv, texto, estilo, base, centrado=False):
+    canv.setFont(estilo.fontName, estilo.fontSize)
+    canv.setFillColor(estilo.textColor)
+    if centrado:
+        canv.drawCentredString(MAQUETA.x0 + MAQUETA.ancho / 2, base, texto)
+    else:
+        canv.drawString(MAQUETA.x0 + estilo.leftIndent, base, texto)
+
+
+def _dibujar_seccion(canv, texto, estilo, arriba):
+    if estilo.backColor is not None:
+        canv.setFillColor(estilo.backColor)
+        x = MAQUETA.x0 + estilo.leftIndent
+        ancho = MAQUETA.x0 + MAQUETA.ancho - x
+        canv.rect(x, arriba - estilo.leading, ancho, estilo.leading, stroke=0, fill=1)
+    _dibujar_parrafo(canv, texto, estilo, arriba - estilo.fontSize)
+
+
+def _dibujar_tabla(canv, tabla):
+    """
+    Dibuja la tabla centrada en el frame, en el orden de platypus: fondos,
+    texto y rejilla
+    """
+    anchos = tabla.anchos
+    xs = [MAQUETA.x0 + (MAQUETA.ancho - sum(anchos)) / 2]
+    for ancho in anchos:
+        xs.append(xs[-1] + ancho)
+    ys = [tabla.arriba]
+    for alto in tabla.altos:
+        ys.append(ys[-1] - alto)
+
+    for color, columnas, filas in tabla.fondos:
+        columnas = range(len(anchos))[columnas]
+        filas = range(len(tabla.filas))[filas]
+        if not columnas or not filas:
+            continue
+        izquierda, derecha = xs[columnas[0]], xs[columnas[-1] + 1]
+        techo, suelo = ys[filas[0]], ys[filas[-1] + 1]
+        canv.setFillColor(color)
+        canv.rect(
+            izquierda, suelo, derecha - izquierda, techo - suelo, stroke=0, fill=1
+        )
+
+    actual = None
+    for fila, suelo, alto, estilos in zip(
+        tabla.filas, ys[1:], tabla.altos, tabla.estilos_fila
+    ):
+        for lineas, x, ancho, estilo in zip(fila, xs, anchos, estilos):
+            # Como platypus, solo se cambia la fuente y el color si cambian
+            if estilo is not actual:
+                canv.setFont(estilo.fuente, estilo.tamano, LEADING_CELDA)
+                canv.setFillColor(estilo.color)
+                actual = estilo
+            # Centrado vertical con la misma fórmula que Table._drawCell
+            base = suelo + (alto + len(lineas) * LEADING_CELDA) / 2 - estilo.tamano
+            for linea in lineas:
+                if estilo.alineacion == "izquierda":
+                    canv.drawString(x + estilo.padding, base, linea)
+                elif estilo.alineacion == "derecha":
+                    canv.drawRightString(x + ancho - estilo.padding, base, linea)
+                else:
+                    canv.drawCentredString(x + ancho / 2, base, linea)
+                base -= LEADING_CELDA
+
+    canv.setStrokeColor(GRIS_REJILLA)
+    canv.grid(xs, ys)
+
+
+def dibujar(maqueta, destino):
+    """
+    Escribe en el objeto archivo `destino` el PDF de una factura maquetada
+    """
+    canv = Canvas(destino, pagesize=letter)
+    canv.setAuthor(maqueta.autor)
+    canv.setTitle(maqueta.titulo_documento)
+    canv.setSubject(None)
+    canv.setCreator(None)
+    canv.setProducer(None)
+    canv.setKeywords([])
+    canv.setLineWidth(0.5)
+    canv.setLineCap(1)
+    canv.setLineJoin(1)
+
+    _dibujar_parrafo(canv, maqueta.titulo, ESTILOS.titulo, MAQUETA.titulo, True)
+    _dibujar_parrafo(canv, maqueta.fecha, ESTILOS.fecha, MAQUETA.fecha, True)
+    for (texto, estilo, arriba), tabla in zip(maqueta.secciones, maqueta.tablas):
+        _dibujar_seccion(canv, texto, estilo, arriba)
+        _dibujar_tabla(canv, tabla)
+    _dibujar_tabla(canv, maqueta.tablas[-1])
+
+    canv.showPage()
+    canv.save()
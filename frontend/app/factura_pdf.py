@@ -0,0 +1,411 @@
+"""Motor de plantillas para el PDF de las facturas.
+
+Los estilos de párrafo, los estilos de tabla y las constantes de maquetación
+se construyen una sola vez al importar el módulo y se reutilizan en cada
+render. Las plantillas se registran por nombre y `render_factura` es el único
+punto de entrada que usan las rutas.
+
+Las facturas con más de `FACTURA_GRANDE_UMBRAL` líneas se maquetan en tablas
+de `FILAS_POR_TABLA` filas, cada una con su encabezado y el subtotal acumulado:
+partir una única tabla gigante entre páginas tiene un coste cuadrático.
+
+Las facturas que caben en una página se dibujan directamente sobre el canvas
+con las coordenadas precalculadas de `factura_lienzo`, sin pasar por
+platypus. El resultado es el mismo; `RENDER_DIRECTO=0` lo desactiva.
+"""
+
+import os
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+TASA_IVA = 0.19
+MARGEN = 50
+ANCHOS_DATOS = [1.5 * inch, 4.5 * inch]
+ANCHOS_DETALLE = [1.2 * inch, 3 * inch, 1.4 * inch, 1.4 * inch]
+ANCHOS_TOTALES = [2 * inch, 2 * inch]
+ENCABEZADO_DETALLE = ["Cantidad", "Descripción", "Precio Unit.", "Total"]
+
+FACTURA_GRANDE_UMBRAL = int(os.getenv("FACTURA_GRANDE_UMBRAL", "200"))
+FILAS_POR_TABLA = int(os.getenv("FILAS_POR_TABLA", "20"))
+RENDER_DIRECTO = os.getenv("RENDER_DIRECTO", "1") != "0"
+
+
+def construir_estilos():
+    """
+    Construye los estilos de párrafo y de tabla de la plantilla clásica
+    """
+    styles = getSampleStyleSheet()
+    tabla_detalle = TableStyle(
+        [
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#3498DB")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("FONTSIZE", (0, 0), (-1, 0), 12),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#ECF0F1")),
+            ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
+            ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+            ("FONTSIZE", (0, 1), (-1, -1), 10),
+            ("TOPPADDING", (0, 0), (-1, -1), 8),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+        ]
+    )
+    return SimpleNamespace(
+        titulo=ParagraphStyle(
+            "TitleStyle",
+            parent=styles["Heading1"],
+            fontSize=24,
+            textColor=colors.HexColor("#2C3E50"),
+            spaceAfter=6,
+            alignment=TA_CENTER,
+            fontName="Helvetica-Bold",
+        ),
+        fecha=ParagraphStyle(
+            "FechaStyle",
+            parent=styles["Normal"],
+            fontSize=11,
+            textColor=colors.HexColor("#7F8C8D"),
+            spaceAfter=20,
+            alignment=TA_CENTER,
+        ),
+        seccion=ParagraphStyle(
+            "SectionStyle",
+            parent=styles["Heading2"],
+            fontSize=14,
+            textColor=colors.white,
+            backColor=colors.HexColor("#3498DB"),
+            spaceAfter=10,
+            spaceBefore=10,
+            leftIndent=10,
+            fontName="Helvetica-Bold",
+        ),
+        detalle_seccion=ParagraphStyle(
+            "DetalleSection",
+            parent=styles["Heading2"],
+            fontSize=14,
+            textColor=colors.HexColor("#2C3E50"),
+            spaceAfter=10,
+            spaceBefore=10,
+            fontName="Helvetica-Bold",
+        ),
+        # Empresa y cliente comparten el mismo estilo de tabla
+        tabla_datos=TableStyle(
+            [
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
+                ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#ECF0F1")),
+                ("TEXTCOLOR", (0, 0), (0, -1), colors.HexColor("#2C3E50")),
+                ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+                ("ALIGN", (0, 0), (0, -1), "RIGHT"),
+                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+                ("LEFTPADDING", (0, 0), (-1, -1), 10),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+                ("TOPPADDING", (0, 0), (-1, -1), 8),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+            ]
+        ),
+        tabla_detalle=tabla_detalle,
+        # Tramo de una factura grande: la última fila es el subtotal acumulado
+        tabla_detalle_tramo=TableStyle(
+            [
+                ("SPAN", (0, -1), (2, -1)),
+                ("ALIGN", (0, -1), (2, -1), "RIGHT"),
+                ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+                ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#D6EAF8")),
+            ],
+            parent=tabla_detalle,
+        ),
+        tabla_totales=TableStyle(
+            [
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
+                ("ALIGN", (0, 0), (0, -1), "RIGHT"),
+                ("ALIGN", (1, 0), (1, -1), "RIGHT"),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 11),
+                ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#3498DB")),
+                ("TEXTCOLOR", (0, -1), (-1, -1), colors.whitesmoke),
+                ("FONTSIZE", (0, -1), (-1, -1), 13),
+                ("TOPPADDING", (0, 0), (-1, -1), 8),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+                ("LEFTPADDING", (0, 0), (-1, -1), 10),
+                ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+            ]
+        ),
+    )
+
+
+ESTILOS = construir_estilos()
+
+
+def moneda(valor):
+    """
+    Formato de los importes, compartido por el PDF y la vista previa HTML
+    """
+    return f"${valor:,.2f}"
+
+
+def normalizar_factura(factura):
+    """
+    Lleva la respuesta del backend a una estructura estable para las plantillas.
+
+    Acepta `detalle` o `items`, `cantidad` o `qty`, `precio_unitario` o
+    `precio`, etc., y completa subtotal, impuesto y total si faltan.
+    """
+    # Normalizar detalle: backend puede usar 'detalle' o 'items'
+    detalle = factura.get("detalle") or factura.get("items") or []
+
+    lineas = []
+    for it in detalle:
+        if isinstance(it, dict):
+            qty = it.get("cantidad", it.get("qty", 1))
+            desc = it.get("descripcion", it.get("descripcion_item", "-"))
+            price = it.get("precio_unitario", it.get("precio", 0.0))
+        else:
+            qty = 1
+            desc = str(it)
+            price = 0.0
+        lineas.append((qty, desc, price, round(qty * price, 2)))
+
+    subtotal = factura.get("subtotal")
+    impuesto = factura.get("impuesto")
+    total = factura.get("total")
+
+    if subtotal is None:
+        subtotal = sum(
+            (
+                it.get("cantidad", it.get("qty", 0))
+                * it.get("precio_unitario", it.get("precio", 0.0))
+            )
+            for it in detalle
+            if isinstance(it, dict)
+        )
+    if impuesto is None:
+        impuesto = round(subtotal * (factura.get("tax_rate") or TASA_IVA), 2)
+    if total is None:
+        total = round(subtotal + impuesto, 2)
+
+    empresa = factura.get("empresa") or {}
+    cliente = factura.get("cliente") or {}
+    return SimpleNamespace(
+        numero=factura.get("numero_factura", "-"),
+        fecha_emision=factura.get("fecha_emision", "-"),
+        empresa=empresa,
+        cliente=cliente,
+        documento_cliente=cliente.get("documento", cliente.get("dni", "-")),
+        lineas=lineas,
+        subtotal=subtotal,
+        impuesto=impuesto,
+        total=total,
+    )
+
+
+class PlantillaFactura:
+    """
+    Plantilla clásica: encabezado, empresa, cliente, detalle y totales.
+
+    Para otra maquetación basta con heredar, redefinir `elementos` (o
+    `estilos`) y registrarla con `registrar_plantilla`.
+    """
+
+    nombre = "clasica"
+    estilos = ESTILOS
+
+    def elementos(self, datos):
+        """
+        Devuelve la lista de flowables de platypus de la factura normalizada
+        """
+        estilos = self.estilos
+        elements = [
+            Paragraph(f"FACTURA #{datos.numero}", estilos.titulo),
+            Paragraph(f"Fecha de emisión: {datos.fecha_emision}", estilos.fecha),
+            Spacer(1, 20),
+        ]
+
+        # Empresa
+        empresa = datos.empresa
+        elements.append(Paragraph("INFORMACIÓN DE LA EMPRESA", estilos.seccion))
+        empresa_rows = [
+            ["Nombre:", empresa.get("nombre", "-")],
+            ["NIT:", empresa.get("nit", "-")],
+            ["Dirección:", empresa.get("direccion", "-")],
+            ["Teléfono:", empresa.get("telefono", "-")],
+            ["Email:", empresa.get("email", "-")],
+        ]
+        elements.append(
+            Table(empresa_rows, colWidths=ANCHOS_DATOS, style=estilos.tabla_datos)
+        )
+        elements.append(Spacer(1, 20))
+
+        # Cliente
+        cliente = datos.cliente
+        elements.append(Paragraph("INFORMACIÓN DEL CLIENTE", estilos.seccion))
+        cliente_rows = [
+            ["Nombre:", cliente.get("nombre", "-")],
+            ["Documento:", datos.documento_cliente],
+            ["Dirección:", cliente.get("direccion", "-")],
+            ["Teléfono:", cliente.get("telefono", "-")],
+        ]
+        elements.append(
+            Table(cliente_rows, colWidths=ANCHOS_DATOS, style=estilos.tabla_datos)
+        )
+        elements.append(Spacer(1, 20))
+
+        # Detalle
+        elements.append(Paragraph("DETALLE DE LA FACTURA", estilos.detalle_seccion))
+        elements.extend(self.elementos_detalle(datos))
+        elements.append(Spacer(1, 20))
+
+        # Totales
+        totales_data = [
+            ["Subtotal:", moneda(datos.subtotal)],
+            ["IVA (19%):", moneda(datos.impuesto)],
+            ["Total:", moneda(datos.total)],
+        ]
+        elements.append(
+            Table(totales_data, colWidths=ANCHOS_TOTALES, style=estilos.tabla_totales)
+        )
+        return elements
+
+    def elementos_detalle(self, datos):
+        """
+        Tabla de detalle; en facturas grandes, una tabla por tramo de filas
+        """
+        estilos = self.estilos
+        filas = (
+            [str(qty), desc, moneda(price), moneda(line_total)]
+            for qty, desc, price, line_total in datos.lineas
+        )
+        if len(datos.lineas) <= FACTURA_GRANDE_UMBRAL:
+            data = [ENCABEZADO_DETALLE, *filas]
+            return [Table(data, colWidths=ANCHOS_DETALLE, style=estilos.tabla_detalle)]
+
+        tablas = []
+        acumulado = 0.0
+        for inicio in range(0, len(datos.lineas), FILAS_POR_TABLA):
+            tramo = datos.lineas[inicio : inicio + FILAS_POR_TABLA]
+            acumulado = round(acumulado + sum(linea[3] for linea in tramo), 2)
+            data = [ENCABEZADO_DETALLE]
+            data.extend(next(filas) for _ in tramo)
+            data.append(["Subtotal acumulado:", "", "", moneda(acumulado)])
+            tablas.append(
+                Table(
+                    data,
+                    colWidths=ANCHOS_DETALLE,
+                    style=estilos.tabla_detalle_tramo,
+                    repeatRows=1,
+                )
+            )
+        return tablas
+
+    def render(self, factura, tiempos=None):
+        """
+        Genera el PDF de la factura y devuelve su contenido en bytes
+        """
+        buffer = BytesIO()
+        self.render_en(factura, buffer, tiempos)
+        return buffer.getvalue()
+
+    def render_en(self, factura, destino, tiempos=None):
+        """
+        Escribe el PDF de la factura en el objeto archivo `destino`.
+
+        Si se pasa el diccionario `tiempos`, anota en él los segundos de
+        construcción de elementos (`elementos`) y de `doc.build`; en el render
+        directo, los de preparar los datos y de dibujar en el canvas.
+        """
+        # factura_lienzo importa los estilos y constantes de este módulo
+        import factura_lienzo
+
+        inicio = time.perf_counter()
+        datos = normalizar_factura(factura)
+        maqueta = self.maqueta_directa(datos)
+        if maqueta is not None:
+            construidos = time.perf_counter()
+            factura_lienzo.dibujar(maqueta, destino)
+        else:
+            doc = SimpleDocTemplate(
+                destino,
+                pagesize=letter,
+                title=f"Factura #{datos.numero}",
+                author=datos.empresa.get("nombre", ""),
+                leftMargin=MARGEN,
+                rightMargin=MARGEN,
+                topMargin=MARGEN,
+                bottomMargin=MARGEN,
+            )
+            elementos = self.elementos(datos)
+            construidos = time.perf_counter()
+            doc.build(elementos)
+        if tiempos is not None:
+            tiempos["elementos"] = construidos - inicio
+            tiempos["doc_build"] = time.perf_counter() - construidos
+
+    def maqueta_directa(self, datos):
+        """
+        Maquetación para el render directo de factura_lienzo, o None si la
+        factura debe pasar por platypus. El render directo solo reproduce la
+        maquetación de esta clase: las subclases que cambian elementos o
+        estilos usan siempre platypus
+        """
+        import factura_lienzo
+
+        clase = type(self)
+        if not (
+            RENDER_DIRECTO
+            and clase.elementos is PlantillaFactura.elementos
+            and clase.elementos_detalle is PlantillaFactura.elementos_detalle
+            and self.estilos is ESTILOS
+        ):
+            return None
+        return factura_lienzo.maquetar(datos)
+
+
+_plantillas = {}
+
+
+def registrar_plantilla(plantilla):
+    """
+    Registra una instancia de plantilla bajo su atributo `nombre`
+    """
+    _plantillas[plantilla.nombre] = plantilla
+    return plantilla
+
+
+registrar_plantilla(PlantillaFactura())
+
+
+def _plantilla(nombre):
+    if nombre not in _plantillas:
+        raise ValueError(f"Plantilla desconocida: {nombre}")
+    return _plantillas[nombre]
+
+
+def render_factura(factura, plantilla="clasica", tiempos=None):
+    """
+    Genera el PDF de la factura con la plantilla registrada indicada
+    """
+    return _plantilla(plantilla).render(factura, tiempos)
+
+
+def render_factura_en(factura, destino, plantilla="clasica", tiempos=None):
+    """
+    Como render_factura, pero escribe el PDF en el objeto archivo `destino`
+    """
+    _plantilla(plantilla).render_en(factura, destino, tiempos)
+
+
+def es_factura_grande(factura):
+    """
+    Indica si la factura supera el umbral de líneas del modo factura grande
+    """
+    detalle = factura.get("detalle") or factura.get("items") or []
+    return len(detalle) > FACTURA_GRANDE_UMBRAL
@@ -0,0 +1,34 @@
+"""Configuración de gunicorn para el modo producción del frontend.
+
+Los workers usan hilos (gthread): las peticiones pasan casi todo el tiempo
+esperando al backend o al pool de renders, que es quien ocupa los núcleos.
+
+Las métricas de Prometheus se comparten entre workers a través de
+`PROMETHEUS_MULTIPROC_DIR`, que se vacía al arrancar el master.
+"""
+
+import os
+import shutil
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:3000")
+workers = int(os.getenv("WEB_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "16"))
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+accesslog = os.getenv("WEB_ACCESSLOG", "-") or None
+
+# Debe estar definido antes de que los workers importen prometheus_client
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/metricas_frontend")
+
+
+def on_starting(server):
+    directorio = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,217 @@
+"""Generación de facturas en lote.
+
+Las facturas se consultan al backend por bloques mediante su API de lote en
+NDJSON, se renderizan en el pool de procesos compartido y el ZIP resultante se
+transmite al cliente a medida que cada PDF termina, de modo que el lote
+completo nunca se mantiene en memoria.
+"""
+
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from requests import RequestException
+
+import renderizador
+from cliente_backend import BackendNoDisponible
+from factura_pdf import render_factura
+from renderizador import RENDER_PROCESOS, RenderSaturado
+
+MAX_FACTURAS_LOTE = int(os.getenv("MAX_FACTURAS_LOTE", "10000"))
+TAMANO_BLOQUE_BACKEND = int(os.getenv("TAMANO_BLOQUE_BACKEND", "500"))
+
+
+class ErrorLote(Exception):
+    """Fallo al obtener un bloque de facturas del backend."""
+
+
+def parsear_ids(ids=None, desde=None, hasta=None):
+    """
+    Construye la lista de ids a partir de una lista (o texto separado por
+    comas) y/o de un rango numérico inclusivo desde-hasta
+    """
+    if isinstance(ids, str):
+        ids = ids.split(",")
+    elif ids is not None and not isinstance(ids, list):
+        raise ValueError("ids debe ser una lista o un texto separado por comas")
+    resultado = [str(i).strip() for i in ids or [] if str(i).strip()]
+
+    if desde not in (None, "") or hasta not in (None, ""):
+        try:
+            inicio, fin = int(desde), int(hasta)
+        except (TypeError, ValueError):
+            raise ValueError("desde y hasta deben ser enteros") from None
+        if fin < inicio:
+            raise ValueError("hasta debe ser mayor o igual que desde")
+        if fin - inicio + 1 > MAX_FACTURAS_LOTE:
+            raise ValueError(f"El lote no puede superar {MAX_FACTURAS_LOTE} facturas")
+        resultado.extend(str(n) for n in range(inicio, fin + 1))
+
+    if not resultado:
+        raise ValueError("Debe indicar ids o un rango desde-hasta")
+    if len(resultado) > MAX_FACTURAS_LOTE:
+        raise ValueError(f"El lote no puede superar {MAX_FACTURAS_LOTE} facturas")
+    return resultado
+
+
+def parsear_concurrencia(valor):
+    """
+    Límite de facturas en vuelo, o None si no se indica
+    """
+    if valor in (None, ""):
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, (int, str)):
+        raise ValueError("concurrencia debe ser un entero")
+    try:
+        return int(valor) or None
+    except ValueError:
+        raise ValueError("concurrencia debe ser un entero") from None
+
+
+def iterar_facturas(backend, ids, tamano_bloque=TAMANO_BLOQUE_BACKEND):
+    """
+    Consulta las facturas en bloques contra `/facturas/v1/batch/stream` y
+    genera tuplas (id, factura, error) a medida que llegan (en NDJSON o en
+    MessagePack, según lo que devuelva el backend).
+
+    Si un bloque falla, sus ids pendientes se devuelven con el error en lugar
+    de interrumpir la iteración.
+    """
+    for i in range(0, len(ids), tamano_bloque):
+        bloque = ids[i : i + tamano_bloque]
+        recibidas = 0
+        try:
+            with backend.get(
+                "/facturas/v1/batch/stream", params={"numeros": bloque}, stream=True
+            ) as resp:
+                if resp.status_code != 200:
+                    raise ErrorLote(f"El backend respondió {resp.status_code}")
+                for factura in backend.iterar_objetos(resp):
+                    if recibidas < len(bloque):
+                        yield bloque[recibidas], factura, None
+                        recibidas += 1
+            if recibidas < len(bloque):
+                raise ErrorLote("Respuesta del backend incompleta")
+        except (BackendNoDisponible, ErrorLote, RequestException, ValueError) as e:
+            for id_factura in bloque[recibidas:]:
+                yield id_factura, None, f"{type(e).__name__}: {e}"
+
+
+def renderizar(id_factura, factura):
+    """
+    Genera el PDF de una factura.
+
+    Se ejecuta en un proceso del pool; devuelve (id, pdf, error) en lugar de
+    propagar excepciones para que un fallo no interrumpa el lote.
+    """
+    try:
+        return id_factura, render_factura(factura), None
+    except Exception as e:
+        return id_factura, None, f"{type(e).__name__}: {e}"
+
+
+def _nombre_seguro(id_factura):
+    return str(id_factura).replace("/", "_").replace("\\", "_")
+
+
+class _SalidaZip:
+    """Destino no posicionable para ZipFile que acumula los bytes escritos."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def generar_zip(ids, backend, concurrencia=None):
+    """
+    Genera el ZIP del lote como un iterador de fragmentos de bytes.
+
+    Como mucho `concurrencia` facturas están en vuelo a la vez; cada PDF se
+    añade al archivo en cuanto termina. Los renders pasan por la cola acotada
+    del renderizador: si no hay cupo antes de emitir el primer fragmento se
+    lanza RenderSaturado, y después una factura sin cupo, que supera
+    RENDER_TIMEOUT o cuyo proceso de render muere cuenta como fallo suyo. Los
+    fallos se registran como `errores/factura_<id>.txt` y al final se escribe
+    `resumen.json`.
+    """
+    limite = max(1, min(concurrencia or RENDER_PROCESOS, RENDER_PROCESOS))
+    salida = _SalidaZip()
+    pendientes = iterar_facturas(backend, ids)
+    # futuro -> (id_factura, instante en que se agota su tiempo)
+    en_vuelo = {}
+    correctas, errores = 0, {}
+    emitido = False
+
+    def registrar_error(zf, id_factura, error):
+        zf.writestr(f"errores/factura_{_nombre_seguro(id_factura)}.txt", error)
+        errores[id_factura] = error
+
+    def enviar_siguientes(zf):
+        while len(en_vuelo) < limite:
+            id_factura, factura, error = next(pendientes, (None, None, None))
+            if id_factura is None:
+                return
+            if error is None:
+                try:
+                    futuro = renderizador.enviar(renderizar, id_factura, factura)
+                except Exception as e:
+                    if isinstance(e, RenderSaturado) and not emitido:
+                        raise
+                    registrar_error(zf, id_factura, f"{type(e).__name__}: {e}")
+                    continue
+                vence = time.monotonic() + renderizador.RENDER_TIMEOUT
+                en_vuelo[futuro] = (id_factura, vence)
+            else:
+                registrar_error(zf, id_factura, error)
+
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_STORED) as zf:
+        enviar_siguientes(zf)
+        while en_vuelo:
+            proximo = min(vence for _, vence in en_vuelo.values())
+            terminadas, _ = wait(
+                en_vuelo,
+                timeout=max(0, proximo - time.monotonic()),
+                return_when=FIRST_COMPLETED,
+            )
+            for futuro in terminadas:
+                id_factura, _ = en_vuelo.pop(futuro)
+                try:
+                    _, pdf, error = renderizador.resultado(futuro, 0)
+                except Exception as e:
+                    # El proceso murió (BrokenProcessPool): el pool se
+                    # descarta y las siguientes facturas usan otro
+                    pdf, error = None, f"{type(e).__name__}: {e}"
+                if error is None:
+                    zf.writestr(f"factura_{_nombre_seguro(id_factura)}.pdf", pdf)
+                    correctas += 1
+                else:
+                    registrar_error(zf, id_factura, error)
+            ahora = time.monotonic()
+            for futuro, (id_factura, vence) in list(en_vuelo.items()):
+                if vence <= ahora:
+                    del en_vuelo[futuro]
+                    registrar_error(
+                        zf,
+                        id_factura,
+                        f"TimeoutError: el render superó {renderizador.RENDER_TIMEOUT} s",
+                    )
+            enviar_siguientes(zf)
+            emitido = True
+            yield salida.vaciar()
+
+        resumen = {"total": len(ids), "correctas": correctas, "errores": errores}
+        zf.writestr("resumen.json", json.dumps(resumen, ensure_ascii=False, indent=2))
+    yield salida.vaciar()
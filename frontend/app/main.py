@@ -1,17 +1,40 @@
-from flask import Flask, render_template, request, abort, send_file
-import requests
+from flask import Flask, Response, jsonify, render_template, request, abort, send_file
+from flask import url_for
+from werkzeug.exceptions import HTTPException
 import os
+import shutil
+import signal
+import threading
+import time
 from io import BytesIO
+from itertools import chain
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER
+import lote
+import metricas_web
+import renderizador
+from cache_pdf import CachePDF, clave_pdf
+from cliente_backend import BackendNoDisponible, ClienteBackend
+from factura_pdf import es_factura_grande, moneda, normalizar_factura
+from trabajos import ColaLlena, ColaTrabajos
+from vuelo_unico import VueloUnico
 
 app = Flask(__name__)
-BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
+app.add_template_filter(moneda)
+metricas_web.instrumentar(app)
+backend = ClienteBackend()
+
+cache_pdf = CachePDF(
+    capacidad_memoria=int(os.getenv("CACHE_PDF_TAMANO", "256")),
+    directorio=os.getenv("CACHE_PDF_DIR") or None,
+    max_bytes_disco=int(os.getenv("CACHE_PDF_DISCO_MAX_BYTES", str(500 * 1024**2))),
+)
+trabajos_pdf = ColaTrabajos()
+# Peticiones simultáneas de la misma factura comparten consulta y render
+consultas_en_curso = VueloUnico()
+renders_en_curso = VueloUnico()
+preparado = threading.Event()
+segundos_preparacion = None
+PREPARACION_INTENTOS = int(os.getenv("PREPARACION_INTENTOS", "5"))
 
 
 @app.route("/")
@@ -19,491 +42,484 @@ def index():
     return render_template("index.html")
 
 
-@app.route("/generar-pdf", methods=["POST"])
-def generar_pdf():
+def consultar_factura(id_factura):
+    """
+    Obtiene la factura del backend; aborta con su código si no responde 200.
+
+    Si ya hay una consulta en curso de la misma factura, espera a esa
+    """
+    factura, compartida = consultas_en_curso.ejecutar(
+        id_factura, _consultar_factura, id_factura
+    )
+    if compartida:
+        metricas_web.COALESCIDAS.labels("consulta").inc()
+    return factura
+
+
+def _consultar_factura(id_factura):
+    inicio = time.perf_counter()
+    resp = backend.get(f"/facturas/v1/{id_factura}")
+    if resp.status_code != 200:
+        metricas_web.ERRORES.labels("backend_http").inc()
+        abort(resp.status_code)
+
+    factura = backend.decodificar(resp)
+    metricas_web.DURACION_ETAPA.labels("consulta_backend").observe(
+        time.perf_counter() - inicio
+    )
+    return factura
+
+
+def enviar_pdf(as_attachment):
+    """
+    Consulta la factura, la renderiza (o la toma de la caché de PDF) y la envía.
+
+    La clave de la caché se usa como ETag, así que una petición con
+    `If-None-Match` coincidente recibe 304 sin renderizar nada. Si la factura
+    es grande y el cliente envía `Prefer: respond-async`, el render se encola
+    como trabajo y se responde 202 (o 429 si la cola está llena).
+    """
     try:
-        id_factura = request.form.get("id_factura")
+        id_factura = request.values.get("id_factura")
         if not id_factura:
             abort(400, description="Falta id_factura en el formulario")
 
-        resp = requests.get(f"{BACKEND_URL}/facturas/v1/{id_factura}")
-        if resp.status_code != 200:
-            abort(resp.status_code)
-
-        factura = resp.json()
-
-        # Normalizar detalle: backend puede usar 'detalle' o 'items'
-        detalle = factura.get("detalle") or factura.get("items") or []
-
-        # Preparar buffer y documento con título personalizado
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            title=f"Factura #{id_factura}",
-            author=factura.get("empresa", {}).get("nombre", ""),
-            leftMargin=50,
-            rightMargin=50,
-            topMargin=50,
-            bottomMargin=50,
-        )
-        styles = getSampleStyleSheet()
-        elements = []
-
-        # Encabezado: Título y Fecha
-        title_style = ParagraphStyle(
-            "TitleStyle",
-            parent=styles["Heading1"],
-            fontSize=24,
-            textColor=colors.HexColor("#2C3E50"),
-            spaceAfter=6,
-            alignment=TA_CENTER,
-            fontName="Helvetica-Bold",
-        )
-        elements.append(Paragraph(f"FACTURA #{id_factura}", title_style))
-
-        fecha_style = ParagraphStyle(
-            "FechaStyle",
-            parent=styles["Normal"],
-            fontSize=11,
-            textColor=colors.HexColor("#7F8C8D"),
-            spaceAfter=20,
-            alignment=TA_CENTER,
-        )
-        fecha_emision = factura.get("fecha_emision", "-")
-        elements.append(Paragraph(f"Fecha de emisión: {fecha_emision}", fecha_style))
-        elements.append(Spacer(1, 20))
-
-        # Estilos para secciones
-        section_style = ParagraphStyle(
-            "SectionStyle",
-            parent=styles["Heading2"],
-            fontSize=14,
-            textColor=colors.white,
-            backColor=colors.HexColor("#3498DB"),
-            spaceAfter=10,
-            spaceBefore=10,
-            leftIndent=10,
-            fontName="Helvetica-Bold",
-        )
-
-        # Empresa
-        elements.append(Paragraph("INFORMACIÓN DE LA EMPRESA", section_style))
-        empresa = factura.get("empresa") or {}
-        empresa_rows = [
-            ["Nombre:", empresa.get("nombre", "-")],
-            ["NIT:", empresa.get("nit", "-")],
-            ["Dirección:", empresa.get("direccion", "-")],
-            ["Teléfono:", empresa.get("telefono", "-")],
-            ["Email:", empresa.get("email", "-")],
-        ]
-        empresa_table = Table(empresa_rows, colWidths=[1.5 * inch, 4.5 * inch])
-        empresa_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#ECF0F1")),
-                    ("TEXTCOLOR", (0, 0), (0, -1), colors.HexColor("#2C3E50")),
-                    ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                    ("ALIGN", (0, 0), (0, -1), "RIGHT"),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                ]
-            )
-        )
-        elements.append(empresa_table)
-        elements.append(Spacer(1, 20))
-
-        # Cliente
-        elements.append(Paragraph("INFORMACIÓN DEL CLIENTE", section_style))
-        cliente = factura.get("cliente") or {}
-        cliente_rows = [
-            ["Nombre:", cliente.get("nombre", "-")],
-            ["Documento:", cliente.get("documento", cliente.get("dni", "-"))],
-            ["Dirección:", cliente.get("direccion", "-")],
-            ["Teléfono:", cliente.get("telefono", "-")],
-        ]
-        cliente_table = Table(cliente_rows, colWidths=[1.5 * inch, 4.5 * inch])
-        cliente_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#ECF0F1")),
-                    ("TEXTCOLOR", (0, 0), (0, -1), colors.HexColor("#2C3E50")),
-                    ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                    ("ALIGN", (0, 0), (0, -1), "RIGHT"),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                ]
-            )
-        )
-        elements.append(cliente_table)
-        elements.append(Spacer(1, 20))
-
-        # Detalle con estilo mejorado
-        detalle_section_style = ParagraphStyle(
-            "DetalleSection",
-            parent=styles["Heading2"],
-            fontSize=14,
-            textColor=colors.HexColor("#2C3E50"),
-            spaceAfter=10,
-            spaceBefore=10,
-            fontName="Helvetica-Bold",
-        )
-        elements.append(Paragraph("DETALLE DE LA FACTURA", detalle_section_style))
-
-        header = ["Cantidad", "Descripción", "Precio Unit.", "Total"]
-        data = [header]
-        for it in detalle:
-            if isinstance(it, dict):
-                qty = it.get("cantidad", it.get("qty", 1))
-                desc = it.get("descripcion", it.get("descripcion_item", "-"))
-                price = it.get("precio_unitario", it.get("precio", 0.0))
-            else:
-                qty = 1
-                desc = str(it)
-                price = 0.0
-            line_total = round(qty * price, 2)
-            data.append([str(qty), desc, f"${price:,.2f}", f"${line_total:,.2f}"])
-
-        detalle_table = Table(
-            data, colWidths=[1.2 * inch, 3 * inch, 1.4 * inch, 1.4 * inch]
-        )
-        detalle_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#3498DB")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, 0), 12),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#ECF0F1")),
-                    ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                    ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 1), (-1, -1), 10),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                ]
-            )
-        )
-        elements.append(detalle_table)
-        elements.append(Spacer(1, 20))
-
-        # Totales con mejor diseño
-        subtotal = factura.get("subtotal")
-        impuesto = factura.get("impuesto")
-        total = factura.get("total")
-
-        if subtotal is None:
-            subtotal = sum(
-                (
-                    it.get("cantidad", it.get("qty", 0))
-                    * it.get("precio_unitario", it.get("precio", 0.0))
+        factura = consultar_factura(id_factura)
+        clave = clave_pdf(id_factura, factura)
+        if request.if_none_match.contains_weak(clave):
+            respuesta = Response(status=304)
+            respuesta.set_etag(clave)
+            return respuesta
+
+        if es_factura_grande(factura):
+            if "respond-async" in request.headers.get("Prefer", ""):
+                return encolar(
+                    tarea_pdf(id_factura),
+                    "application/pdf",
+                    f"factura_{id_factura}.pdf",
                 )
-                for it in detalle
-                if isinstance(it, dict)
-            )
-        if impuesto is None:
-            impuesto = round(subtotal * (factura.get("tax_rate") or 0.21), 2)
-        if total is None:
-            total = round(subtotal + impuesto, 2)
-
-        totales_data = [
-            ["Subtotal:", f"${subtotal:,.2f}"],
-            ["IVA (19%):", f"${impuesto:,.2f}"],
-            ["Total:", f"${total:,.2f}"],
-        ]
-
-        totales_table = Table(totales_data, colWidths=[2 * inch, 2 * inch])
-        totales_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("ALIGN", (0, 0), (0, -1), "RIGHT"),
-                    ("ALIGN", (1, 0), (1, -1), "RIGHT"),
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 11),
-                    ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#3498DB")),
-                    ("TEXTCOLOR", (0, -1), (-1, -1), colors.whitesmoke),
-                    ("FONTSIZE", (0, -1), (-1, -1), 13),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                ]
-            )
-        )
-        elements.append(totales_table)
+            return enviar_pdf_grande(id_factura, factura, clave, as_attachment)
 
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
-
-        return send_file(
-            buffer,
+        pdf = pdf_cacheado(clave, factura)
+        respuesta = send_file(
+            BytesIO(pdf.contenido),
             download_name=f"factura_{id_factura}.pdf",
             mimetype="application/pdf",
-            as_attachment=True,
+            as_attachment=as_attachment,
+            etag=pdf.etag,
+            last_modified=pdf.modificado,
         )
-
-    except requests.exceptions.ConnectionError:
-        abort(503, description="No se pudo conectar con backend")
+        # El navegador guarda el PDF pero lo revalida siempre con el ETag
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+        return respuesta
+
+    except HTTPException:
+        raise
+    except BackendNoDisponible as e:
+        metricas_web.ERRORES.labels("backend_no_disponible").inc()
+        abort(503, description=str(e))
+    except renderizador.RenderSaturado as e:
+        metricas_web.ERRORES.labels("render_saturado").inc()
+        abort(503, description=str(e))
     except Exception as e:
+        metricas_web.ERRORES.labels("interno").inc()
         abort(500, description=str(e))
 
 
-@app.route("/vista-previa-pdf", methods=["POST"])
-def vista_previa_pdf():
+def pdf_cacheado(clave, factura):
     """
-    Genera el PDF para vista previa (sin descarga automática)
+    Devuelve el PDF de la caché, renderizándolo y guardándolo si no está.
+
+    Las peticiones que llegan mientras se renderiza el mismo PDF esperan a
+    ese render en lugar de lanzar otro
+    """
+    pdf, compartido = renders_en_curso.ejecutar(clave, _pdf_cacheado, clave, factura)
+    if compartido:
+        metricas_web.COALESCIDAS.labels("render").inc()
+    return pdf
+
+
+def _pdf_cacheado(clave, factura):
+    pdf = cache_pdf.obtener(clave)
+    metricas_web.CACHE_PDF.labels("miss" if pdf is None else "hit").inc()
+    if pdf is None:
+        pdf = cache_pdf.guardar(clave, renderizador.renderizar(factura))
+    return pdf
+
+
+def enviar_pdf_grande(id_factura, factura, clave, as_attachment):
+    """
+    Renderiza una factura grande a un archivo temporal y la transmite por
+    bloques (sin Content-Length, con transfer-encoding chunked); no pasa por
+    la caché de PDF para no llenarla con documentos enormes
+    """
+    ruta = renderizador.renderizar_a_archivo(factura)
+    disposicion = "attachment" if as_attachment else "inline"
+    respuesta = Response(
+        renderizador.transmitir(ruta),
+        mimetype="application/pdf",
+        headers={
+            "Content-Disposition": f'{disposicion}; filename="factura_{id_factura}.pdf"'
+        },
+    )
+    # Se borra al cerrar la respuesta, aunque el cliente corte la descarga
+    respuesta.call_on_close(lambda: renderizador.borrar(ruta))
+    respuesta.set_etag(clave)
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+@app.route("/generar-pdf", methods=["GET", "POST"])
+def generar_pdf():
+    return enviar_pdf(as_attachment=True)
+
+
+@app.route("/generar-pdf-lote", methods=["POST"])
+def generar_pdf_lote():
     """
+    Genera un ZIP con los PDF de varias facturas.
+
+    Acepta JSON o formulario con `ids` (lista o texto separado por comas) y/o
+    un rango `desde`-`hasta`, más un límite opcional de `concurrencia`.
+    """
+    datos = request.get_json(silent=True) or request.form
     try:
-        id_factura = request.form.get("id_factura")
-        if not id_factura:
-            abort(400, description="Falta id_factura en el formulario")
+        ids = lote.parsear_ids(datos.get("ids"), datos.get("desde"), datos.get("hasta"))
+        concurrencia = lote.parsear_concurrencia(datos.get("concurrencia"))
+    except ValueError as e:
+        abort(400, description=str(e))
 
-        resp = requests.get(f"{BACKEND_URL}/facturas/v1/{id_factura}")
-        if resp.status_code != 200:
-            abort(resp.status_code)
-
-        factura = resp.json()
-
-        # Normalizar detalle: backend puede usar 'detalle' o 'items'
-        detalle = factura.get("detalle") or factura.get("items") or []
-
-        # Preparar buffer y documento con título personalizado
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=letter,
-            title=f"Factura #{id_factura}",
-            author=factura.get("empresa", {}).get("nombre", ""),
-            leftMargin=50,
-            rightMargin=50,
-            topMargin=50,
-            bottomMargin=50,
-        )
-        styles = getSampleStyleSheet()
-        elements = []
-
-        # Encabezado: Título y Fecha
-        title_style = ParagraphStyle(
-            "TitleStyle",
-            parent=styles["Heading1"],
-            fontSize=24,
-            textColor=colors.HexColor("#2C3E50"),
-            spaceAfter=6,
-            alignment=TA_CENTER,
-            fontName="Helvetica-Bold",
-        )
-        elements.append(Paragraph(f"FACTURA #{id_factura}", title_style))
-
-        fecha_style = ParagraphStyle(
-            "FechaStyle",
-            parent=styles["Normal"],
-            fontSize=11,
-            textColor=colors.HexColor("#7F8C8D"),
-            spaceAfter=20,
-            alignment=TA_CENTER,
-        )
-        fecha_emision = factura.get("fecha_emision", "-")
-        elements.append(Paragraph(f"Fecha de emisión: {fecha_emision}", fecha_style))
-        elements.append(Spacer(1, 20))
-
-        # Estilos para secciones
-        section_style = ParagraphStyle(
-            "SectionStyle",
-            parent=styles["Heading2"],
-            fontSize=14,
-            textColor=colors.white,
-            backColor=colors.HexColor("#3498DB"),
-            spaceAfter=10,
-            spaceBefore=10,
-            leftIndent=10,
-            fontName="Helvetica-Bold",
-        )
+    bloques = lote.generar_zip(ids, backend, concurrencia)
+    try:
+        # El primer fragmento se genera antes de responder: si no hay cupo en
+        # la cola de renders aún se puede contestar 503
+        primero = next(bloques)
+    except renderizador.RenderSaturado as e:
+        metricas_web.ERRORES.labels("render_saturado").inc()
+        abort(503, description=str(e))
+    return Response(
+        chain([primero], bloques),
+        mimetype="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="facturas.zip"'},
+    )
+
+
+def tarea_pdf(id_factura):
+    """
+    Tarea de la cola que escribe el PDF de una factura
+    """
 
-        # Empresa
-        elements.append(Paragraph("INFORMACIÓN DE LA EMPRESA", section_style))
-        empresa = factura.get("empresa") or {}
-        empresa_rows = [
-            ["Nombre:", empresa.get("nombre", "-")],
-            ["NIT:", empresa.get("nit", "-")],
-            ["Dirección:", empresa.get("direccion", "-")],
-            ["Teléfono:", empresa.get("telefono", "-")],
-            ["Email:", empresa.get("email", "-")],
-        ]
-        empresa_table = Table(empresa_rows, colWidths=[1.5 * inch, 4.5 * inch])
-        empresa_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#ECF0F1")),
-                    ("TEXTCOLOR", (0, 0), (0, -1), colors.HexColor("#2C3E50")),
-                    ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                    ("ALIGN", (0, 0), (0, -1), "RIGHT"),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                ]
-            )
-        )
-        elements.append(empresa_table)
-        elements.append(Spacer(1, 20))
-
-        # Cliente
-        elements.append(Paragraph("INFORMACIÓN DEL CLIENTE", section_style))
-        cliente = factura.get("cliente") or {}
-        cliente_rows = [
-            ["Nombre:", cliente.get("nombre", "-")],
-            ["Documento:", cliente.get("documento", cliente.get("dni", "-"))],
-            ["Dirección:", cliente.get("direccion", "-")],
-            ["Teléfono:", cliente.get("telefono", "-")],
-        ]
-        cliente_table = Table(cliente_rows, colWidths=[1.5 * inch, 4.5 * inch])
-        cliente_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#ECF0F1")),
-                    ("TEXTCOLOR", (0, 0), (0, -1), colors.HexColor("#2C3E50")),
-                    ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
-                    ("ALIGN", (0, 0), (0, -1), "RIGHT"),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                ]
-            )
-        )
-        elements.append(cliente_table)
-        elements.append(Spacer(1, 20))
-
-        # Detalle con estilo mejorado
-        detalle_section_style = ParagraphStyle(
-            "DetalleSection",
-            parent=styles["Heading2"],
-            fontSize=14,
-            textColor=colors.HexColor("#2C3E50"),
-            spaceAfter=10,
-            spaceBefore=10,
-            fontName="Helvetica-Bold",
-        )
-        elements.append(Paragraph("DETALLE DE LA FACTURA", detalle_section_style))
-
-        header = ["Cantidad", "Descripción", "Precio Unit.", "Total"]
-        data = [header]
-        for it in detalle:
-            if isinstance(it, dict):
-                qty = it.get("cantidad", it.get("qty", 1))
-                desc = it.get("descripcion", it.get("descripcion_item", "-"))
-                price = it.get("precio_unitario", it.get("precio", 0.0))
-            else:
-                qty = 1
-                desc = str(it)
-                price = 0.0
-            line_total = round(qty * price, 2)
-            data.append([str(qty), desc, f"${price:,.2f}", f"${line_total:,.2f}"])
-
-        detalle_table = Table(
-            data, colWidths=[1.2 * inch, 3 * inch, 1.4 * inch, 1.4 * inch]
-        )
-        detalle_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#3498DB")),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, 0), 12),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("BACKGROUND", (0, 1), (-1, -1), colors.HexColor("#ECF0F1")),
-                    ("TEXTCOLOR", (0, 1), (-1, -1), colors.black),
-                    ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 1), (-1, -1), 10),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                ]
+    def tarea(archivo):
+        resp = backend.get(f"/facturas/v1/{id_factura}")
+        if resp.status_code != 200:
+            raise ValueError(f"El backend respondió {resp.status_code}")
+        factura = backend.decodificar(resp)
+        if not es_factura_grande(factura):
+            archivo.write(
+                pdf_cacheado(clave_pdf(id_factura, factura), factura).contenido
             )
-        )
-        elements.append(detalle_table)
-        elements.append(Spacer(1, 20))
-
-        # Totales con mejor diseño
-        subtotal = factura.get("subtotal")
-        impuesto = factura.get("impuesto")
-        total = factura.get("total")
-
-        if subtotal is None:
-            subtotal = sum(
-                (
-                    it.get("cantidad", it.get("qty", 0))
-                    * it.get("precio_unitario", it.get("precio", 0.0))
-                )
-                for it in detalle
-                if isinstance(it, dict)
+            return
+        ruta = renderizador.renderizar_a_archivo(factura)
+        try:
+            with open(ruta, "rb") as origen:
+                shutil.copyfileobj(origen, archivo)
+        finally:
+            renderizador.borrar(ruta)
+
+    return tarea
+
+
+def tarea_lote(ids, concurrencia):
+    """
+    Tarea de la cola que escribe el ZIP de un lote de facturas
+    """
+
+    def tarea(archivo):
+        for bloque in lote.generar_zip(ids, backend, concurrencia):
+            archivo.write(bloque)
+
+    return tarea
+
+
+def modulo_resumen():
+    """
+    Módulo del informe resumen; numpy solo se carga cuando se pide uno
+    """
+    import resumen
+
+    return resumen
+
+
+def pdf_resumen(desde, hasta):
+    """
+    Agrega las facturas desde-hasta a medida que llegan del backend y
+    renderiza el informe resumen
+    """
+    inicio = time.perf_counter()
+    agregado = modulo_resumen().agregar_rango(backend, desde, hasta)
+    agregado_en = time.perf_counter()
+    pdf = renderizador.renderizar_resumen(agregado, desde, hasta)
+    metricas_web.observar_etapas(
+        {
+            "resumen_agregacion": agregado_en - inicio,
+            "resumen_render": time.perf_counter() - agregado_en,
+        }
+    )
+    return pdf
+
+
+@app.route("/generar-resumen", methods=["GET", "POST"])
+def generar_resumen():
+    """
+    Informe resumen en PDF (número de facturas, subtotal, IVA y total por mes
+    y por cliente) de las facturas `desde`-`hasta`. Para rangos grandes es
+    mejor encolarlo en /trabajos con `resumen`
+    """
+    resumen = modulo_resumen()
+    datos = request.get_json(silent=True) or request.values
+    try:
+        desde, hasta = resumen.parsear_rango(datos.get("desde"), datos.get("hasta"))
+    except ValueError as e:
+        abort(400, description=str(e))
+    try:
+        pdf = pdf_resumen(desde, hasta)
+    except BackendNoDisponible as e:
+        metricas_web.ERRORES.labels("backend_no_disponible").inc()
+        abort(503, description=str(e))
+    except resumen.ErrorResumen as e:
+        metricas_web.ERRORES.labels("backend_http").inc()
+        abort(502, description=str(e))
+    except renderizador.RenderSaturado as e:
+        metricas_web.ERRORES.labels("render_saturado").inc()
+        abort(503, description=str(e))
+    return send_file(
+        BytesIO(pdf),
+        download_name=f"resumen_{desde}_{hasta}.pdf",
+        mimetype="application/pdf",
+        as_attachment=True,
+    )
+
+
+def tarea_resumen(desde, hasta):
+    """
+    Tarea de la cola que escribe el informe resumen
+    """
+
+    def tarea(archivo):
+        archivo.write(pdf_resumen(desde, hasta))
+
+    return tarea
+
+
+def estado_trabajo_publico(estado):
+    return {
+        **estado,
+        "url_estado": url_for("estado_trabajo", id_trabajo=estado["id"]),
+        "url_resultado": url_for("resultado_trabajo", id_trabajo=estado["id"]),
+    }
+
+
+@app.route("/trabajos", methods=["POST"])
+def crear_trabajo():
+    """
+    Encola la generación de una factura (`id_factura`, devuelve un PDF), del
+    informe resumen (`resumen` con `desde`-`hasta`, devuelve un PDF) o de un
+    lote (`ids` y/o `desde`-`hasta`, devuelve un ZIP) y responde 202 con el
+    id del trabajo; 429 con Retry-After si la cola está llena
+    """
+    datos = request.get_json(silent=True) or request.form
+    try:
+        if datos.get("id_factura"):
+            id_factura = str(datos["id_factura"]).strip()
+            tarea = tarea_pdf(id_factura)
+            tipo, nombre, total = "application/pdf", f"factura_{id_factura}.pdf", 1
+        elif datos.get("resumen"):
+            desde, hasta = modulo_resumen().parsear_rango(
+                datos.get("desde"), datos.get("hasta")
             )
-        if impuesto is None:
-            impuesto = round(subtotal * (factura.get("tax_rate") or 0.19), 2)
-        if total is None:
-            total = round(subtotal + impuesto, 2)
-
-        totales_data = [
-            ["Subtotal:", f"${subtotal:,.2f}"],
-            ["IVA (19%):", f"${impuesto:,.2f}"],
-            ["Total:", f"${total:,.2f}"],
-        ]
-
-        totales_table = Table(totales_data, colWidths=[2 * inch, 2 * inch])
-        totales_table.setStyle(
-            TableStyle(
-                [
-                    ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#BDC3C7")),
-                    ("ALIGN", (0, 0), (0, -1), "RIGHT"),
-                    ("ALIGN", (1, 0), (1, -1), "RIGHT"),
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 11),
-                    ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#3498DB")),
-                    ("TEXTCOLOR", (0, -1), (-1, -1), colors.whitesmoke),
-                    ("FONTSIZE", (0, -1), (-1, -1), 13),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 10),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-                ]
+            tarea = tarea_resumen(desde, hasta)
+            tipo, nombre = "application/pdf", f"resumen_{desde}_{hasta}.pdf"
+            total = hasta - desde + 1
+        else:
+            ids = lote.parsear_ids(
+                datos.get("ids"), datos.get("desde"), datos.get("hasta")
             )
-        )
-        elements.append(totales_table)
+            concurrencia = lote.parsear_concurrencia(datos.get("concurrencia"))
+            tarea = tarea_lote(ids, concurrencia)
+            tipo, nombre, total = "application/zip", "facturas.zip", len(ids)
+    except ValueError as e:
+        abort(400, description=str(e))
 
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
+    return encolar(tarea, tipo, nombre, total)
 
-        # Enviar sin forzar descarga (as_attachment=False)
-        return send_file(
-            buffer,
-            mimetype="application/pdf",
-            as_attachment=False,
-            download_name=f"factura_{id_factura}.pdf",
+
+def encolar(tarea, tipo, nombre, total=1):
+    """
+    Envía la tarea a la cola y responde 202 con el estado del trabajo, o 429
+    con Retry-After si la cola está llena
+    """
+    try:
+        estado = trabajos_pdf.enviar(tarea, tipo, nombre, total)
+    except ColaLlena as e:
+        metricas_web.ERRORES.labels("cola_llena").inc()
+        respuesta = jsonify(error=str(e))
+        respuesta.status_code = 429
+        respuesta.headers["Retry-After"] = str(e.reintentar_en)
+        return respuesta
+
+    publico = estado_trabajo_publico(estado)
+    return jsonify(publico), 202, {"Location": publico["url_estado"]}
+
+
+@app.route("/trabajos/<id_trabajo>")
+def estado_trabajo(id_trabajo):
+    """
+    Estado del trabajo: pendiente, en_curso, terminado o error
+    """
+    estado = trabajos_pdf.estado(id_trabajo)
+    if estado is None:
+        abort(404, description="Trabajo inexistente o caducado")
+    return jsonify(estado_trabajo_publico(estado))
+
+
+@app.route("/trabajos/<id_trabajo>/resultado")
+def resultado_trabajo(id_trabajo):
+    """
+    Descarga el resultado de un trabajo terminado (en línea; con
+    `?descarga=1`, como adjunto); 409 si aún no está listo o falló
+    """
+    estado = trabajos_pdf.estado(id_trabajo)
+    if estado is None:
+        abort(404, description="Trabajo inexistente o caducado")
+    if estado["estado"] != "terminado":
+        respuesta = jsonify(estado_trabajo_publico(estado))
+        respuesta.status_code = 409
+        if estado["estado"] != "error":
+            respuesta.headers["Retry-After"] = "1"
+        return respuesta
+
+    respuesta = send_file(
+        trabajos_pdf.ruta_resultado(id_trabajo),
+        mimetype=estado["tipo"],
+        download_name=estado["nombre"],
+        as_attachment=bool(request.args.get("descarga")),
+        conditional=True,
+    )
+    respuesta.cache_control.private = True
+    respuesta.cache_control.max_age = max(0, int(estado["expira"] - time.time()))
+    return respuesta
+
+
+@app.route("/vista-previa-pdf", methods=["GET", "POST"])
+def vista_previa_pdf():
+    """
+    Genera el PDF para vista previa (sin descarga automática)
+    """
+    return enviar_pdf(as_attachment=False)
+
+
+@app.route("/vista-previa-html")
+def vista_previa_html():
+    """
+    Vista previa ligera: la misma maquetación y los mismos totales que el PDF
+    en HTML, sin pasar por ReportLab. El PDF solo se genera al descargar.
+    """
+    id_factura = request.args.get("id_factura")
+    if not id_factura:
+        abort(400, description="Falta id_factura")
+    try:
+        factura = consultar_factura(id_factura)
+    except BackendNoDisponible as e:
+        metricas_web.ERRORES.labels("backend_no_disponible").inc()
+        abort(503, description=str(e))
+
+    etag = "html-" + clave_pdf(id_factura, factura)
+    if request.if_none_match.contains_weak(etag):
+        respuesta = Response(status=304)
+    else:
+        respuesta = Response(
+            render_template("factura.html", datos=normalizar_factura(factura)),
+            mimetype="text/html",
         )
+    respuesta.set_etag(etag)
+    respuesta.cache_control.private = True
+    respuesta.cache_control.no_cache = True
+    return respuesta
+
+
+@app.route("/stats")
+def stats():
+    """
+    Contadores de la caché de PDF, del cliente del backend, de las peticiones
+    agrupadas con otras en curso y de la cola de trabajos
+    """
+    return jsonify(
+        cache_pdf=cache_pdf.estadisticas(),
+        en_curso={
+            "consultas": consultas_en_curso.estadisticas(),
+            "renders": renders_en_curso.estadisticas(),
+        },
+        backend=backend.estadisticas(),
+        trabajos={"en_cola": trabajos_pdf.en_cola(), "cola_max": trabajos_pdf.cola_max},
+    )
+
+
+@app.route("/health")
+def health():
+    """
+    El proceso responde; no consulta el backend ni el pool de render
+    """
+    return jsonify(estado="ok")
+
+
+@app.route("/ready")
+def ready():
+    """
+    503 hasta que el worker termina su preparación
+    """
+    if not preparado.is_set():
+        return jsonify(estado="preparando"), 503
+    return jsonify(
+        estado="preparado", segundos_preparacion=round(segundos_preparacion, 3)
+    )
+
+
+def preparar():
+    """
+    Preparación del worker, en segundo plano para que /health responda desde
+    el primer momento: arranca los procesos de render (que renderizan una
+    factura de muestra al iniciarse) y compila las plantillas HTML.
+
+    Si falla, se reintenta con backoff exponencial; tras PREPARACION_INTENTOS
+    fallos el worker se termina para que gunicorn arranque otro
+    """
+    global segundos_preparacion
+    inicio = time.perf_counter()
+    for intento in range(1, PREPARACION_INTENTOS + 1):
+        try:
+            renderizador.preparar()
+            for plantilla in ("index.html", "factura.html"):
+                app.jinja_env.get_template(plantilla)
+            break
+        except Exception:
+            app.logger.exception(
+                "Fallo al preparar el worker (intento %d de %d)",
+                intento,
+                PREPARACION_INTENTOS,
+            )
+            if intento < PREPARACION_INTENTOS:
+                time.sleep(min(2 ** (intento - 1), 30))
+    else:
+        app.logger.critical("El worker no se pudo preparar; se termina")
+        os.kill(os.getpid(), signal.SIGTERM)
+        return
+    segundos_preparacion = time.perf_counter() - inicio
+    preparado.set()
 
-    except requests.exceptions.ConnectionError:
-        abort(503, description="No se pudo conectar con backend")
-    except Exception as e:
-        abort(500, description=str(e))
 
+threading.Thread(target=preparar, name="preparacion", daemon=True).start()
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=3000, debug=True)
@@ -0,0 +1,143 @@
+"""Métricas Prometheus del frontend.
+
+Latencia por ruta (incluido el envío de la respuesta), peticiones en curso,
+tiempo de cada etapa de un PDF (consulta al backend, espera en la cola de
+render, construcción de elementos, `doc.build` y envío), tamaño de los PDF y
+contadores de la caché, de errores y de las peticiones agrupadas con otras
+iguales en curso.
+
+Con gunicorn hay varios workers: si se define `PROMETHEUS_MULTIPROC_DIR`,
+cada proceso escribe sus valores en ese directorio y `/metrics` los agrega.
+Todas las métricas llevan etiquetas, así que los procesos de render, que
+importan este módulo a través de `renderizador`, no crean archivos propios
+mientras no observen nada.
+"""
+
+import os
+import time
+
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from werkzeug.wsgi import ClosingIterator
+
+BUCKETS_ETAPA = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+)
+BUCKETS_BYTES = tuple(2**n * 1024 for n in range(3, 17, 2))
+
+DURACION_PETICION = Histogram(
+    "frontend_peticion_segundos",
+    "Duración de las peticiones HTTP hasta terminar de enviar la respuesta",
+    ["ruta", "metodo", "estado"],
+    buckets=BUCKETS_ETAPA,
+)
+PETICIONES_EN_CURSO = Gauge(
+    "frontend_peticiones_en_curso",
+    "Peticiones HTTP en curso",
+    ["ruta"],
+    multiprocess_mode="livesum",
+)
+DURACION_ETAPA = Histogram(
+    "frontend_etapa_segundos",
+    "Duración de cada etapa de la generación de un PDF",
+    ["etapa"],
+    buckets=BUCKETS_ETAPA,
+)
+TAMANO_PDF = Histogram(
+    "frontend_pdf_bytes",
+    "Tamaño de los PDF renderizados",
+    ["modo"],
+    buckets=BUCKETS_BYTES,
+)
+CACHE_PDF = Counter(
+    "frontend_cache_pdf_total", "Consultas a la caché de PDF", ["resultado"]
+)
+ERRORES = Counter("frontend_errores_total", "Errores al generar PDF", ["tipo"])
+COALESCIDAS = Counter(
+    "frontend_coalescidas_total",
+    "Peticiones que esperaron a una consulta o render en curso en lugar de repetirlo",
+    ["operacion"],
+)
+
+
+def observar_etapas(tiempos):
+    for etapa, segundos in tiempos.items():
+        DURACION_ETAPA.labels(etapa).observe(segundos)
+
+
+def instrumentar(app):
+    """
+    Registra en la app Flask la medición por ruta y el endpoint `/metrics`
+    """
+
+    @app.before_request
+    def _inicio():
+        g.metricas_ruta = request.url_rule.rule if request.url_rule else "sin_ruta"
+        g.metricas_inicio = time.perf_counter()
+        PETICIONES_EN_CURSO.labels(g.metricas_ruta).inc()
+
+    @app.after_request
+    def _fin(respuesta):
+        ruta = g.pop("metricas_ruta", None)
+        if ruta is None:
+            return respuesta
+        inicio, fin_handler = g.metricas_inicio, time.perf_counter()
+        metodo, estado = request.method, str(respuesta.status_code)
+
+        def cerrar():
+            ahora = time.perf_counter()
+            PETICIONES_EN_CURSO.labels(ruta).dec()
+            DURACION_PETICION.labels(ruta, metodo, estado).observe(ahora - inicio)
+            if respuesta.mimetype == "application/pdf":
+                DURACION_ETAPA.labels("envio").observe(ahora - fin_handler)
+
+        # Se llama cuando el servidor termina de enviar el cuerpo. send_file
+        # marca la respuesta como direct_passthrough y Werkzeug entrega el
+        # iterable tal cual, sin los call_on_close, así que se envuelve
+        if respuesta.direct_passthrough:
+            respuesta.response = ClosingIterator(respuesta.response, cerrar)
+        else:
+            respuesta.call_on_close(cerrar)
+        return respuesta
+
+    @app.teardown_request
+    def _sin_respuesta(error):
+        # Excepción sin respuesta: after_request no llegó a ejecutarse
+        ruta = g.pop("metricas_ruta", None)
+        if ruta is not None:
+            PETICIONES_EN_CURSO.labels(ruta).dec()
+
+    @app.route("/metrics")
+    def metrics():
+        return generate_latest(registro()), 200, {"Content-Type": CONTENT_TYPE_LATEST}
+
+
+def registro():
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        agregado = CollectorRegistry()
+        multiprocess.MultiProcessCollector(agregado)
+        return agregado
+    return REGISTRY
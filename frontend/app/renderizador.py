@@ -0,0 +1,246 @@
+"""Pool de procesos para renderizar PDFs fuera del hilo de la petición.
+
+`doc.build` es CPU puro, así que los hilos del servidor solo esperan al pool
+mientras otros procesos aprovechan los núcleos. Todo render, también los de
+los lotes, pasa por `enviar`: el número de renders en cola está acotado y, si
+el pool está saturado, la petición espera como mucho `RENDER_ESPERA_MAX`
+segundos y luego falla con RenderSaturado. Un pool roto (un proceso murió) se
+descarta y el siguiente render crea otro.
+
+Las facturas grandes no vuelven al proceso padre como bytes: el proceso de
+render escribe el PDF en un archivo temporal y la respuesta lo transmite por
+bloques, así que el documento nunca se mantiene entero en memoria.
+
+Con forkserver, el servidor de procesos importa de antemano este módulo y las
+plantillas, de modo que cada proceso de render nace con ReportLab cargado; al
+arrancar, además, renderiza una factura de muestra para cargar las métricas de
+las fuentes antes de su primera petición. `preparar` arranca todos los
+procesos del pool durante la preparación del worker.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import metricas_web
+from factura_pdf import render_factura, render_factura_en
+
+RENDER_PROCESOS = int(os.getenv("RENDER_PROCESOS", "0")) or os.cpu_count() or 1
+RENDER_COLA_MAX = int(os.getenv("RENDER_COLA_MAX", str(4 * RENDER_PROCESOS)))
+RENDER_ESPERA_MAX = float(os.getenv("RENDER_ESPERA_MAX", "10"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "60"))
+# forkserver evita hacer fork de un proceso con hilos del servidor en marcha
+RENDER_INICIO = os.getenv("RENDER_INICIO", "forkserver")
+RENDER_TMP_DIR = os.getenv("RENDER_TMP_DIR") or None
+TAMANO_BLOQUE_ENVIO = 64 * 1024
+# Módulos de las tareas del pool, importados una vez en el servidor forkserver
+MODULOS_PRECARGA = ["renderizador", "factura_lienzo", "lote"]
+FACTURA_MUESTRA = {
+    "numero_factura": "MUESTRA",
+    "fecha_emision": "2025-01-01",
+    "empresa": {"nombre": "Empresa", "direccion": "-", "telefono": "-"},
+    "cliente": {"nombre": "Cliente", "direccion": "-", "documento": 1},
+    "detalle": [{"descripcion": "Muestra", "cantidad": 1, "precio_unitario": 1.0}],
+}
+
+_pool = None
+_lock_pool = threading.Lock()
+_cupos = threading.BoundedSemaphore(RENDER_COLA_MAX)
+
+
+class RenderSaturado(Exception):
+    """No hay cupo en la cola de renders."""
+
+
+def obtener_pool():
+    """
+    Devuelve el pool de procesos del worker, creándolo en el primer uso
+    """
+    global _pool
+    with _lock_pool:
+        if _pool is None:
+            contexto = multiprocessing.get_context(RENDER_INICIO)
+            if RENDER_INICIO == "forkserver":
+                contexto.set_forkserver_preload(MODULOS_PRECARGA)
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_PROCESOS,
+                mp_context=contexto,
+                initializer=_preparar_proceso,
+            )
+        return _pool
+
+
+def _preparar_proceso():
+    render_factura(FACTURA_MUESTRA)
+
+
+def preparar():
+    """
+    Arranca todos los procesos de render y espera a que estén preparados;
+    si falla, descarta el pool para que el siguiente intento cree otro
+    """
+    pool = obtener_pool()
+    try:
+        for futuro in [pool.submit(os.getpid) for _ in range(RENDER_PROCESOS)]:
+            futuro.result(timeout=RENDER_TIMEOUT)
+    except Exception:
+        descartar_pool()
+        raise
+
+
+def descartar_pool(roto=None):
+    """
+    Descarta el pool (por ejemplo, si un proceso murió) para recrearlo luego.
+    Con `roto`, solo si ese sigue siendo el pool actual: un resultado tardío
+    de un pool ya sustituido no descarta el nuevo
+    """
+    global _pool
+    with _lock_pool:
+        if roto is not None and _pool is not roto:
+            return
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def enviar(funcion, *args):
+    """
+    Reserva un cupo de la cola de renders y envía la tarea al pool; devuelve
+    el futuro, que libera el cupo al terminar. Lanza RenderSaturado si no hay
+    cupo en RENDER_ESPERA_MAX segundos. Si el pool está roto, lo sustituye y
+    reintenta una vez
+    """
+    if not _cupos.acquire(timeout=RENDER_ESPERA_MAX):
+        raise RenderSaturado("Demasiados PDF en cola, inténtelo más tarde")
+    try:
+        for intento in range(2):
+            pool = obtener_pool()
+            try:
+                futuro = pool.submit(funcion, *args)
+                break
+            except BrokenProcessPool:
+                descartar_pool(pool)
+                if intento:
+                    raise
+    except BaseException:
+        _cupos.release()
+        raise
+    futuro.pool_render = pool
+    futuro.add_done_callback(lambda _: _cupos.release())
+    return futuro
+
+
+def resultado(futuro, timeout, descartar=None):
+    """
+    Espera el resultado de un futuro de `enviar`. Si el pool se rompió, lo
+    descarta para que el siguiente envío cree otro. Si se agota el tiempo, el
+    proceso de render sigue hasta terminar y nadie recoge su resultado:
+    `descartar`, si se indica, se llama entonces con él para liberar lo que
+    haya dejado
+    """
+    try:
+        return futuro.result(timeout=timeout)
+    except TimeoutError:
+        if descartar is not None:
+            futuro.add_done_callback(partial(_descartar_resultado, descartar))
+        raise
+    except BrokenProcessPool:
+        descartar_pool(futuro.pool_render)
+        raise
+
+
+def _ejecutar(funcion, factura, descartar=None):
+    """
+    Ejecuta el render en el pool y espera su resultado
+    """
+    return resultado(enviar(funcion, factura), RENDER_TIMEOUT, descartar)
+
+
+def _descartar_resultado(descartar, futuro):
+    if not futuro.cancelled() and futuro.exception() is None:
+        descartar(futuro.result())
+
+
+def _medir(funcion, factura, modo, descartar=None):
+    """
+    Ejecuta el render en el pool y registra sus etapas; el tiempo que no
+    pasó dentro del proceso de render se cuenta como espera en cola
+    """
+    inicio = time.perf_counter()
+    resultado, tiempos, tamano = _ejecutar(funcion, factura, descartar)
+    total = time.perf_counter() - inicio
+    tiempos["cola_render"] = max(0.0, total - sum(tiempos.values()))
+    metricas_web.observar_etapas(tiempos)
+    metricas_web.TAMANO_PDF.labels(modo).observe(tamano)
+    return resultado
+
+
+def _render_medido(factura):
+    tiempos = {}
+    pdf = render_factura(factura, tiempos=tiempos)
+    return pdf, tiempos, len(pdf)
+
+
+def renderizar(factura):
+    """
+    Renderiza la factura en el pool y espera el PDF
+    """
+    return _medir(_render_medido, factura, "normal")
+
+
+def _render_a_temporal(factura):
+    tiempos = {}
+    with tempfile.NamedTemporaryFile(
+        dir=RENDER_TMP_DIR, prefix="factura_", suffix=".pdf", delete=False
+    ) as archivo:
+        try:
+            render_factura_en(factura, archivo, tiempos=tiempos)
+        except BaseException:
+            os.remove(archivo.name)
+            raise
+        tamano = archivo.tell()
+    return archivo.name, tiempos, tamano
+
+
+def renderizar_a_archivo(factura):
+    """
+    Renderiza la factura en el pool a un archivo temporal y devuelve su ruta;
+    si se agota el tiempo, el archivo se borra cuando el render termine
+    """
+    return _medir(
+        _render_a_temporal,
+        factura,
+        "grande",
+        descartar=lambda resultado: borrar(resultado[0]),
+    )
+
+
+def renderizar_resumen(resumen, desde, hasta):
+    """
+    Renderiza el informe resumen en el pool y espera el PDF
+    """
+    # numpy solo se carga cuando se pide un informe
+    from resumen import render_resumen
+
+    return _ejecutar(partial(render_resumen, desde=desde, hasta=hasta), resumen)
+
+
+def transmitir(ruta):
+    """
+    Genera el contenido del archivo por bloques
+    """
+    with open(ruta, "rb") as archivo:
+        while bloque := archivo.read(TAMANO_BLOQUE_ENVIO):
+            yield bloque
+
+
+def borrar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
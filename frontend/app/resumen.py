@@ -0,0 +1,266 @@
+"""Informe resumen de facturación en PDF.
+
+Las facturas de un rango de números se piden al backend en un único stream
+(`/facturas/v1/batch/stream`) y se agregan a medida que llegan, por bloques de
+`TAMANO_BLOQUE_RESUMEN`: de cada bloque se extraen solo las columnas que hacen
+falta (mes, cliente e importes en céntimos) a arrays de numpy y se suman por
+celda (mes, cliente) con `np.bincount`. La memoria depende del número de meses
+y clientes distintos, no del de facturas, y las sumas en céntimos enteros son
+exactas.
+
+El PDF lleva los totales generales, una tabla por mes y otra por cliente (de
+mayor a menor total), con los estilos de la factura construidos una sola vez.
+"""
+
+import os
+import time
+from io import BytesIO
+from itertools import islice
+from types import SimpleNamespace
+
+import numpy as np
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import (
+    LongTable,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+from requests import RequestException
+
+from factura_pdf import ANCHOS_TOTALES, ESTILOS, MARGEN, moneda
+
+MAX_FACTURAS_RESUMEN = int(os.getenv("MAX_FACTURAS_RESUMEN", "1000000"))
+TAMANO_BLOQUE_RESUMEN = int(os.getenv("TAMANO_BLOQUE_RESUMEN", "10000"))
+
+ENCABEZADO = ["Facturas", "Subtotal", "IVA (19%)", "Total"]
+ANCHOS_MES = [1.4 * inch, 1 * inch, 1.4 * inch, 1.4 * inch, 1.4 * inch]
+ANCHOS_CLIENTE = [2.6 * inch, 0.8 * inch, 1.1 * inch, 1 * inch, 1.1 * inch]
+FUENTE_TABLA, TAMANO_FUENTE_TABLA = "Helvetica", 9
+PADDING_CELDA = 6
+
+
+class ErrorResumen(Exception):
+    """El backend no devolvió las facturas del informe."""
+
+
+def _estilos():
+    tabla = TableStyle(
+        [
+            ("FONTSIZE", (0, 0), (-1, -1), TAMANO_FUENTE_TABLA),
+            ("FONTSIZE", (0, 0), (-1, 0), 10),
+            ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+            ("ALIGN", (0, 1), (0, -1), "LEFT"),
+            ("TOPPADDING", (0, 0), (-1, -1), 4),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+            ("LEFTPADDING", (0, 0), (-1, -1), PADDING_CELDA),
+            ("RIGHTPADDING", (0, 0), (-1, -1), PADDING_CELDA),
+            ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+            ("BACKGROUND", (0, -1), (-1, -1), colors.HexColor("#D6EAF8")),
+        ],
+        parent=ESTILOS.tabla_detalle,
+    )
+    return SimpleNamespace(tabla=tabla)
+
+
+ESTILOS_RESUMEN = _estilos()
+
+
+class Resumen:
+    """
+    Agregación incremental de facturas por mes y cliente.
+
+    Las sumas viven en matrices (meses × clientes) que crecen al aparecer
+    meses o clientes nuevos; cada bloque de facturas se suma de una vez.
+    """
+
+    def __init__(self):
+        self.meses = {}
+        self.clientes = {}
+        # Facturas, subtotal, impuesto y total (en céntimos) por celda
+        self.sumas = np.zeros((4, 0, 0), dtype=np.int64)
+        self.facturas = 0
+
+    def agregar(self, facturas):
+        """
+        Suma un bloque de facturas del backend
+        """
+        n = len(facturas)
+        if not n:
+            return
+        meses, clientes = self.meses, self.clientes
+        fila = np.fromiter(
+            (meses.setdefault(f["fecha_emision"][:7], len(meses)) for f in facturas),
+            np.int64,
+            n,
+        )
+        columna = np.fromiter(
+            (
+                clientes.setdefault(f["cliente"]["nombre"], len(clientes))
+                for f in facturas
+            ),
+            np.int64,
+            n,
+        )
+        centimos = [
+            np.rint(np.fromiter((f[campo] for f in facturas), np.float64, n) * 100)
+            for campo in ("subtotal", "impuesto", "total")
+        ]
+
+        self._crecer(len(meses), len(clientes))
+        forma = self.sumas.shape[1:]
+        celdas = fila * forma[1] + columna
+        tamano = forma[0] * forma[1]
+        self.sumas[0] += np.bincount(celdas, minlength=tamano).reshape(forma)
+        for k in range(3):
+            # Las sumas en float64 son exactas mientras no pasen de 2**53 céntimos
+            suma = np.bincount(celdas, weights=centimos[k], minlength=tamano)
+            self.sumas[k + 1] += np.rint(suma).astype(np.int64).reshape(forma)
+        self.facturas += n
+
+    def _crecer(self, meses, clientes):
+        _, filas, columnas = self.sumas.shape
+        if meses <= filas and clientes <= columnas:
+            return
+        # Capacidad doble para no copiar las matrices en cada cliente nuevo
+        nuevas = (
+            max(meses, 2 * filas) if meses > filas else filas,
+            max(clientes, 2 * columnas) if clientes > columnas else columnas,
+        )
+        sumas = np.zeros((4, *nuevas), dtype=np.int64)
+        sumas[:, :filas, :columnas] = self.sumas
+        self.sumas = sumas
+
+    def _filas(self, nombres, sumas):
+        """
+        (nombre, facturas, subtotal, impuesto, total) a partir de las sumas
+        en céntimos de cada código
+        """
+        return [
+            (nombre, int(sumas[0, codigo]), *(sumas[1:, codigo] / 100).tolist())
+            for nombre, codigo in nombres.items()
+        ]
+
+    def por_mes(self):
+        return sorted(self._filas(self.meses, self.sumas.sum(axis=2)))
+
+    def por_cliente(self):
+        filas = self._filas(self.clientes, self.sumas.sum(axis=1))
+        return sorted(filas, key=lambda f: (-f[4], f[0]))
+
+    def totales(self):
+        facturas, *importes = self.sumas.sum(axis=(1, 2)).tolist()
+        return (facturas, *(importe / 100 for importe in importes))
+
+
+def parsear_rango(desde, hasta):
+    """
+    Valida el rango inclusivo desde-hasta del informe
+    """
+    try:
+        inicio, fin = int(desde), int(hasta)
+    except (TypeError, ValueError):
+        raise ValueError("desde y hasta deben ser enteros") from None
+    if fin < inicio:
+        raise ValueError("hasta debe ser mayor o igual que desde")
+    if fin - inicio + 1 > MAX_FACTURAS_RESUMEN:
+        raise ValueError(f"El informe no puede superar {MAX_FACTURAS_RESUMEN} facturas")
+    return inicio, fin
+
+
+def agregar_rango(backend, desde, hasta, tamano_bloque=TAMANO_BLOQUE_RESUMEN):
+    """
+    Pide al backend las facturas desde..hasta (inclusivo) en un único stream
+    y devuelve su Resumen
+    """
+    resumen = Resumen()
+    try:
+        with backend.get(
+            "/facturas/v1/batch/stream",
+            params={"desde": desde, "hasta": hasta},
+            stream=True,
+        ) as resp:
+            if resp.status_code != 200:
+                raise ErrorResumen(f"El backend respondió {resp.status_code}")
+            facturas = backend.iterar_objetos(resp)
+            while bloque := list(islice(facturas, tamano_bloque)):
+                resumen.agregar(bloque)
+    except (RequestException, ValueError, KeyError) as e:
+        raise ErrorResumen(f"{type(e).__name__}: {e}") from e
+    if resumen.facturas != hasta - desde + 1:
+        raise ErrorResumen("Respuesta del backend incompleta")
+    return resumen
+
+
+def _recortar(texto, ancho):
+    """
+    Recorta el texto con puntos suspensivos para que quepa en `ancho`
+    """
+    if stringWidth(texto, FUENTE_TABLA, TAMANO_FUENTE_TABLA) <= ancho:
+        return texto
+    while texto and stringWidth(texto + "…", FUENTE_TABLA, TAMANO_FUENTE_TABLA) > ancho:
+        texto = texto[:-1]
+    return texto + "…"
+
+
+def _tabla(titulo, filas, totales, anchos):
+    ancho_nombre = anchos[0] - 2 * PADDING_CELDA
+    datos = [[titulo, *ENCABEZADO]]
+    datos.extend(
+        [_recortar(nombre, ancho_nombre), f"{facturas:,}", *map(moneda, importes)]
+        for nombre, facturas, *importes in filas
+    )
+    facturas, *importes = totales
+    datos.append(["Total", f"{facturas:,}", *map(moneda, importes)])
+    return LongTable(datos, colWidths=anchos, style=ESTILOS_RESUMEN.tabla, repeatRows=1)
+
+
+def elementos_resumen(resumen, desde, hasta):
+    totales = resumen.totales()
+    facturas, subtotal, impuesto, total = totales
+    return [
+        Paragraph("RESUMEN DE FACTURACIÓN", ESTILOS.titulo),
+        Paragraph(
+            f"Facturas {desde} a {hasta} · generado el {time.strftime('%Y-%m-%d')}",
+            ESTILOS.fecha,
+        ),
+        Table(
+            [
+                ["Facturas:", f"{facturas:,}"],
+                ["Subtotal:", moneda(subtotal)],
+                ["IVA (19%):", moneda(impuesto)],
+                ["Total:", moneda(total)],
+            ],
+            colWidths=ANCHOS_TOTALES,
+            style=ESTILOS.tabla_totales,
+        ),
+        Spacer(1, 20),
+        Paragraph("POR MES", ESTILOS.seccion),
+        _tabla("Mes", resumen.por_mes(), totales, ANCHOS_MES),
+        Spacer(1, 20),
+        Paragraph("POR CLIENTE", ESTILOS.seccion),
+        _tabla("Cliente", resumen.por_cliente(), totales, ANCHOS_CLIENTE),
+    ]
+
+
+def render_resumen(resumen, desde, hasta):
+    """
+    Genera el PDF del resumen y devuelve su contenido en bytes
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        title=f"Resumen de facturación {desde}-{hasta}",
+        leftMargin=MARGEN,
+        rightMargin=MARGEN,
+        topMargin=MARGEN,
+        bottomMargin=MARGEN,
+    )
+    doc.build(elementos_resumen(resumen, desde, hasta))
+    return buffer.getvalue()
@@ -6,6 +6,72 @@ document.addEventListener('DOMContentLoaded', function () {
     const previewContainer = document.getElementById('preview-container');
     const iframe = document.getElementById('pdf-preview');
 
+    const esperar = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+    // Lista ("1,2,3") o rango ("1-50") de facturas: se descargan en un ZIP
+    function parsearLote(texto) {
+        const rango = texto.match(/^(\d+)\s*-\s*(\d+)$/);
+        if (rango) {
+            return { desde: parseInt(rango[1], 10), hasta: parseInt(rango[2], 10) };
+        }
+        if (texto.includes(',')) {
+            return { ids: texto };
+        }
+        return null;
+    }
+
+    // Espera a que termine un trabajo asíncrono, sin mantener abierta una
+    // conexión durante todo el render. Devuelve la URL del resultado.
+    async function esperarTrabajo(trabajo) {
+        let pausa = 200;
+        while (trabajo.estado === 'pendiente' || trabajo.estado === 'en_curso') {
+            await esperar(pausa);
+            pausa = Math.min(pausa * 1.5, 2000);
+            const estado = await fetch(trabajo.url_estado);
+            if (!estado.ok) {
+                throw new Error(estado.status + '\n' + await estado.text());
+            }
+            trabajo = await estado.json();
+        }
+        if (trabajo.estado === 'error') {
+            throw new Error(trabajo.error);
+        }
+        return trabajo.url_resultado + '?descarga=1';
+    }
+
+    // Repite la petición mientras la cola de trabajos esté llena (429),
+    // esperando lo que indique el servidor
+    async function conReintentos(peticion) {
+        for (let intento = 0; ; intento++) {
+            const res = await peticion();
+            if (res.status !== 429 || intento >= 5) return res;
+            await esperar((parseInt(res.headers.get('Retry-After'), 10) || 1) * 1000);
+        }
+    }
+
+    // Un lote siempre se encola como trabajo. Una factura se pide
+    // directamente; si es grande, el servidor la encola (202) y se espera al
+    // trabajo. Devuelve la URL que descargar.
+    async function prepararDescarga(texto) {
+        const datos = parsearLote(texto);
+        const res = await conReintentos(() => datos
+            ? fetch('/trabajos', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(datos)
+            })
+            : fetch('/generar-pdf?id_factura=' + encodeURIComponent(texto), {
+                headers: { 'Prefer': 'respond-async' }
+            }));
+        if (!res.ok) {
+            throw new Error(res.status + '\n' + await res.text());
+        }
+        if (res.status === 202) {
+            return esperarTrabajo(await res.json());
+        }
+        return URL.createObjectURL(await res.blob());
+    }
+
     // Vista Previa
     if (previewBtn) {
         previewBtn.addEventListener('click', async function () {
@@ -21,10 +87,8 @@ document.addEventListener('DOMContentLoaded', function () {
                 previewBtn.textContent = 'Generando...';
                 previewBtn.disabled = true;
 
-                const form = new FormData();
-                form.append('id_factura', id);
-
-                const res = await fetch('/vista-previa-pdf', { method: 'POST', body: form });
+                // Vista previa en HTML: el PDF solo se genera al descargar
+                const res = await fetch('/vista-previa-html?id_factura=' + encodeURIComponent(id));
 
                 if (!res.ok) {
                     const text = await res.text();
@@ -32,9 +96,7 @@ document.addEventListener('DOMContentLoaded', function () {
                     return;
                 }
 
-                const blob = await res.blob();
-                const url = URL.createObjectURL(blob);
-                iframe.src = url;
+                iframe.srcdoc = await res.text();
                 previewContainer.style.display = 'flex';
 
             } catch (err) {
@@ -60,26 +122,16 @@ document.addEventListener('DOMContentLoaded', function () {
                 downloadBtn.textContent = 'Descargando...';
                 downloadBtn.disabled = true;
 
-                const form = new FormData();
-                form.append('id_factura', id);
-
-                const res = await fetch('/generar-pdf', { method: 'POST', body: form });
-
-                if (!res.ok) {
-                    const text = await res.text();
-                    alert('Error al descargar PDF: ' + res.status + '\n' + text);
-                    return;
-                }
-
-                const blob = await res.blob();
-                const url = URL.createObjectURL(blob);
+                const url = await prepararDescarga(id);
                 const a = document.createElement('a');
                 a.href = url;
-                a.download = `factura_${id}.pdf`;
+                a.download = parsearLote(id) ? 'facturas.zip' : `factura_${id}.pdf`;
                 document.body.appendChild(a);
                 a.click();
                 document.body.removeChild(a);
-                URL.revokeObjectURL(url);
+                if (url.startsWith('blob:')) {
+                    setTimeout(() => URL.revokeObjectURL(url), 10000);
+                }
 
             } catch (err) {
                 alert('Error al descargar: ' + err.message);
@@ -94,7 +146,7 @@ document.addEventListener('DOMContentLoaded', function () {
     if (closeBtn) {
         closeBtn.addEventListener('click', function () {
             previewContainer.style.display = 'none';
-            iframe.src = '';
+            iframe.srcdoc = '';
         });
     }
 
@@ -102,7 +154,7 @@ document.addEventListener('DOMContentLoaded', function () {
     document.addEventListener('keydown', function(e) {
         if (e.key === 'Escape' && previewContainer.style.display === 'flex') {
             previewContainer.style.display = 'none';
-            iframe.src = '';
+            iframe.srcdoc = '';
         }
     });
 });
@@ -0,0 +1,191 @@
+"""Cola de trabajos asíncronos de PDF.
+
+Enviar un trabajo devuelve su id al instante; un pool acotado de hilos lo
+ejecuta (los hilos solo esperan al backend y al pool de renders) y escribe el
+resultado en disco. El estado de cada trabajo vive en un directorio propio
+con un `estado.json` que se reescribe de forma atómica, así que cualquier
+worker de gunicorn puede responder a la consulta del estado o a la descarga,
+aunque el trabajo lo ejecute otro.
+
+La cola de cada worker está acotada: si está llena, `enviar` lanza ColaLlena
+con una estimación de cuándo reintentar. Los resultados caducan
+`TRABAJOS_TTL` segundos después de terminar.
+"""
+
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+TRABAJOS_DIR = os.getenv("TRABAJOS_DIR") or os.path.join(
+    tempfile.gettempdir(), "trabajos_pdf"
+)
+TRABAJOS_HILOS = int(os.getenv("TRABAJOS_HILOS", "4"))
+TRABAJOS_COLA_MAX = int(os.getenv("TRABAJOS_COLA_MAX", "32"))
+TRABAJOS_TTL = int(os.getenv("TRABAJOS_TTL", "900"))
+# Un trabajo sin terminar (por ejemplo, si su worker murió) se descarta tras este tiempo
+TRABAJOS_DURACION_MAX = int(os.getenv("TRABAJOS_DURACION_MAX", "3600"))
+INTERVALO_PURGA = 30
+
+ESTADOS_FINALES = {"terminado", "error"}
+_ID_VALIDO = re.compile(r"[0-9a-f]{32}")
+
+
+class ColaLlena(Exception):
+    """La cola de trabajos del worker está llena."""
+
+    def __init__(self, reintentar_en):
+        super().__init__("Demasiados trabajos en cola, inténtelo más tarde")
+        self.reintentar_en = reintentar_en
+
+
+class ColaTrabajos:
+    """
+    Cola de trabajos con estado en disco, segura entre hilos y procesos.
+
+    Una tarea es una función que recibe un archivo binario abierto y escribe
+    en él el resultado; si lanza una excepción, el trabajo acaba en `error`.
+    """
+
+    def __init__(
+        self,
+        directorio=TRABAJOS_DIR,
+        hilos=TRABAJOS_HILOS,
+        cola_max=TRABAJOS_COLA_MAX,
+        ttl=TRABAJOS_TTL,
+    ):
+        self.directorio = directorio
+        self.hilos = hilos
+        self.cola_max = cola_max
+        self.ttl = ttl
+        os.makedirs(directorio, exist_ok=True)
+        self._ejecutor = None
+        self._en_cola = 0
+        self._duracion_media = 1.0
+        self._ultima_purga = 0.0
+        self._lock = threading.Lock()
+
+    def enviar(self, tarea, tipo="application/pdf", nombre="resultado.pdf", total=1):
+        """
+        Registra el trabajo, lo encola y devuelve su estado inicial
+        """
+        self.purgar()
+        with self._lock:
+            if self._en_cola >= self.cola_max:
+                raise ColaLlena(self._reintentar_en())
+            self._en_cola += 1
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(
+                    self.hilos, thread_name_prefix="trabajo-pdf"
+                )
+            ejecutor = self._ejecutor
+
+        id_trabajo = uuid.uuid4().hex
+        ahora = time.time()
+        estado = {
+            "id": id_trabajo,
+            "estado": "pendiente",
+            "total": total,
+            "tipo": tipo,
+            "nombre": nombre,
+            "error": None,
+            "creado": ahora,
+            "terminado": None,
+            "expira": ahora + TRABAJOS_DURACION_MAX,
+        }
+        try:
+            os.makedirs(self._ruta(id_trabajo))
+            self._escribir_estado(estado)
+            ejecutor.submit(self._ejecutar, estado, tarea)
+        except BaseException:
+            # El trabajo no llegó a encolarse: devolver su hueco
+            with self._lock:
+                self._en_cola -= 1
+            shutil.rmtree(self._ruta(id_trabajo), ignore_errors=True)
+            raise
+        return estado
+
+    def estado(self, id_trabajo):
+        """
+        Estado del trabajo, o None si no existe o ya caducó
+        """
+        if not _ID_VALIDO.fullmatch(id_trabajo or ""):
+            return None
+        try:
+            with open(self._ruta(id_trabajo, "estado.json"), encoding="utf-8") as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if estado["expira"] < time.time():
+            return None
+        return estado
+
+    def ruta_resultado(self, id_trabajo):
+        return self._ruta(id_trabajo, "resultado")
+
+    def en_cola(self):
+        with self._lock:
+            return self._en_cola
+
+    def purgar(self, forzar=False):
+        """
+        Borra los trabajos caducados; como mucho una vez cada
+        INTERVALO_PURGA segundos salvo que se fuerce
+        """
+        ahora = time.time()
+        with self._lock:
+            if not forzar and ahora - self._ultima_purga < INTERVALO_PURGA:
+                return
+            self._ultima_purga = ahora
+        with os.scandir(self.directorio) as entradas:
+            ids = [e.name for e in entradas if _ID_VALIDO.fullmatch(e.name)]
+        for id_trabajo in ids:
+            if self.estado(id_trabajo) is None:
+                shutil.rmtree(self._ruta(id_trabajo), ignore_errors=True)
+
+    def _ejecutar(self, estado, tarea):
+        inicio = time.monotonic()
+        parcial = self._ruta(estado["id"], "resultado.parcial")
+        try:
+            try:
+                self._escribir_estado({**estado, "estado": "en_curso"})
+                with open(parcial, "wb") as archivo:
+                    tarea(archivo)
+                os.replace(parcial, self.ruta_resultado(estado["id"]))
+                final = {"estado": "terminado"}
+            except Exception as e:
+                if os.path.exists(parcial):
+                    os.remove(parcial)
+                final = {"estado": "error", "error": str(e) or type(e).__name__}
+            ahora = time.time()
+            self._escribir_estado(
+                {**estado, **final, "terminado": ahora, "expira": ahora + self.ttl}
+            )
+        except OSError:
+            # Disco lleno, o el directorio del trabajo se purgó mientras
+            # corría: el trabajo se pierde, pero su hueco en la cola no
+            pass
+        finally:
+            with self._lock:
+                self._en_cola -= 1
+                # Media móvil exponencial para estimar el Retry-After
+                duracion = time.monotonic() - inicio
+                self._duracion_media = 0.8 * self._duracion_media + 0.2 * duracion
+
+    def _reintentar_en(self):
+        return max(1, math.ceil(self._duracion_media * self._en_cola / self.hilos))
+
+    def _ruta(self, id_trabajo, *partes):
+        return os.path.join(self.directorio, id_trabajo, *partes)
+
+    def _escribir_estado(self, estado):
+        fd, temporal = tempfile.mkstemp(dir=self._ruta(estado["id"]), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(temporal, self._ruta(estado["id"], "estado.json"))
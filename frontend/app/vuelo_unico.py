@@ -0,0 +1,57 @@
+"""Agrupación de llamadas concurrentes con la misma clave ("single flight").
+
+Cuando varios hilos piden lo mismo a la vez (un enlace compartido, un panel
+que se refresca), solo el primero ejecuta la función; los demás esperan a que
+termine y reciben su mismo resultado, o su misma excepción. La clave deja de
+estar en vuelo en cuanto termina, así que no guarda resultados: de eso se
+encargan las cachés.
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+class VueloUnico:
+    """
+    Ejecuta una sola vez cada clave en curso; seguro entre hilos
+    """
+
+    def __init__(self):
+        self.ejecutadas = 0
+        self.compartidas = 0
+        self._vuelos = {}
+        self._lock = threading.Lock()
+
+    def ejecutar(self, clave, funcion, *args):
+        """
+        Devuelve (resultado, compartido): el de `funcion(*args)` si no había
+        otra llamada con la misma clave en curso, o el de esa llamada
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            compartido = vuelo is not None
+            if compartido:
+                self.compartidas += 1
+            else:
+                vuelo = self._vuelos[clave] = Future()
+                self.ejecutadas += 1
+        if compartido:
+            return vuelo.result(), True
+
+        try:
+            vuelo.set_result(funcion(*args))
+        except BaseException as e:
+            vuelo.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+        return vuelo.result(), False
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "ejecutadas": self.ejecutadas,
+                "compartidas": self.compartidas,
+                "en_vuelo": len(self._vuelos),
+            }
@@ -0,0 +1,87 @@
+"""Carga del almacén de facturas y latencia de sus consultas.
+
+Llena un almacén SQLite temporal (o el indicado con --ruta) y mide la
+latencia de consultas sueltas y por lotes de números aleatorios, comparada
+con generar cada factura al vuelo.
+
+Uso:
+    python tests/benchmarks/bench_almacen.py --facturas 100000 --procesos 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "tests"), str(RAIZ / "backend" / "app")]
+
+import almacen  # noqa: E402
+from generador import Generador  # noqa: E402
+from utilidades import percentiles  # noqa: E402
+
+
+def latencias(funcion, argumentos):
+    tiempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcion(argumento)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def informar(nombre, tiempos, por_consulta=1):
+    p50, p99 = percentiles(tiempos, 50, 99)
+    print(
+        f"  {nombre:>22}: p50 {p50 * 1e6:9.1f} µs  p99 {p99 * 1e6:9.1f} µs  "
+        f"({p50 / por_consulta * 1e6:.1f} µs/factura)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, default=100000)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--consultas", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--ruta", help="almacén existente (no se vuelve a cargar)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = args.ruta
+        if ruta is None:
+            ruta = os.path.join(directorio, "facturas.db")
+            facturas, segundos = almacen.cargar(ruta, args.facturas, 1, args.procesos)
+            print(
+                f"Carga: {facturas} facturas en {segundos:.2f} s "
+                f"({facturas / segundos:.0f} facturas/s, "
+                f"{os.path.getsize(ruta) / facturas:.0f} B/factura)"
+            )
+        guardado = almacen.AlmacenFacturas(ruta)
+        azar = random.Random(0)
+        numeros = [
+            str(azar.randint(1, guardado.facturas)) for _ in range(args.consultas)
+        ]
+        lotes = [numeros[i : i + args.lote] for i in range(0, len(numeros), args.lote)]
+
+        print(f"\nConsultas sobre {guardado.facturas} facturas:")
+        informar("almacén, una", latencias(guardado.obtener, numeros))
+        informar(
+            f"almacén, lote {args.lote}",
+            latencias(guardado.obtener_varios, lotes),
+            args.lote,
+        )
+        generador = Generador()
+        informar("generación, una", latencias(generador.generar, numeros))
+        informar(
+            f"generación, lote {args.lote}",
+            latencias(generador.generar_lote, lotes),
+            args.lote,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Arranque en frío de los dos servicios: importación y primera respuesta.
+
+Para cada servicio, en procesos nuevos, mide:
+
+- `import main`: mediana de `--repeticiones` importaciones;
+- primera respuesta: desde que se lanza el servidor (gunicorn con un worker,
+  como en los contenedores) hasta que termina una petición real (una factura
+  del backend, un PDF del frontend contra un backend falso) enviada en cuanto
+  el servidor acepta conexiones;
+- /ready: en otro arranque, cuándo responde 200 por primera vez (si la ruta
+  existe) y cuánto tarda la primera petición real enviada después.
+
+Uso:
+    python tests/benchmarks/bench_arranque.py --repeticiones 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+from carga_frontend import puerto_libre
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(RAIZ / "tests"))
+
+from utilidades import servidor_backend_falso  # noqa: E402
+
+SERVICIOS = {
+    "backend": (RAIZ / "backend" / "app", "API", "/facturas/v1/{n}"),
+    "frontend": (RAIZ / "frontend" / "app", "WEB", "/generar-pdf?id_factura={n}"),
+}
+
+
+def tiempo_importacion(directorio):
+    codigo = (
+        "import time; inicio = time.perf_counter(); import main; "
+        "print(time.perf_counter() - inicio)"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=directorio,
+        env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def esperar_escucha(puerto, proceso, limite=60):
+    fin = time.perf_counter() + limite
+    while time.perf_counter() < fin and proceso.poll() is None:
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError("El servidor no llegó a escuchar")
+
+
+def esperar_ready(url, inicio, limite=60):
+    fin = time.perf_counter() + limite
+    while time.perf_counter() < fin:
+        resp = requests.get(f"{url}/ready", timeout=limite)
+        if resp.status_code == 404:
+            return None
+        if resp.status_code == 200:
+            return time.perf_counter() - inicio
+        time.sleep(0.05)
+    raise RuntimeError("El servidor no llegó a estar preparado")
+
+
+def arranque(nombre, n, backend_url, esperar):
+    """
+    (segundos hasta /ready o None, segundos hasta la primera respuesta real,
+    duración de esa petición); con `esperar`, la petición se envía tras /ready
+    """
+    directorio, prefijo, ruta = SERVICIOS[nombre]
+    puerto = puerto_libre()
+    env = {
+        **os.environ,
+        f"{prefijo}_BIND": f"127.0.0.1:{puerto}",
+        f"{prefijo}_WORKERS": "1",
+        f"{prefijo}_ACCESSLOG": "",
+        "BACKEND_API_URL": backend_url,
+        "PROMETHEUS_MULTIPROC_DIR": "/tmp/metricas_arranque",
+    }
+    url = f"http://127.0.0.1:{puerto}"
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=directorio,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        esperar_escucha(puerto, proceso)
+        ready = esperar_ready(url, inicio) if esperar else None
+        peticion = time.perf_counter()
+        resp = requests.get(url + ruta.format(n=n), timeout=60)
+        resp.raise_for_status()
+        primera = time.perf_counter()
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    return ready, primera - inicio, primera - peticion
+
+
+def mediana(valores):
+    return None if None in valores else statistics.median(valores)
+
+
+def segundos(valor, ancho):
+    return f"{'-' if valor is None else f'{valor:.2f}':>{ancho}}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'servicio':>8} {'import s':>8} {'1ª resp. s':>10} {'ready s':>8} "
+        f"{'pet. tras ready s':>17}"
+    )
+    with servidor_backend_falso() as backend_url:
+        for nombre, (directorio, _, _) in SERVICIOS.items():
+            importacion = statistics.median(
+                tiempo_importacion(directorio) for _ in range(args.repeticiones)
+            )
+            frias = [
+                arranque(nombre, n, backend_url, False)
+                for n in range(args.repeticiones)
+            ]
+            preparadas = [
+                arranque(nombre, n, backend_url, True) for n in range(args.repeticiones)
+            ]
+            ready = mediana([r for r, _, _ in preparadas])
+            tras_ready = mediana([p for _, _, p in preparadas]) if ready else None
+            print(
+                f"{nombre:>8} {importacion:8.2f} "
+                f"{mediana([t for _, t, _ in frias]):10.2f} {segundos(ready, 8)} "
+                f"{segundos(tras_ready, 17)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
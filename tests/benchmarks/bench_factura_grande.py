@@ -0,0 +1,59 @@
+"""Tiempo y memoria del render de facturas grandes (1k, 10k y 100k líneas).
+
+Compara el modo factura grande (tablas por tramos escritas en un archivo
+temporal acotado en memoria) con la tabla única de antes. La tabla única tiene
+coste cuadrático, así que solo se mide hasta `--max-tabla-unica` líneas.
+Cada medición corre en un proceso nuevo para que el pico de RSS sea el suyo.
+
+Uso:
+    python tests/benchmarks/bench_factura_grande.py --lineas 1000 10000 100000
+"""
+
+import argparse
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "tests"), str(RAIZ / "frontend" / "app")]
+
+import factura_pdf  # noqa: E402
+from utilidades import factura_ejemplo  # noqa: E402
+
+
+def medir(lineas, modo):
+    if modo == "tabla única":
+        factura_pdf.FACTURA_GRANDE_UMBRAL = lineas
+    factura = factura_ejemplo(f"grande-{lineas}")
+    inicio = time.perf_counter()
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as destino:
+        factura_pdf.render_factura_en(factura, destino)
+        tamano = destino.tell()
+    segundos = time.perf_counter() - inicio
+    pico_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return segundos, pico_mib, tamano
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lineas", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--max-tabla-unica", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'líneas':>7} {'modo':>12} {'segundos':>9} {'RSS MiB':>8} {'PDF KiB':>8}")
+    for lineas in args.lineas:
+        modos = ["tramos"]
+        if lineas <= args.max_tabla_unica:
+            modos.append("tabla única")
+        for modo in modos:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                segundos, pico, tamano = pool.submit(medir, lineas, modo).result()
+            kib = tamano / 1024
+            print(f"{lineas:>7} {modo:>12} {segundos:9.2f} {pico:8.1f} {kib:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Bytes en el cable y coste de codificar/decodificar cada formato.
+
+Compara el JSON por defecto (json de la biblioteca estándar, como hacía
+FastAPI) con orjson y MessagePack, sin comprimir y comprimidos con gzip y
+zstd, para una factura suelta y para un lote.
+
+Uso:
+    python tests/benchmarks/bench_formato.py --lote 1000 --repeticiones 20
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "backend" / "app")]
+
+import msgpack  # noqa: E402
+import orjson  # noqa: E402
+import zstandard  # noqa: E402
+
+from codificacion import NIVEL_GZIP, NIVEL_ZSTD  # noqa: E402
+from generador import Generador  # noqa: E402
+
+FORMATOS = {
+    "json": (lambda d: json.dumps(d).encode(), json.loads),
+    "orjson": (orjson.dumps, orjson.loads),
+    "msgpack": (msgpack.packb, msgpack.unpackb),
+}
+COMPRESIONES = {
+    "-": (lambda b: b, lambda b: b),
+    "gzip": (lambda b: gzip.compress(b, NIVEL_GZIP), gzip.decompress),
+    "zstd": (
+        zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress,
+        zstandard.ZstdDecompressor().decompress,
+    ),
+}
+
+
+def cronometrar(funcion, argumento, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        resultado = funcion(argumento)
+    return (time.perf_counter() - inicio) / repeticiones, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    generador = Generador()
+    facturas = generador.generar_lote(range(args.lote))
+    casos = {
+        "factura": (facturas[0], 1, args.repeticiones * 50),
+        f"lote {args.lote}": (
+            {"total": len(facturas), "facturas": facturas},
+            len(facturas),
+            args.repeticiones,
+        ),
+    }
+
+    for caso, (datos, n, repeticiones) in casos.items():
+        print(f"\n{caso}: bytes/factura, µs codificar/factura, µs decodificar/factura")
+        for formato, (codificar, decodificar) in FORMATOS.items():
+            for compresion, (comprimir, descomprimir) in COMPRESIONES.items():
+                t_cod, cuerpo = cronometrar(
+                    lambda d: comprimir(codificar(d)), datos, repeticiones
+                )
+                t_dec, decodificado = cronometrar(
+                    lambda b: decodificar(descomprimir(b)), cuerpo, repeticiones
+                )
+                assert decodificado == datos
+                print(
+                    f"  {formato:>7} {compresion:>4}: {len(cuerpo) / n:9.1f} B "
+                    f"{t_cod / n * 1e6:8.2f} µs {t_dec / n * 1e6:8.2f} µs"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark del generador de facturas del backend.
+
+Compara facturas por segundo del camino anterior, que re-sembraba Faker y
+hacía una docena de llamadas a sus proveedores por factura bajo un lock, con
+el generador de pools precalculados, llamado factura a factura y por lotes.
+
+Uso:
+    python tests/benchmarks/bench_generador.py --facturas 5000 --lote 1000
+"""
+
+import argparse
+import hashlib
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "backend" / "app")]
+
+from faker import Faker  # noqa: E402
+
+from generador import Generador  # noqa: E402
+
+fake = Faker("es_ES")
+_lock_fake = threading.Lock()
+
+
+def generar_por_llamada(numero_factura):
+    """Generación anterior: Faker re-sembrado y bucles de Python."""
+    digest = hashlib.blake2b(numero_factura.encode(), digest_size=8).digest()
+    semilla = int.from_bytes(digest, "big")
+    with _lock_fake:
+        fake.seed_instance(semilla)
+        rng = random.Random(semilla)
+        empresa = {
+            "nombre": fake.company(),
+            "direccion": fake.address(),
+            "telefono": fake.phone_number(),
+            "email": fake.company_email(),
+            "nit": fake.random_int(100000, 999999),
+        }
+        cliente = {
+            "nombre": fake.company(),
+            "direccion": fake.address(),
+            "telefono": fake.phone_number(),
+            "email": fake.company_email(),
+            "documento": fake.random_int(100000, 999999),
+        }
+        detalle = []
+        for _ in range(rng.randint(1, 5)):
+            cantidad = rng.randint(1, 10)
+            precio_unitario = round(rng.uniform(50, 500), 2)
+            detalle.append(
+                {
+                    "descripcion": fake.catch_phrase(),
+                    "cantidad": cantidad,
+                    "precio_unitario": precio_unitario,
+                    "total": round(cantidad * precio_unitario, 2),
+                }
+            )
+        subtotal = round(sum(item["total"] for item in detalle), 2)
+        impuesto = round(subtotal * 0.19, 2)
+        return {
+            "numero_factura": numero_factura,
+            "fecha_emision": str(fake.date_between(start_date="-1y", end_date="today")),
+            "empresa": empresa,
+            "cliente": cliente,
+            "detalle": detalle,
+            "subtotal": subtotal,
+            "impuesto": impuesto,
+            "total": round(subtotal + impuesto, 2),
+        }
+
+
+def medir(nombre, funcion, facturas):
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    print(f"{nombre:>20}: {facturas / segundos:10.0f} facturas/s ({segundos:.2f} s)")
+    return facturas / segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, default=5000)
+    parser.add_argument("--lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    numeros = [f"FAC-{n}" for n in range(args.facturas)]
+    inicio = time.perf_counter()
+    generador = Generador()
+    print(f"construcción de pools: {time.perf_counter() - inicio:.2f} s")
+
+    def por_lotes():
+        for i in range(0, len(numeros), args.lote):
+            generador.generar_lote(numeros[i : i + args.lote])
+
+    antes = medir(
+        "por llamada (antes)",
+        lambda: [generar_por_llamada(n) for n in numeros],
+        args.facturas,
+    )
+    medir(
+        "pools, una a una",
+        lambda: [generador.generar(n) for n in numeros],
+        args.facturas,
+    )
+    lotes = medir(f"pools, lotes de {args.lote}", por_lotes, args.facturas)
+    print(f"aceleración por lotes: x{lotes / antes:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Latencia del listado de facturas con índices frente al tamaño del conjunto.
+
+Construye el índice con filas sintéticas de la misma cardinalidad que las del
+generador (366 fechas, 2048 clientes, documentos y NIT de seis cifras) para
+cada tamaño y mide la mediana de varias consultas de una página, junto a un
+recorrido lineal de referencia. Con índices, la latencia apenas crece al
+multiplicar el conjunto por diez; el recorrido lineal crece en proporción.
+
+Uso:
+    python tests/benchmarks/bench_indice.py --tamanos 10000 100000 1000000
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "tests"), str(RAIZ / "backend" / "app")]
+
+from indice import IndiceFacturas  # noqa: E402
+from utilidades import percentiles  # noqa: E402
+
+HOY = date(2025, 1, 1)
+CLIENTES = [f"Cliente {i}" for i in range(2048)]
+
+
+def filas(cantidad, azar):
+    fechas = [str(HOY - timedelta(days=d)) for d in range(366)]
+    for i in range(cantidad):
+        yield (
+            str(i + 1),
+            azar.choice(fechas),
+            azar.randrange(5000, 2700000) / 100,
+            azar.choice(CLIENTES),
+            azar.randrange(100000, 1000000),
+            azar.randrange(100000, 1000000),
+        )
+
+
+def consultas(azar):
+    """Consultas de una página con parámetros aleatorios en cada llamada"""
+    return {
+        "sin filtros, por fecha": lambda: {"orden": "-fecha"},
+        "rango de fechas": lambda: {
+            "fecha_desde": HOY - timedelta(days=azar.randrange(30, 366)),
+            "fecha_hasta": HOY - timedelta(days=azar.randrange(0, 30)),
+            "orden": "fecha",
+        },
+        "rango de totales": lambda: {
+            "total_min": 1000.0,
+            "total_max": 1005.0,
+            "orden": "-fecha",
+        },
+        "cliente": lambda: {"cliente": azar.choice(CLIENTES), "orden": "-total"},
+        "documento": lambda: {"documento": azar.randrange(100000, 1000000)},
+        "cliente y fechas": lambda: {
+            "cliente": azar.choice(CLIENTES),
+            "fecha_desde": HOY - timedelta(days=60),
+        },
+    }
+
+
+def recorrido_lineal(indice, total_min, total_max):
+    """Referencia sin índices: comprobar todas las facturas"""
+    minimo, maximo = total_min * 100, total_max * 100
+    totales = indice.totales
+    return [i for i in range(len(totales)) if minimo <= totales[i] <= maximo][:50]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--tamanos", type=int, nargs="+", default=[10000, 100000, 1000000]
+    )
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    for tamano in args.tamanos:
+        azar = random.Random(tamano)
+        indice = IndiceFacturas()
+        inicio = time.perf_counter()
+        indice.agregar(filas(tamano, azar))
+        segundos = time.perf_counter() - inicio
+        print(
+            f"\n{tamano} facturas: índices en {segundos:.2f} s "
+            f"({tamano / segundos:.0f} facturas/s)"
+        )
+
+        for nombre, parametros in consultas(azar).items():
+            tiempos = []
+            for _ in range(args.repeticiones):
+                filtros = parametros()
+                inicio = time.perf_counter()
+                indice.buscar(limite=50, **filtros)
+                tiempos.append(time.perf_counter() - inicio)
+            (p50,) = percentiles(tiempos, 50)
+            print(f"  {nombre:>24}: p50 {p50 * 1e6:10.1f} µs")
+
+        inicio = time.perf_counter()
+        recorrido_lineal(indice, 1000.0, 1005.0)
+        lineal = time.perf_counter() - inicio
+        print(f"  {'recorrido lineal':>24}:     {lineal * 1e6:10.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
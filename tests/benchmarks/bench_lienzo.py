@@ -0,0 +1,71 @@
+"""Render directo sobre el canvas frente a platypus.
+
+Mide la CPU por PDF de las facturas de una página con el render directo y
+con platypus (`RENDER_DIRECTO` desactivado), y lo mismo para una mezcla de
+facturas del generador del backend, de 1 a 5 líneas, donde las que no
+caben en una página siguen pasando por platypus.
+
+Uso:
+    python tests/benchmarks/bench_lienzo.py --iteraciones 300
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [
+    str(RAIZ / "tests"),
+    str(RAIZ / "frontend" / "app"),
+    str(RAIZ / "backend" / "app"),
+]
+
+import factura_lienzo  # noqa: E402
+import factura_pdf  # noqa: E402
+from generador import Generador  # noqa: E402
+from utilidades import FACTURA_EJEMPLO  # noqa: E402
+
+
+def cpu_por_pdf(facturas, directo, iteraciones):
+    """CPU media por PDF (µs) con el render directo activado o no."""
+    factura_pdf.RENDER_DIRECTO = directo
+    for factura in facturas[:5]:
+        factura_pdf.render_factura(factura)
+    inicio = time.process_time()
+    for i in range(iteraciones):
+        factura_pdf.render_factura(facturas[i % len(facturas)])
+    return (time.process_time() - inicio) / iteraciones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iteraciones", type=int, default=300)
+    args = parser.parse_args()
+
+    mezcla = Generador().generar_lote(range(args.iteraciones))
+    directas = [
+        f
+        for f in mezcla
+        if factura_lienzo.maquetar(factura_pdf.normalizar_factura(f)) is not None
+    ]
+    casos = {
+        "ejemplo, 1 línea": [
+            {**FACTURA_EJEMPLO, "detalle": FACTURA_EJEMPLO["detalle"][:1]}
+        ],
+        "ejemplo, 2 líneas": [FACTURA_EJEMPLO],
+        "backend, una página": directas,
+        f"backend, mezcla ({len(directas)}/{len(mezcla)} directas)": mezcla,
+    }
+
+    for caso, facturas in casos.items():
+        platypus = cpu_por_pdf(facturas, False, args.iteraciones)
+        directo = cpu_por_pdf(facturas, True, args.iteraciones)
+        print(
+            f"{caso:>32}: platypus {platypus:8.1f} µs, directo {directo:8.1f} µs "
+            f"(x{platypus / directo:.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Throughput del lote en paralelo frente al bucle de una factura por vez.
+
+Uso:
+    python tests/benchmarks/bench_lote.py --facturas 200 --concurrencia 4
+
+Levanta un backend falso local, así que no necesita los contenedores.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "tests"), str(RAIZ / "frontend" / "app")]
+
+import lote  # noqa: E402
+import renderizador  # noqa: E402
+from cliente_backend import ClienteBackend  # noqa: E402
+from factura_pdf import render_factura  # noqa: E402
+from utilidades import servidor_backend_falso  # noqa: E402
+
+
+def una_por_vez(backend, ids):
+    for id_factura in ids:
+        resp = backend.get(f"/facturas/v1/{id_factura}")
+        render_factura(backend.decodificar(resp))
+
+
+def en_lote(backend, ids, concurrencia):
+    for _ in lote.generar_zip(ids, backend, concurrencia):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=None)
+    args = parser.parse_args()
+    ids = [str(n) for n in range(1, args.facturas + 1)]
+
+    with servidor_backend_falso() as url:
+        backend = ClienteBackend(url)
+        renderizador.obtener_pool().submit(int).result()  # arrancar los procesos
+        for nombre, funcion in (
+            ("una por vez", lambda: una_por_vez(backend, ids)),
+            ("lote", lambda: en_lote(backend, ids, args.concurrencia)),
+        ):
+            inicio = time.perf_counter()
+            funcion()
+            segundos = time.perf_counter() - inicio
+            tasa = len(ids) / segundos
+            print(f"{nombre:>12}: {tasa:8.1f} facturas/s ({segundos:.2f} s)")
+    print(f"procesos del pool: {renderizador.RENDER_PROCESOS}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Micro-benchmark de la plantilla precompilada.
+
+Compara el render actual, que reutiliza los estilos construidos al importar,
+con el de antes, que reconstruía la hoja de estilos, los ParagraphStyle y los
+TableStyle en cada petición (emulado llamando a `construir_estilos()`).
+
+Uso:
+    python tests/benchmarks/bench_plantilla.py --iteraciones 300
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "tests"), str(RAIZ / "frontend" / "app")]
+
+from factura_pdf import construir_estilos, render_factura  # noqa: E402
+from utilidades import FACTURA_EJEMPLO  # noqa: E402
+
+
+def render_antes():
+    construir_estilos()
+    return render_factura(FACTURA_EJEMPLO)
+
+
+def render_ahora():
+    return render_factura(FACTURA_EJEMPLO)
+
+
+def medir(funcion, iteraciones):
+    """CPU media por llamada (µs) y bytes asignados en el pico por llamada."""
+    funcion()
+    inicio = time.process_time()
+    for _ in range(iteraciones):
+        funcion()
+    cpu = (time.process_time() - inicio) / iteraciones * 1e6
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iteraciones", type=int, default=300)
+    args = parser.parse_args()
+
+    resultados = {}
+    for nombre, funcion in (
+        ("solo estilos", construir_estilos),
+        ("render antes", render_antes),
+        ("render ahora", render_ahora),
+    ):
+        resultados[nombre] = medir(funcion, args.iteraciones)
+        cpu, pico = resultados[nombre]
+        print(f"{nombre:>13}: {cpu:9.1f} µs CPU/factura, pico {pico / 1024:8.1f} KiB")
+
+    ahorro = resultados["render antes"][0] - resultados["render ahora"][0]
+    peticiones = 1000
+    print(
+        f"ahorro: {ahorro:.1f} µs CPU por factura "
+        f"({ahorro * peticiones / 1e6:.2f} s de CPU cada {peticiones} peticiones)"
+    )
+
+
+if __name__ == "__main__":
+    main()
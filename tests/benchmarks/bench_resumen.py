@@ -0,0 +1,78 @@
+"""Agregación y render del informe resumen de facturación.
+
+Genera las facturas por bloques con el generador del backend (sin HTTP, para
+medir solo el frontend) y compara la agregación columnar de `resumen.Resumen`
+con la de referencia, que recorre cada factura y suma en diccionarios. Al
+final renderiza el PDF del resumen. La memoria solo crece con el bloque y con
+el número de meses y clientes, no con el total de facturas.
+
+Uso:
+    python tests/benchmarks/bench_resumen.py --facturas 300000 --bloque 10000
+"""
+
+import argparse
+import sys
+import resource
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "backend" / "app"), str(RAIZ / "frontend" / "app")]
+
+from generador import Generador  # noqa: E402
+from resumen import Resumen, render_resumen  # noqa: E402
+
+
+class ResumenDiccionarios:
+    """Referencia: una pasada de Python por factura"""
+
+    def __init__(self):
+        self.sumas = {}
+
+    def agregar(self, facturas):
+        for f in facturas:
+            clave = (f["fecha_emision"][:7], f["cliente"]["nombre"])
+            suma = self.sumas.get(clave)
+            if suma is None:
+                suma = self.sumas[clave] = [0, 0.0, 0.0, 0.0]
+            suma[0] += 1
+            suma[1] += f["subtotal"]
+            suma[2] += f["impuesto"]
+            suma[3] += f["total"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--facturas", type=int, default=300000)
+    parser.add_argument("--bloque", type=int, default=10000)
+    args = parser.parse_args()
+
+    generador = Generador()
+    agregadores = {"columnar": Resumen(), "diccionarios": ResumenDiccionarios()}
+    segundos = dict.fromkeys(agregadores, 0.0)
+    for inicio in range(1, args.facturas + 1, args.bloque):
+        fin = min(inicio + args.bloque, args.facturas + 1)
+        bloque = generador.generar_lote(range(inicio, fin))
+        for nombre, agregador in agregadores.items():
+            t = time.perf_counter()
+            agregador.agregar(bloque)
+            segundos[nombre] += time.perf_counter() - t
+        del bloque
+
+    print(f"{args.facturas} facturas en bloques de {args.bloque}:")
+    for nombre, s in segundos.items():
+        print(f"  {nombre:>12}: {s:6.2f} s ({args.facturas / s:,.0f} facturas/s)")
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"  memoria máxima del proceso: {pico:.0f} MiB")
+
+    resumen = agregadores["columnar"]
+    inicio = time.perf_counter()
+    pdf = render_resumen(resumen, 1, args.facturas)
+    print(
+        f"PDF: {len(resumen.clientes)} clientes, {len(resumen.meses)} meses, "
+        f"{len(pdf) / 1024:.0f} KiB en {time.perf_counter() - inicio:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Latencia de la vista previa HTML frente a la vista previa en PDF.
+
+Pide la misma factura por `/vista-previa-pdf` (con la caché de PDF
+desactivada, para medir el render completo) y por `/vista-previa-html`, y
+muestra los percentiles de cada una.
+
+Uso:
+    python tests/benchmarks/bench_vista_previa.py --peticiones 200 --lineas 5
+
+Levanta un backend falso local, así que no necesita los contenedores.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parents[2]
+sys.path[:0] = [str(RAIZ / "tests"), str(RAIZ / "frontend" / "app")]
+
+from cache_pdf import CachePDF  # noqa: E402
+from cliente_backend import ClienteBackend  # noqa: E402
+from conftest import FRONTEND_APP, cargar_main  # noqa: E402
+from utilidades import percentiles, servidor_backend_falso  # noqa: E402
+
+
+def medir(client, ruta, ids):
+    latencias = []
+    for id_factura in ids:
+        inicio = time.perf_counter()
+        resp = client.get(ruta, query_string={"id_factura": id_factura})
+        resp.get_data()
+        latencias.append(time.perf_counter() - inicio)
+        assert resp.status_code == 200, resp.status_code
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument(
+        "--lineas", type=int, default=0, help="líneas de detalle (0 = ejemplo)"
+    )
+    args = parser.parse_args()
+
+    frontend = cargar_main("frontend_main", FRONTEND_APP)
+    frontend.cache_pdf = CachePDF(capacidad_memoria=0)
+    client = frontend.app.test_client()
+    ids = [
+        f"grande-{args.lineas}" if args.lineas else str(n)
+        for n in range(args.peticiones)
+    ]
+
+    with servidor_backend_falso() as url:
+        frontend.backend = ClienteBackend(url)
+        frontend.renderizador.obtener_pool().submit(int).result()
+        resultados = {}
+        for nombre, ruta in (
+            ("pdf", "/vista-previa-pdf"),
+            ("html", "/vista-previa-html"),
+        ):
+            medir(client, ruta, ids[:5])  # calentamiento
+            latencias = medir(client, ruta, ids)
+            p50, p95, p99 = (v * 1000 for v in percentiles(latencias, 50, 95, 99))
+            resultados[nombre] = p50
+            print(
+                f"{nombre:>5}: p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  p99 {p99:7.2f} ms"
+            )
+    mejora = resultados["pdf"] / resultados["html"]
+    print(f"la vista previa HTML es x{mejora:.1f} más rápida (p50)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Prueba de carga del backend: facturas/s y latencias frente a los workers.
+
+Arranca el backend en un subproceso y lanza lotes concurrentes a
+/facturas/v1/batch con rangos siempre distintos (la caché de facturas se
+desactiva para medir la generación). Los clientes son procesos aparte para que
+el propio cliente no se quede en un núcleo. Modos:
+
+- uvicorn: un único proceso, como el arranque anterior del contenedor.
+- gunicorn: gunicorn.conf.py con `--workers` workers de uvicorn.
+
+Con un worker por núcleo, las facturas/s deberían crecer casi en proporción
+al número de workers hasta agotar los núcleos libres (los clientes también
+ocupan CPU).
+
+Uso:
+    python tests/benchmarks/carga_backend.py --workers 1 2 4 --segundos 15
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import requests
+
+from carga_frontend import puerto_libre
+
+RAIZ = Path(__file__).resolve().parents[2]
+BACKEND_APP = RAIZ / "backend" / "app"
+sys.path.insert(0, str(RAIZ / "tests"))
+
+from utilidades import percentiles  # noqa: E402
+
+
+def arrancar_backend(modo, workers):
+    puerto = puerto_libre()
+    env = {
+        **os.environ,
+        "CACHE_FACTURAS_TAMANO": "0",
+        "API_BIND": f"127.0.0.1:{puerto}",
+        "API_WORKERS": str(workers),
+        "API_ACCESSLOG": "",
+    }
+    if modo == "uvicorn":
+        comando = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto)]
+        comando += ["--no-access-log"]
+    else:
+        comando = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+        comando += ["main:app"]
+    proceso = subprocess.Popen(
+        comando,
+        cwd=BACKEND_APP,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    for _ in range(300):
+        try:
+            requests.get(f"{url}/facturas/v1/1", timeout=5)
+            return proceso, url
+        except (requests.ConnectionError, requests.Timeout):
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError(f"El backend en modo {modo} no arrancó")
+
+
+def cliente(url, numero_cliente, lote, segundos):
+    """
+    Pide lotes de `lote` facturas nuevas durante `segundos`; devuelve las
+    latencias de los que respondieron 200 y el número de errores
+    """
+    sesion = requests.Session()
+    desde = numero_cliente * 10**9 + 1
+    latencias, errores = [], 0
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        inicio = time.perf_counter()
+        resp = sesion.get(
+            f"{url}/facturas/v1/batch",
+            params={"desde": desde, "hasta": desde + lote - 1},
+        )
+        if resp.status_code == 200:
+            latencias.append(time.perf_counter() - inicio)
+        else:
+            errores += 1
+        desde += lote
+    return latencias, errores
+
+
+def cargar(url, concurrencia, lote, segundos, ronda):
+    with ProcessPoolExecutor(concurrencia) as pool:
+        futuros = [
+            pool.submit(cliente, url, ronda * concurrencia + i, lote, segundos)
+            for i in range(concurrencia)
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+    latencias = [latencia for parcial, _ in resultados for latencia in parcial]
+    errores = sum(errores for _, errores in resultados)
+    p50, p99 = percentiles(latencias, 50, 99) if latencias else (0, 0)
+    return len(latencias) * lote / segundos, p50 * 1000, p99 * 1000, errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrencia", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--lote", type=int, default=200)
+    parser.add_argument("--segundos", type=float, default=10)
+    args = parser.parse_args()
+
+    configuraciones = [("uvicorn", 1)] + [("gunicorn", w) for w in args.workers]
+    print(
+        f"{'modo':>8} {'workers':>7} {'facturas/s':>10} {'p50 ms':>8} "
+        f"{'p99 ms':>8} errores"
+    )
+    base = None
+    for ronda, (modo, workers) in enumerate(configuraciones):
+        proceso, url = arrancar_backend(modo, workers)
+        try:
+            # Calentar: que todos los workers hayan importado y respondido
+            cargar(url, args.concurrencia, args.lote, 1, 2 * ronda)
+            por_segundo, p50, p99, errores = cargar(
+                url, args.concurrencia, args.lote, args.segundos, 2 * ronda + 1
+            )
+        finally:
+            proceso.terminate()
+            proceso.wait()
+        base = base or por_segundo
+        print(
+            f"{modo:>8} {workers:>7} {por_segundo:10.0f} {p50:8.1f} {p99:8.1f} "
+            f"{errores}  (x{por_segundo / base:.2f})"
+        )
+
+
+if __name__ == "__main__":
+    main()
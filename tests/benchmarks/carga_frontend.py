@@ -0,0 +1,143 @@
+"""Prueba de carga del frontend: peticiones/s y latencias p50/p99.
+
+Arranca el frontend en un subproceso contra un backend falso local y lanza
+peticiones concurrentes a /generar-pdf con ids siempre distintos (la caché de
+PDF se desactiva para medir el render). Modos:
+
+- dev: servidor de desarrollo de Flask con un único proceso de render, que
+  equivale a la configuración anterior (`python main.py`, un solo núcleo).
+- prod: gunicorn con gunicorn.conf.py y `--procesos` procesos de render.
+
+Uso:
+    python tests/benchmarks/carga_frontend.py --procesos 1 2 4 --segundos 15
+"""
+
+import argparse
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+RAIZ = Path(__file__).resolve().parents[2]
+FRONTEND_APP = RAIZ / "frontend" / "app"
+sys.path.insert(0, str(RAIZ / "tests"))
+
+from utilidades import servidor_backend_falso  # noqa: E402
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def arrancar_frontend(modo, procesos, workers, backend_url):
+    puerto = puerto_libre()
+    env = {
+        **os.environ,
+        "BACKEND_API_URL": backend_url,
+        "CACHE_PDF_TAMANO": "0",
+        "RENDER_PROCESOS": str(procesos),
+        "WEB_BIND": f"127.0.0.1:{puerto}",
+        "WEB_WORKERS": str(workers),
+        "WEB_ACCESSLOG": "",
+    }
+    if modo == "dev":
+        comando = [
+            sys.executable,
+            "-c",
+            f"import main; main.app.run(host='127.0.0.1', port={puerto})",
+        ]
+    else:
+        comando = [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            "gunicorn.conf.py",
+            "main:app",
+        ]
+    proceso = subprocess.Popen(
+        comando,
+        cwd=FRONTEND_APP,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    for _ in range(100):
+        try:
+            requests.get(url, timeout=1)
+            return proceso, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError(f"El frontend en modo {modo} no arrancó")
+
+
+def cargar(url, concurrencia, segundos):
+    contador = itertools.count()
+    latencias, errores = [], 0
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def cliente():
+        nonlocal errores
+        sesion = requests.Session()
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            resp = sesion.post(
+                f"{url}/generar-pdf", data={"id_factura": next(contador)}
+            )
+            duracion = time.perf_counter() - inicio
+            with lock:
+                if resp.status_code == 200:
+                    latencias.append(duracion)
+                else:
+                    errores += 1
+
+    hilos = [threading.Thread(target=cliente) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    latencias.sort()
+
+    def percentil(p):
+        return latencias[int(p * (len(latencias) - 1))] * 1000 if latencias else 0
+
+    return len(latencias) / segundos, percentil(0.5), percentil(0.99), errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procesos", type=int, nargs="+", default=[os.cpu_count()])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--segundos", type=float, default=10)
+    args = parser.parse_args()
+
+    configuraciones = [("dev", 1)] + [("prod", p) for p in args.procesos]
+    print(
+        f"{'modo':>5} {'procesos':>8} {'pet/s':>8} {'p50 ms':>8} {'p99 ms':>8} errores"
+    )
+    with servidor_backend_falso() as backend_url:
+        for modo, procesos in configuraciones:
+            proceso, url = arrancar_frontend(modo, procesos, args.workers, backend_url)
+            try:
+                cargar(url, args.concurrencia, 1)  # calentar workers y pool
+                rps, p50, p99, errores = cargar(url, args.concurrencia, args.segundos)
+            finally:
+                proceso.terminate()
+                proceso.wait()
+            print(f"{modo:>5} {procesos:>8} {rps:8.1f} {p50:8.1f} {p99:8.1f} {errores}")
+
+
+if __name__ == "__main__":
+    main()
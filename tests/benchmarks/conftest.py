@@ -0,0 +1,72 @@
+"""Registro de métricas de la suite de rendimiento.
+
+Los resultados se escriben en JSON (`BENCHMARKS_SALIDA`) al final de la
+sesión. Si `BENCHMARKS_BASE` apunta a los resultados de una ejecución
+anterior, cada métrica se compara con ella y la prueba falla cuando empeora
+más de `BENCHMARKS_TOLERANCIA` (0.25 = un 25%).
+"""
+
+import json
+import os
+import platform
+import time
+
+import pytest
+
+BENCHMARKS_SALIDA = os.getenv("BENCHMARKS_SALIDA", "benchmarks.json")
+BENCHMARKS_BASE = os.getenv("BENCHMARKS_BASE")
+BENCHMARKS_TOLERANCIA = float(os.getenv("BENCHMARKS_TOLERANCIA", "0.25"))
+
+
+class Registro:
+    def __init__(self, base=None, tolerancia=BENCHMARKS_TOLERANCIA):
+        self.metricas = {}
+        self.base = base or {}
+        self.tolerancia = tolerancia
+        self._regresiones = []
+
+    def medir(self, nombre, valor, unidad, mayor_es_mejor=False):
+        """Guarda una métrica y la compara con la ejecución base."""
+        valor = round(valor, 3)
+        self.metricas[nombre] = {
+            "valor": valor,
+            "unidad": unidad,
+            "mayor_es_mejor": mayor_es_mejor,
+        }
+        anterior = self.base.get(nombre, {}).get("valor")
+        if not anterior:
+            return
+        cambio = (valor - anterior) / anterior
+        if (-cambio if mayor_es_mejor else cambio) > self.tolerancia:
+            self._regresiones.append(
+                f"{nombre}: {anterior} -> {valor} {unidad} ({cambio:+.0%})"
+            )
+
+    def verificar(self):
+        """Falla si alguna métrica registrada desde la última llamada empeoró."""
+        regresiones, self._regresiones = self._regresiones, []
+        if regresiones:
+            pytest.fail("Regresiones de rendimiento:\n" + "\n".join(regresiones))
+
+    def guardar(self, ruta):
+        resultado = {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "tolerancia": self.tolerancia,
+            "metricas": self.metricas,
+        }
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+
+@pytest.fixture(scope="session")
+def registro():
+    base = None
+    if BENCHMARKS_BASE:
+        with open(BENCHMARKS_BASE, encoding="utf-8") as f:
+            base = json.load(f)["metricas"]
+    registro = Registro(base)
+    yield registro
+    if registro.metricas:
+        registro.guardar(BENCHMARKS_SALIDA)
@@ -0,0 +1,124 @@
+"""Suite de rendimiento de extremo a extremo.
+
+Mide la generación del backend, el coste por etapa del render del frontend
+(consulta, construcción de elementos y `doc.build`) y la latencia de
+`/generar-pdf` y `/vista-previa-pdf` con peticiones concurrentes. El frontend
+habla con el backend FastAPI real dentro del mismo proceso, sin red.
+
+Solo se ejecuta con BENCHMARKS=1:
+
+    BENCHMARKS=1 python -m pytest tests/benchmarks -q
+    BENCHMARKS=1 BENCHMARKS_BASE=benchmarks.json BENCHMARKS_SALIDA=nuevo.json \
+        python -m pytest tests/benchmarks -q
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate
+
+from cache_pdf import CachePDF
+from factura_pdf import MARGEN, PlantillaFactura, normalizar_factura
+from utilidades import cliente_backend_en_proceso, percentiles
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("BENCHMARKS"), reason="benchmarks desactivados (BENCHMARKS=1)"
+)
+
+FACTURAS = int(os.getenv("BENCHMARKS_FACTURAS", "2000"))
+PETICIONES = int(os.getenv("BENCHMARKS_PETICIONES", "200"))
+CONCURRENCIA = int(os.getenv("BENCHMARKS_CONCURRENCIA", "8"))
+
+
+@pytest.fixture(scope="module")
+def cliente(backend):
+    return cliente_backend_en_proceso(backend.app)
+
+
+def test_generacion_backend(backend, registro):
+    numeros = [f"GEN-{n}" for n in range(FACTURAS)]
+    inicio = time.perf_counter()
+    for numero in numeros:
+        backend.generar_factura(numero)
+    registro.medir(
+        "backend.generacion",
+        FACTURAS / (time.perf_counter() - inicio),
+        "facturas/s",
+        mayor_es_mejor=True,
+    )
+
+    backend.cache_facturas.limpiar()
+    client = TestClient(backend.app)
+    cantidad = FACTURAS // 4
+    inicio = time.perf_counter()
+    for n in range(cantidad):
+        assert client.get(f"/facturas/v1/GET-{n}").status_code == 200
+    registro.medir(
+        "backend.get_factura",
+        cantidad / (time.perf_counter() - inicio),
+        "facturas/s",
+        mayor_es_mejor=True,
+    )
+    registro.verificar()
+
+
+def test_etapas_render(cliente, registro):
+    plantilla = PlantillaFactura()
+    etapas = {"consulta": [], "elementos": [], "doc_build": []}
+    for n in range(PETICIONES):
+        t0 = time.perf_counter()
+        factura = cliente.decodificar(cliente.get(f"/facturas/v1/ETAPA-{n}"))
+        t1 = time.perf_counter()
+        datos = normalizar_factura(factura)
+        elementos = plantilla.elementos(datos)
+        t2 = time.perf_counter()
+        doc = SimpleDocTemplate(
+            BytesIO(),
+            pagesize=letter,
+            leftMargin=MARGEN,
+            rightMargin=MARGEN,
+            topMargin=MARGEN,
+            bottomMargin=MARGEN,
+        )
+        doc.build(elementos)
+        t3 = time.perf_counter()
+        etapas["consulta"].append(t1 - t0)
+        etapas["elementos"].append(t2 - t1)
+        etapas["doc_build"].append(t3 - t2)
+
+    for etapa, tiempos in etapas.items():
+        (p50,) = percentiles(tiempos, 50)
+        registro.medir(f"render.{etapa}.p50", p50 * 1000, "ms")
+    registro.verificar()
+
+
+@pytest.mark.parametrize("ruta", ["/generar-pdf", "/vista-previa-pdf"])
+def test_latencia_extremo_a_extremo(frontend, cliente, registro, monkeypatch, ruta):
+    monkeypatch.setattr(frontend, "backend", cliente)
+    monkeypatch.setattr(frontend, "cache_pdf", CachePDF(capacidad_memoria=0))
+    frontend.renderizador.obtener_pool().submit(int).result()  # arrancar procesos
+    app = frontend.app
+
+    def peticion(n):
+        inicio = time.perf_counter()
+        resp = app.test_client().get(ruta, query_string={"id_factura": f"E2E-{n}"})
+        assert resp.status_code == 200, resp.data[:200]
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCIA) as pool:
+        latencias = list(pool.map(peticion, range(PETICIONES)))
+    segundos = time.perf_counter() - inicio
+
+    nombre = ruta.strip("/")
+    for p, valor in zip((50, 95, 99), percentiles(latencias, 50, 95, 99)):
+        registro.medir(f"{nombre}.p{p}", valor * 1000, "ms")
+    registro.medir(
+        f"{nombre}.rendimiento", PETICIONES / segundos, "pdf/s", mayor_es_mejor=True
+    )
+    registro.verificar()
@@ -0,0 +1,49 @@
+"""Configuración compartida de pytest.
+
+Cada servicio vive en su propio directorio `app/` con módulos planos (igual que
+dentro de su contenedor), así que ambos directorios se añaden a `sys.path` y
+los `main.py` se cargan con nombres distintos para que no colisionen.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parents[1]
+BACKEND_APP = RAIZ / "backend" / "app"
+FRONTEND_APP = RAIZ / "frontend" / "app"
+
+for ruta in (BACKEND_APP, FRONTEND_APP):
+    if str(ruta) not in sys.path:
+        sys.path.insert(0, str(ruta))
+
+
+def cargar_main(nombre, directorio):
+    """Importa el `main.py` de un servicio bajo el nombre de módulo indicado."""
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    spec = importlib.util.spec_from_file_location(nombre, directorio / "main.py")
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.fixture(scope="session")
+def frontend():
+    return cargar_main("frontend_main", FRONTEND_APP)
+
+
+@pytest.fixture(scope="session")
+def backend():
+    return cargar_main("backend_main", BACKEND_APP)
+
+
+@pytest.fixture
+def backend_falso():
+    from utilidades import servidor_backend_falso
+
+    with servidor_backend_falso() as url:
+        yield url
@@ -0,0 +1,94 @@
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import almacen
+
+
+@pytest.fixture
+def ruta_almacen(tmp_path):
+    ruta = str(tmp_path / "facturas.db")
+    almacen.cargar(ruta, 20, inicio=1, tamano_bloque=8)
+    return ruta
+
+
+@pytest.fixture
+def client(backend, ruta_almacen, monkeypatch):
+    monkeypatch.setattr(
+        backend, "almacen_facturas", almacen.AlmacenFacturas(ruta_almacen)
+    )
+    backend.cache_facturas.limpiar()
+    yield TestClient(backend.app)
+    backend.cache_facturas.limpiar()
+
+
+def marcar(ruta, numero):
+    """Cambia la factura guardada para distinguirla de una generada"""
+    factura = almacen.AlmacenFacturas(ruta).obtener(numero)[0]
+    factura["total"] = -1.0
+    conexion = sqlite3.connect(ruta)
+    with conexion:
+        conexion.execute(almacen.INSERTAR, almacen.fila(factura))
+    conexion.close()
+
+
+def test_cargar_guarda_las_facturas_generadas(backend, ruta_almacen):
+    guardado = almacen.AlmacenFacturas(ruta_almacen)
+
+    factura, etag = guardado.obtener("7")
+
+    assert guardado.facturas == 20
+    assert factura == backend.generador.generar("7")
+    assert etag == backend.calcular_etag(factura)
+    assert guardado.obtener("21") is None
+
+
+def test_obtener_varios_ignora_repetidos_y_ausentes(ruta_almacen, monkeypatch):
+    monkeypatch.setattr(almacen, "MAX_PARAMETROS", 3)
+    guardado = almacen.AlmacenFacturas(ruta_almacen)
+
+    encontradas = guardado.obtener_varios(["1", "2", "1", "X", "9", "15", "20"])
+
+    assert sorted(encontradas, key=int) == ["1", "2", "9", "15", "20"]
+    estadisticas = guardado.estadisticas()
+    assert estadisticas["buscadas"] == 6
+    assert estadisticas["encontradas"] == 5
+
+
+def test_almacen_inexistente(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        almacen.AlmacenFacturas(str(tmp_path / "no-existe.db"))
+
+
+def test_get_factura_sale_del_almacen_y_genera_las_ausentes(client, ruta_almacen):
+    marcar(ruta_almacen, "3")
+
+    assert client.get("/facturas/v1/3").json()["total"] == -1.0
+    assert client.get("/facturas/v1/X-9").json()["numero_factura"] == "X-9"
+    estadisticas = client.get("/cache/stats").json()["almacen"]
+    assert (estadisticas["buscadas"], estadisticas["encontradas"]) == (2, 1)
+
+
+def test_lote_y_stream_mezclan_almacen_y_generacion(client, ruta_almacen):
+    marcar(ruta_almacen, "19")
+    params = {"numeros": ["A-1", "19"], "desde": 19, "hasta": 22}
+
+    lote = client.get("/facturas/v1/batch", params=params).json()["facturas"]
+    with client.stream("GET", "/facturas/v1/batch/stream", params=params) as resp:
+        stream = [json.loads(linea) for linea in resp.iter_lines() if linea]
+
+    numeros = ["A-1", "19", "19", "20", "21", "22"]
+    assert [f["numero_factura"] for f in lote] == numeros
+    assert stream == lote
+    assert [f["total"] == -1.0 for f in lote] == [0, 1, 1, 0, 0, 0]
+
+
+def test_linea_de_comandos_informa_del_rendimiento(tmp_path, capsys):
+    ruta = str(tmp_path / "cli.db")
+
+    almacen.main(["--ruta", ruta, "--cantidad", "5", "--procesos", "1"])
+
+    assert almacen.AlmacenFacturas(ruta).facturas == 5
+    assert "facturas/s" in capsys.readouterr().err
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from cache_lru import CacheLRU
+
+
+@pytest.fixture
+def client(backend):
+    backend.cache_facturas.limpiar()
+    return TestClient(backend.app)
+
+
+def test_misma_factura_para_el_mismo_numero(backend):
+    assert backend.generar_factura("FAC-7") == backend.generar_factura("FAC-7")
+    assert backend.generar_factura("FAC-7") != backend.generar_factura("FAC-8")
+
+
+def test_get_factura_envia_etag_y_responde_304(client):
+    resp = client.get("/facturas/v1/FAC-1")
+    etag = resp.headers["etag"]
+    assert resp.headers["cache-control"].startswith("public, max-age=")
+
+    repetida = client.get("/facturas/v1/FAC-1", headers={"If-None-Match": etag})
+
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert client.get("/cache/stats").json()["hits"] == 1
+
+
+def test_cache_lru_descarta_la_menos_usada():
+    cache = CacheLRU(capacidad=2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obtener("a")
+    cache.guardar("c", 3)
+
+    assert cache.obtener("b") is None
+    assert cache.obtener("a") == 1
+    assert cache.estadisticas()["tamano"] == 2
+
+
+def test_cache_lru_caduca_por_ttl(monkeypatch):
+    cache = CacheLRU(capacidad=10, ttl=5)
+    cache.guardar("a", 1)
+    ahora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: ahora + 6)
+
+    assert cache.obtener("a") is None
+    assert cache.estadisticas() == {
+        "hits": 0,
+        "misses": 1,
+        "tamano": 0,
+        "capacidad": 10,
+        "ttl": 5,
+    }
@@ -0,0 +1,83 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import exportar
+from generador import Generador
+
+
+@pytest.fixture(scope="module")
+def generador():
+    return Generador(tamano_pool=64)
+
+
+def test_ndjson_coincide_con_el_generador(generador):
+    salida = b"".join(
+        exportar.exportar(25, semilla=3, tamano_bloque=10, generador=generador)
+    )
+
+    facturas = [json.loads(linea) for linea in salida.splitlines()]
+    assert facturas == generador.generar_lote(range(1, 26), 3)
+
+
+def test_csv_tiene_una_fila_por_linea_de_detalle(generador):
+    estadisticas = exportar.Estadisticas()
+    salida = b"".join(
+        exportar.exportar(
+            12, "csv", generador=generador, estadisticas=estadisticas, tamano_bloque=5
+        )
+    )
+
+    filas = list(csv.DictReader(io.StringIO(salida.decode())))
+    lineas = sum(len(f["detalle"]) for f in generador.generar_lote(range(1, 13)))
+    assert len(filas) == lineas == estadisticas.filas
+    assert estadisticas.facturas == 12
+    assert tuple(filas[0]) == exportar.COLUMNAS_CSV
+    assert filas[0]["numero_factura"] == "1" and filas[0]["linea"] == "1"
+
+
+def test_varios_procesos_mantienen_el_orden():
+    secuencial = b"".join(exportar.exportar(30, semilla=9, tamano_bloque=4))
+    paralelo = b"".join(exportar.exportar(30, semilla=9, procesos=2, tamano_bloque=4))
+
+    assert paralelo == secuencial
+
+
+def test_endpoint_export_gzip(backend):
+    client = TestClient(backend.app)
+
+    resp = client.get(
+        "/facturas/v1/export", params={"cantidad": 5, "semilla": 1, "gzip": True}
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/gzip"
+    lineas = gzip.decompress(resp.content).splitlines()
+    numeros = [json.loads(linea)["numero_factura"] for linea in lineas]
+    assert numeros == ["1", "2", "3", "4", "5"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"cantidad": 0},
+        {"cantidad": 5, "formato": "xml"},
+        {},
+        {"cantidad": 1, "semilla": 2**128},
+    ],
+)
+def test_endpoint_export_rechaza_parametros_invalidos(backend, params):
+    client = TestClient(backend.app)
+    resp = client.get("/facturas/v1/export", params=params)
+    assert resp.status_code in (400, 422)
+
+
+@pytest.mark.parametrize("semilla", ["-1", str(2**128)])
+def test_cli_rechaza_semillas_fuera_de_rango(semilla, capsys):
+    with pytest.raises(SystemExit):
+        exportar.main(["--cantidad", "1", "--semilla", semilla])
+    assert "--semilla debe estar entre 0 y" in capsys.readouterr().err
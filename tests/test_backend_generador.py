@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from generador import Generador
+
+
+@pytest.fixture(scope="module")
+def generador():
+    return Generador(tamano_pool=64)
+
+
+def test_generar_es_determinista_y_depende_de_la_semilla_extra(generador):
+    otro = Generador(tamano_pool=64)
+
+    assert generador.generar("FAC-1") == otro.generar("FAC-1")
+    assert generador.generar("FAC-1") != generador.generar("FAC-2")
+    assert generador.generar("FAC-1", 7) == otro.generar("FAC-1", 7)
+    assert generador.generar("FAC-1", 7) != generador.generar("FAC-1")
+
+
+def test_fecha_de_emision_es_relativa_a_la_fecha_de_referencia():
+    referencia = date(2024, 3, 1)
+    generador = Generador(tamano_pool=64, fecha_referencia=referencia)
+
+    fechas = [
+        date.fromisoformat(f["fecha_emision"])
+        for f in generador.generar_lote(range(200))
+    ]
+
+    assert all(referencia - timedelta(days=365) <= f <= referencia for f in fechas)
+    assert generador.generar("9") == Generador(64, fecha_referencia=referencia).generar(
+        "9"
+    )
+
+
+def test_generar_lote_coincide_con_generar(generador):
+    numeros = [str(n) for n in range(50)]
+
+    assert generador.generar_lote(numeros) == [generador.generar(n) for n in numeros]
+    assert generador.generar_lote([]) == []
+
+
+def test_importes_conservan_redondeo_e_iva(generador):
+    for factura in generador.generar_lote([str(n) for n in range(500)]):
+        detalle = factura["detalle"]
+        assert 1 <= len(detalle) <= 5
+        for item in detalle:
+            assert 1 <= item["cantidad"] <= 10
+            assert 50 <= item["precio_unitario"] <= 500
+            assert item["precio_unitario"] == round(item["precio_unitario"], 2)
+            assert item["total"] == round(item["cantidad"] * item["precio_unitario"], 2)
+        subtotal = round(sum(item["total"] for item in detalle), 2)
+        assert factura["subtotal"] == subtotal
+        assert factura["impuesto"] == round(subtotal * 0.19, 2)
+        assert factura["total"] == round(subtotal + factura["impuesto"], 2)
+        assert 100000 <= factura["empresa"]["nit"] <= 999999
+        assert 100000 <= factura["cliente"]["documento"] <= 999999
+
+
+def test_batch_usa_cache_y_genera_faltantes(backend):
+    backend.cache_facturas.limpiar()
+    client = TestClient(backend.app)
+    individual = client.get("/facturas/v1/G-2").json()
+
+    lote = client.get("/facturas/v1/batch", params={"numeros": ["G-1", "G-2", "G-1"]})
+
+    facturas = lote.json()["facturas"]
+    assert facturas[1] == individual
+    assert facturas[0] == facturas[2] == backend.generar_factura("G-1")
+    assert client.get("/cache/stats").json()["tamano"] == 2
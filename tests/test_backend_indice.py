@@ -0,0 +1,166 @@
+import random
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+import almacen
+from indice import IndiceFacturas
+
+CLIENTES = ["Acme S.L.", "Beta S.A.", "Gamma y Asociados"]
+
+
+def filas_aleatorias(cantidad, azar, inicio=0):
+    return [
+        (
+            f"F-{inicio + i}",
+            str(date.fromordinal(738000 + azar.randrange(40))),
+            azar.randrange(1000, 5000) / 100,
+            azar.choice(CLIENTES),
+            azar.randrange(30),
+            azar.randrange(10),
+        )
+        for i in range(cantidad)
+    ]
+
+
+def filtrar(filas, fecha_desde=None, total_min=None, cliente=None, nit=None):
+    return [
+        f
+        for f in filas
+        if (fecha_desde is None or f[1] >= str(fecha_desde))
+        and (total_min is None or f[2] >= total_min)
+        and (cliente is None or f[3].casefold() == cliente.casefold())
+        and (nit is None or f[5] == nit)
+    ]
+
+
+def todas_las_paginas(indice, limite, **filtros):
+    numeros, cursor = indice.buscar(limite=limite, **filtros)
+    while cursor:
+        pagina, cursor = indice.buscar(limite=limite, cursor=cursor, **filtros)
+        assert pagina
+        numeros += pagina
+    return numeros
+
+
+FILTROS = [
+    {},
+    {"fecha_desde": date.fromordinal(738030)},
+    {"total_min": 45.0},
+    {"cliente": "beta s.a."},
+    {"nit": 3, "total_min": 20.0},
+    {"cliente": "Acme S.L.", "fecha_desde": date.fromordinal(738010)},
+    {"fecha_desde": date.fromordinal(738038), "total_min": 30.0},
+]
+
+
+@pytest.mark.parametrize("filtros", FILTROS)
+@pytest.mark.parametrize("orden", [None, "fecha", "-fecha", "total", "-total"])
+def test_paginas_coinciden_con_filtrar_y_ordenar(filtros, orden):
+    azar = random.Random(7)
+    filas = filas_aleatorias(400, azar)
+    indice = IndiceFacturas()
+    indice.agregar(filas)
+
+    esperadas = list(enumerate(filas))
+    esperadas = [(i, f) for i, f in esperadas if f in filtrar(filas, **filtros)]
+    if orden:
+        columna = 1 if "fecha" in orden else 2
+        esperadas.sort(key=lambda e: (e[1][columna], e[0]), reverse="-" in orden)
+
+    numeros = todas_las_paginas(indice, 7, orden=orden, **filtros)
+    assert numeros == [f[0] for _, f in esperadas]
+
+
+def test_agregar_incremental_equivale_a_cargar_de_golpe():
+    azar = random.Random(3)
+    filas = filas_aleatorias(300, azar)
+    # Sustituciones de facturas ya indexadas, también dentro del mismo lote
+    cambios = filas_aleatorias(20, azar, inicio=100) + filas_aleatorias(5, azar, 110)
+    finales = {f[0]: f for f in filas + cambios}
+
+    de_golpe = IndiceFacturas()
+    de_golpe.agregar(finales.values())
+    incremental = IndiceFacturas()
+    incremental.agregar(filas[:200])
+    for fila in filas[200:]:
+        incremental.agregar([fila])
+    incremental.agregar(cambios)
+
+    assert len(incremental) == len(de_golpe) == 300
+    for orden in ("fecha", "-total"):
+        for filtros in FILTROS:
+            assert sorted(
+                todas_las_paginas(incremental, 11, orden=orden, **filtros)
+            ) == sorted(todas_las_paginas(de_golpe, 11, orden=orden, **filtros))
+    por_documento = {n for n, f in finales.items() if f[4] == 5}
+    assert set(todas_las_paginas(incremental, 50, documento=5)) == por_documento
+
+
+@pytest.mark.parametrize("cursor", ["no-es-base64!", "WzEsMl0="])
+def test_cursor_invalido(cursor):
+    indice = IndiceFacturas()
+    with pytest.raises(ValueError):
+        indice.buscar(cursor=cursor)
+
+
+def test_endpoint_listado(backend, tmp_path, monkeypatch):
+    ruta = str(tmp_path / "facturas.db")
+    almacen.cargar(ruta, 60)
+    guardado = almacen.AlmacenFacturas(ruta)
+    indice = IndiceFacturas()
+    indice.agregar(guardado.filas_indice())
+    monkeypatch.setattr(backend, "almacen_facturas", guardado)
+    monkeypatch.setattr(backend, "indice_facturas", indice)
+    client = TestClient(backend.app)
+    facturas = [guardado.obtener(str(n))[0] for n in range(1, 61)]
+    cliente = facturas[0]["cliente"]["nombre"]
+
+    primera = client.get("/facturas/v1", params={"orden": "-total", "limite": 5}).json()
+    resto = client.get(
+        "/facturas/v1",
+        params={"orden": "-total", "limite": 100, "cursor": primera["siguiente"]},
+    ).json()
+    del_cliente = client.get("/facturas/v1", params={"cliente": cliente.upper()}).json()
+
+    totales = [f["total"] for f in primera["facturas"] + resto["facturas"]]
+    assert totales == sorted((f["total"] for f in facturas), reverse=True)
+    assert resto["siguiente"] is None
+    assert {f["numero_factura"] for f in del_cliente["facturas"]} == {
+        f["numero_factura"] for f in facturas if f["cliente"]["nombre"] == cliente
+    }
+    assert client.get("/facturas/v1", params={"orden": "nombre"}).status_code == 400
+    for filtro in (
+        "total_max=inf",
+        "total_min=-inf",
+        "total_min=1e400",
+        "total_min=nan",
+    ):
+        resp = client.get("/facturas/v1?" + filtro)
+        assert resp.status_code == 400
+        assert "debe ser un número finito" in resp.json()["detail"]
+
+
+def test_listado_omite_facturas_que_ya_no_estan_en_el_almacen(
+    backend, tmp_path, monkeypatch
+):
+    ruta = str(tmp_path / "facturas.db")
+    almacen.cargar(ruta, 5)
+    indice = IndiceFacturas()
+    indice.agregar(almacen.AlmacenFacturas(ruta).filas_indice())
+    # El almacén se rehace en caliente con menos facturas
+    rehecho = str(tmp_path / "rehecho.db")
+    almacen.cargar(rehecho, 3)
+    monkeypatch.setattr(backend, "almacen_facturas", almacen.AlmacenFacturas(rehecho))
+    monkeypatch.setattr(backend, "indice_facturas", indice)
+
+    resp = TestClient(backend.app).get("/facturas/v1")
+
+    assert resp.status_code == 200
+    numeros = [f["numero_factura"] for f in resp.json()["facturas"]]
+    assert numeros == ["1", "2", "3"]
+
+
+def test_endpoint_listado_sin_almacen(backend):
+    assert TestClient(backend.app).get("/facturas/v1").status_code == 503
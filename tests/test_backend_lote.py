@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def client(backend):
+    return TestClient(backend.app)
+
+
+def test_batch_combina_numeros_y_rango(client):
+    resp = client.get(
+        "/facturas/v1/batch", params={"numeros": ["A-1", "B-2"], "desde": 5, "hasta": 7}
+    )
+
+    assert resp.status_code == 200
+    datos = resp.json()
+    assert datos["total"] == 5
+    assert [f["numero_factura"] for f in datos["facturas"]] == [
+        "A-1",
+        "B-2",
+        "5",
+        "6",
+        "7",
+    ]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [{}, {"desde": 3}, {"desde": 5, "hasta": 1}, {"desde": 1, "hasta": 100000}],
+)
+def test_batch_rechaza_peticiones_invalidas(client, params):
+    assert client.get("/facturas/v1/batch", params=params).status_code == 400
+
+
+def test_batch_stream_devuelve_ndjson(client):
+    with client.stream(
+        "GET", "/facturas/v1/batch/stream", params={"desde": 1, "hasta": 3}
+    ) as resp:
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        facturas = [json.loads(linea) for linea in resp.iter_lines() if linea]
+
+    assert [f["numero_factura"] for f in facturas] == ["1", "2", "3"]
+    assert all(f["total"] == round(f["subtotal"] + f["impuesto"], 2) for f in facturas)
@@ -0,0 +1,128 @@
+import io
+
+import msgpack
+import orjson
+import pytest
+import requests
+import zstandard
+from fastapi.testclient import TestClient
+
+import codificacion
+import lote
+from cliente_backend import ClienteBackend
+from utilidades import cliente_backend_en_proceso
+
+
+@pytest.fixture
+def client(backend):
+    return TestClient(backend.app)
+
+
+@pytest.mark.parametrize(
+    "accept, tipo",
+    [
+        (None, codificacion.JSON),
+        ("*/*", codificacion.JSON),
+        ("application/msgpack, application/json;q=0.9", codificacion.MSGPACK),
+        ("application/x-msgpack;q=0.5, application/json", codificacion.JSON),
+        ("application/msgpack;q=0", codificacion.JSON),
+    ],
+)
+def test_negociar_tipo(accept, tipo):
+    assert codificacion.negociar_tipo(accept) == tipo
+
+
+def test_negociar_compresion():
+    assert codificacion.negociar_compresion("gzip, deflate") == "gzip"
+    assert codificacion.negociar_compresion("zstd, gzip") == "zstd"
+    assert codificacion.negociar_compresion("zstd;q=0.1, gzip") == "gzip"
+    assert codificacion.negociar_compresion("br, identity") is None
+
+
+def test_factura_en_msgpack_con_etag_propio(client):
+    json_ = client.get("/facturas/v1/W-1")
+    binario = client.get("/facturas/v1/W-1", headers={"Accept": "application/msgpack"})
+
+    assert binario.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(binario.content) == json_.json()
+    assert binario.headers["etag"] != json_.headers["etag"]
+    assert "Accept" in binario.headers["vary"]
+    repetida = client.get(
+        "/facturas/v1/W-1",
+        headers={
+            "Accept": "application/msgpack",
+            "If-None-Match": binario.headers["etag"],
+        },
+    )
+    assert repetida.status_code == 304
+
+
+def test_etag_sigue_la_compresion_aplicada(client, monkeypatch):
+    plano = client.get("/facturas/v1/W-1")
+    pequena = client.get("/facturas/v1/W-1", headers={"Accept-Encoding": "zstd"})
+
+    assert "content-encoding" not in pequena.headers
+    assert pequena.headers["etag"] == plano.headers["etag"]
+
+    monkeypatch.setattr(codificacion, "COMPRESION_MIN_BYTES", 1)
+    comprimida = client.get("/facturas/v1/W-1", headers={"Accept-Encoding": "zstd"})
+
+    assert comprimida.headers["content-encoding"] == "zstd"
+    assert comprimida.headers["etag"] == plano.headers["etag"][:-1] + '-zstd"'
+
+
+def test_lote_grande_se_comprime(client):
+    resp = client.get(
+        "/facturas/v1/batch",
+        params={"desde": 1, "hasta": 50},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.json()["total"] == 50
+
+
+@pytest.mark.parametrize("compresion", ["zstd", "gzip"])
+def test_stream_msgpack_comprimido_llega_completo(backend, compresion):
+    cliente = cliente_backend_en_proceso(backend.app)
+    cliente.sesion.headers["Accept-Encoding"] = compresion
+    ids = [str(n) for n in range(1, 8)]
+
+    resultado = list(lote.iterar_facturas(cliente, ids, tamano_bloque=4))
+
+    assert [f for _, f, _ in resultado] == [backend.generar_factura(n) for n in ids]
+    assert all(error is None for _, _, error in resultado)
+
+
+def respuesta_falsa(cuerpo, tipo, codificacion_=None):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.headers["Content-Type"] = tipo
+    if codificacion_:
+        resp.headers["Content-Encoding"] = codificacion_
+    resp.raw = io.BytesIO(cuerpo)
+    return resp
+
+
+def test_cliente_descomprime_zstd_por_bloques():
+    objetos = [{"n": n, "texto": "ñ" * n} for n in range(200)]
+    secuencia = codificacion.codificar_secuencia(
+        [objetos[:100], objetos[100:]], codificacion.MSGPACK
+    )
+    cuerpo = b"".join(codificacion.comprimir_secuencia(secuencia, "zstd"))
+
+    resp = respuesta_falsa(cuerpo, "application/msgpack", "zstd")
+
+    assert list(ClienteBackend.iterar_objetos(resp)) == objetos
+
+
+def test_cliente_decodifica_json_y_ndjson():
+    resp = respuesta_falsa(orjson.dumps({"a": 1}), "application/json")
+    assert ClienteBackend.decodificar(resp) == {"a": 1}
+
+    cuerpo = zstandard.ZstdCompressor().compress(msgpack.packb({"b": 2.5}))
+    resp = respuesta_falsa(cuerpo, "application/msgpack", "zstd")
+    assert ClienteBackend.decodificar(resp) == {"b": 2.5}
+
+    resp = respuesta_falsa(b'{"c": 1}\n\n{"c": 2}', "application/x-ndjson")
+    assert list(ClienteBackend.iterar_objetos(resp)) == [{"c": 1}, {"c": 2}]
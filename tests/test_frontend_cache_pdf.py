@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cliente_backend import ClienteBackend
+
+from cache_pdf import CachePDF, clave_pdf
+from utilidades import factura_ejemplo
+
+
+@pytest.fixture
+def client(frontend, backend_falso, monkeypatch):
+    monkeypatch.setattr(frontend, "backend", ClienteBackend(backend_falso))
+    monkeypatch.setattr(frontend, "cache_pdf", CachePDF(capacidad_memoria=8))
+    return frontend.app.test_client()
+
+
+def test_descarga_y_vista_previa_comparten_el_pdf(frontend, client, monkeypatch):
+    llamadas = []
+    renderizar = frontend.renderizador.renderizar
+    monkeypatch.setattr(
+        frontend.renderizador,
+        "renderizar",
+        lambda factura: llamadas.append(factura) or renderizar(factura),
+    )
+
+    vista = client.post("/vista-previa-pdf", data={"id_factura": "7"})
+    descarga = client.post("/generar-pdf", data={"id_factura": "7"})
+
+    assert vista.data == descarga.data
+    assert len(llamadas) == 1
+    assert descarga.headers["Content-Disposition"].startswith("attachment")
+    assert vista.headers["ETag"] == descarga.headers["ETag"]
+    assert "Last-Modified" in vista.headers
+
+
+def test_if_none_match_responde_304(client):
+    etag = client.get("/vista-previa-pdf?id_factura=7").headers["ETag"]
+
+    resp = client.get("/vista-previa-pdf?id_factura=7", headers={"If-None-Match": etag})
+
+    assert resp.status_code == 304
+    assert resp.data == b""
+
+
+def test_falta_id_devuelve_400(client):
+    assert client.post("/generar-pdf", data={}).status_code == 400
+
+
+def test_clave_cambia_con_los_datos():
+    factura = factura_ejemplo("1")
+    assert clave_pdf("1", factura) == clave_pdf("1", dict(factura))
+    assert clave_pdf("1", factura) != clave_pdf("1", {**factura, "total": 1.0})
+
+
+def test_nivel_disco_sobrevive_a_la_memoria_y_expulsa_por_tamano(tmp_path):
+    cache = CachePDF(capacidad_memoria=1, directorio=str(tmp_path), max_bytes_disco=25)
+    cache.guardar("a", b"x" * 10)
+    cache.guardar("b", b"y" * 10)
+
+    assert cache.obtener("a").contenido == b"x" * 10  # desde disco
+
+    cache.guardar("c", b"z" * 10)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf", "c.pdf"]
+    assert CachePDF(directorio=str(tmp_path)).obtener("c").contenido == b"z" * 10
+
+
+def test_factura_grande_se_transmite_sin_pasar_por_la_cache(frontend, client):
+    resp = client.get("/generar-pdf?id_factura=grande-450")
+
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert "Content-Length" not in resp.headers
+    assert resp.get_data().startswith(b"%PDF")
+    assert resp.headers["ETag"]
+    assert frontend.cache_pdf.estadisticas()["memoria"] == 0
+
+
+def test_pdf_grande_de_un_render_que_agota_el_tiempo_se_borra(
+    frontend, monkeypatch, tmp_path
+):
+    renderizador = frontend.renderizador
+    terminado = threading.Event()
+
+    def render_lento(factura, archivo, tiempos=None):
+        time.sleep(0.3)
+        archivo.write(b"%PDF")
+        terminado.set()
+
+    monkeypatch.setattr(renderizador, "render_factura_en", render_lento)
+    monkeypatch.setattr(renderizador, "RENDER_TMP_DIR", str(tmp_path))
+    monkeypatch.setattr(renderizador, "RENDER_TIMEOUT", 0.05)
+    with ThreadPoolExecutor(1) as pool:
+        monkeypatch.setattr(renderizador, "obtener_pool", lambda: pool)
+        with pytest.raises(TimeoutError):
+            renderizador.renderizar_a_archivo(factura_ejemplo("grande-450"))
+
+    assert terminado.is_set()
+    assert list(tmp_path.iterdir()) == []
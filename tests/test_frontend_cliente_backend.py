@@ -0,0 +1,88 @@
+import time
+
+import pytest
+import requests
+
+from cliente_backend import BackendNoDisponible, ClienteBackend, Cortacircuitos
+
+SIN_BACKEND = "http://127.0.0.1:9"
+
+
+def test_usa_la_sesion_compartida(backend_falso):
+    cliente = ClienteBackend(backend_falso)
+
+    assert cliente.get("/facturas/v1/1").json()["numero_factura"] == "1"
+    assert cliente.get("/facturas/v1/404").status_code == 404
+    estadisticas = cliente.estadisticas()
+    assert estadisticas["llamadas"] == 2
+    assert estadisticas["errores"] == 0
+    assert estadisticas["circuito"] == "cerrado"
+
+
+def test_reintenta_y_luego_lanza_backend_no_disponible():
+    cliente = ClienteBackend(SIN_BACKEND, reintentos=2, backoff=0)
+
+    with pytest.raises(BackendNoDisponible):
+        cliente.get("/facturas/v1/1")
+    assert cliente.estadisticas()["llamadas"] == 3
+
+
+def test_circuito_abierto_falla_sin_llamar_al_backend():
+    cliente = ClienteBackend(
+        SIN_BACKEND, reintentos=0, cortacircuitos=Cortacircuitos(umbral=2)
+    )
+    for _ in range(2):
+        with pytest.raises(BackendNoDisponible):
+            cliente.get("/facturas/v1/1")
+
+    with pytest.raises(BackendNoDisponible, match="circuito abierto"):
+        cliente.get("/facturas/v1/1")
+    assert cliente.estadisticas()["llamadas"] == 2
+
+
+def test_cortacircuitos_semiabierto_se_cierra_con_un_exito(monkeypatch):
+    circuito = Cortacircuitos(umbral=1, tiempo_apertura=10)
+    circuito.registrar_fallo()
+    assert not circuito.permitir()
+
+    ahora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: ahora + 11)
+    assert circuito.estado == "semiabierto"
+    assert circuito.permitir()
+    assert not circuito.permitir()  # una sola llamada de prueba
+
+    circuito.registrar_exito()
+    assert circuito.estado == "cerrado"
+
+
+def test_prueba_semiabierta_que_falla_de_cualquier_modo_libera_el_circuito(
+    monkeypatch,
+):
+    circuito = Cortacircuitos(umbral=1, tiempo_apertura=0)
+    circuito.registrar_fallo()
+    cliente = ClienteBackend(SIN_BACKEND, reintentos=0, cortacircuitos=circuito)
+    errores = [requests.exceptions.ChunkedEncodingError("cortada"), KeyError("x")]
+
+    def get(url, **kwargs):
+        raise errores.pop(0)
+
+    monkeypatch.setattr(cliente.sesion, "get", get)
+    with pytest.raises(BackendNoDisponible):
+        cliente.get("/facturas/v1/1")
+    with pytest.raises(KeyError):
+        cliente.get("/facturas/v1/1")
+
+    assert circuito.fallos == 3
+    assert circuito.permitir()  # se admite una nueva prueba
+
+
+def test_ruta_responde_503_con_el_circuito_abierto(frontend, monkeypatch):
+    circuito = Cortacircuitos(umbral=1)
+    circuito.registrar_fallo()
+    monkeypatch.setattr(
+        frontend, "backend", ClienteBackend(SIN_BACKEND, cortacircuitos=circuito)
+    )
+
+    resp = frontend.app.test_client().post("/generar-pdf", data={"id_factura": "1"})
+
+    assert resp.status_code == 503
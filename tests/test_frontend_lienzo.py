@@ -0,0 +1,113 @@
+import pytest
+
+import factura_lienzo
+import factura_pdf
+from utilidades import FACTURA_EJEMPLO, factura_ejemplo
+
+
+def con_lineas(n, **cambios):
+    detalle = (FACTURA_EJEMPLO["detalle"] * n)[:n]
+    return {**FACTURA_EJEMPLO, "detalle": detalle, **cambios}
+
+
+def test_facturas_de_una_pagina_usan_el_render_directo(monkeypatch):
+    dibujadas = []
+    dibujar = factura_lienzo.dibujar
+    monkeypatch.setattr(
+        factura_lienzo,
+        "dibujar",
+        lambda maqueta, destino: dibujadas.append(maqueta) or dibujar(maqueta, destino),
+    )
+    tiempos = {}
+
+    pdf = factura_pdf.render_factura(FACTURA_EJEMPLO, tiempos=tiempos)
+
+    assert pdf.startswith(b"%PDF") and len(dibujadas) == 1
+    assert set(tiempos) == {"elementos", "doc_build"}
+
+
+@pytest.mark.parametrize(
+    "factura",
+    [
+        con_lineas(3),
+        con_lineas(1, numero_factura="<b>1</b>"),
+        con_lineas(1, numero_factura="A  B"),
+        con_lineas(1, fecha_emision="x" * 200),
+        con_lineas(1, empresa={"direccion": "a\nb\nc\nd\ne\nf"}),
+        factura_ejemplo("grande-45"),
+    ],
+    ids=["3-lineas", "marcado", "espacios", "titulo-largo", "celdas-altas", "grande"],
+)
+def test_lo_que_necesita_platypus_no_se_dibuja_directo(factura):
+    assert factura_lienzo.maquetar(factura_pdf.normalizar_factura(factura)) is None
+
+
+def test_cota_de_filas_descarta_sin_formatear_las_facturas_grandes(monkeypatch):
+    # Todas las celdas de una línea: la cota es exacta
+    minima = {
+        "empresa": {"nombre": "E", "direccion": "D"},
+        "cliente": {"nombre": "C", "direccion": "D"},
+    }
+    n = factura_lienzo.MAX_FILAS_DETALLE
+    cabe = factura_pdf.normalizar_factura(con_lineas(n, **minima))
+    no_cabe = factura_pdf.normalizar_factura(con_lineas(n + 1, **minima))
+    assert factura_lienzo.maquetar(cabe) is not None
+
+    def moneda(valor):
+        raise AssertionError("no debería formatear ninguna fila")
+
+    monkeypatch.setattr(factura_lienzo, "moneda", moneda)
+    assert factura_lienzo.maquetar(no_cabe) is None
+
+
+def test_plantillas_derivadas_y_desactivado_usan_platypus(monkeypatch):
+    class SoloTotales(factura_pdf.PlantillaFactura):
+        def elementos(self, datos):
+            return super().elementos(datos)[-1:]
+
+    datos = factura_pdf.normalizar_factura(FACTURA_EJEMPLO)
+    assert factura_pdf.PlantillaFactura().maqueta_directa(datos) is not None
+    assert SoloTotales().maqueta_directa(datos) is None
+
+    monkeypatch.setattr(factura_pdf, "RENDER_DIRECTO", False)
+    assert factura_pdf.PlantillaFactura().maqueta_directa(datos) is None
+
+
+def contenido(pdf):
+    """Páginas, textos con su posición y trazos dibujados, vía PyMuPDF."""
+    pymupdf = pytest.importorskip("pymupdf")
+    documento = pymupdf.open(stream=pdf)
+    textos, lineas, fondos = [], set(), set()
+    for pagina in documento:
+        for bloque in pagina.get_text("dict")["blocks"]:
+            for linea in bloque["lines"]:
+                for s in linea["spans"]:
+                    x, y = s["origin"]
+                    textos.append(
+                        (round(x, 1), round(y, 1), s["font"], s["size"], s["text"])
+                    )
+        for trazo in pagina.get_drawings():
+            if trazo["type"] == "s":
+                for _, a, b in trazo["items"]:
+                    extremos = sorted((round(p.x, 2), round(p.y, 2)) for p in (a, b))
+                    lineas.add((*extremos, trazo["width"]))
+            elif trazo["rect"].height:
+                fondos.add((tuple(round(v, 2) for v in trazo["rect"]), trazo["fill"]))
+    return len(documento), textos, lineas, fondos
+
+
+@pytest.mark.parametrize(
+    "factura",
+    [
+        con_lineas(1),
+        con_lineas(2),
+        con_lineas(1, cliente={"nombre": "Varias\nlíneas", "direccion": "A\nB"}),
+    ],
+    ids=["1-linea", "2-lineas", "celdas-multilinea"],
+)
+def test_render_directo_equivale_a_platypus(monkeypatch, factura):
+    directo = factura_pdf.render_factura(factura)
+    monkeypatch.setattr(factura_pdf, "RENDER_DIRECTO", False)
+    platypus = factura_pdf.render_factura(factura)
+
+    assert contenido(directo) == contenido(platypus)
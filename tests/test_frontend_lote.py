@@ -0,0 +1,110 @@
+import io
+import json
+import threading
+import zipfile
+
+import pytest
+
+from cliente_backend import ClienteBackend
+
+
+def test_parsear_ids_combina_lista_y_rango():
+    import lote
+
+    assert lote.parsear_ids("7, 9", desde="1", hasta="3") == ["7", "9", "1", "2", "3"]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"desde": "5", "hasta": "1"}, {"desde": "a", "hasta": "2"}],
+)
+def test_parsear_ids_rechaza_entradas_invalidas(kwargs):
+    import lote
+
+    with pytest.raises(ValueError):
+        lote.parsear_ids(**kwargs)
+
+
+def test_generar_pdf_lote_transmite_zip_con_errores(
+    frontend, backend_falso, monkeypatch
+):
+    monkeypatch.setattr(frontend, "backend", ClienteBackend(backend_falso))
+    client = frontend.app.test_client()
+
+    resp = client.post(
+        "/generar-pdf-lote", json={"ids": ["1", "roto"], "desde": 2, "hasta": 3}
+    )
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        nombres = set(zf.namelist())
+        resumen = json.loads(zf.read("resumen.json"))
+        assert zf.read("factura_1.pdf").startswith(b"%PDF")
+    assert {"factura_1.pdf", "factura_2.pdf", "factura_3.pdf"} <= nombres
+    assert "errores/factura_roto.txt" in nombres
+    assert resumen["correctas"] == 3
+    assert list(resumen["errores"]) == ["roto"]
+
+
+def test_generar_pdf_lote_sin_ids_devuelve_400(frontend):
+    resp = frontend.app.test_client().post("/generar-pdf-lote", json={})
+    assert resp.status_code == 400
+
+
+def test_iterar_facturas_marca_error_si_el_backend_no_responde():
+    import lote
+
+    backend = ClienteBackend("http://127.0.0.1:9", reintentos=0)
+    resultados = list(lote.iterar_facturas(backend, ["1", "2"]))
+
+    assert [id_factura for id_factura, _, _ in resultados] == ["1", "2"]
+    assert all(factura is None and error for _, factura, error in resultados)
+
+
+@pytest.fixture
+def client(frontend, backend_falso, monkeypatch):
+    monkeypatch.setattr(frontend, "backend", ClienteBackend(backend_falso))
+    return frontend.app.test_client()
+
+
+def leer_zip(resp):
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as zf:
+        return json.loads(zf.read("resumen.json"))
+
+
+@pytest.mark.parametrize("ruta", ["/generar-pdf-lote", "/trabajos"])
+@pytest.mark.parametrize(
+    "datos", [{"ids": 5}, {"ids": {"a": 1}}, {"ids": "1,2", "concurrencia": [2]}]
+)
+def test_lote_con_tipos_invalidos_devuelve_400(client, ruta, datos):
+    assert client.post(ruta, json=datos).status_code == 400
+
+
+def test_render_saturado_responde_503(frontend, client, monkeypatch):
+    renderizador = frontend.renderizador
+    cupos = threading.BoundedSemaphore(1)
+    cupos.acquire()
+    monkeypatch.setattr(renderizador, "_cupos", cupos)
+    monkeypatch.setattr(renderizador, "RENDER_ESPERA_MAX", 0.01)
+
+    assert client.get("/generar-pdf?id_factura=saturado").status_code == 503
+    assert client.post("/generar-pdf-lote", json={"ids": "1,2"}).status_code == 503
+
+
+def test_lote_sobrevive_a_la_muerte_de_los_procesos_de_render(frontend, client):
+    renderizador = frontend.renderizador
+    pool = renderizador.obtener_pool()
+    pool.submit(int).result()
+    for proceso in list(pool._processes.values()):
+        proceso.kill()
+
+    roto = client.post("/generar-pdf-lote", json={"ids": "1,2"})
+    despues = client.post("/generar-pdf-lote", json={"ids": "3,4"})
+
+    # El ZIP del lote afectado es válido: sus fallos van a errores/
+    resumen = leer_zip(roto)
+    assert resumen["correctas"] + len(resumen["errores"]) == 2
+    assert all("BrokenProcessPool" in e for e in resumen["errores"].values())
+    assert leer_zip(despues) == {"total": 2, "correctas": 2, "errores": {}}
+    assert renderizador.obtener_pool() is not pool
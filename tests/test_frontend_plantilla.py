@@ -0,0 +1,48 @@
+import pytest
+
+import factura_pdf
+from utilidades import FACTURA_EJEMPLO, factura_ejemplo
+
+
+def test_normalizar_acepta_items_y_calcula_totales_con_iva_19():
+    datos = factura_pdf.normalizar_factura(
+        {"items": [{"qty": 2, "precio": 10.0, "descripcion_item": "Caja"}, "Libre"]}
+    )
+
+    assert datos.lineas == [(2, "Caja", 10.0, 20.0), (1, "Libre", 0.0, 0.0)]
+    assert (datos.subtotal, datos.impuesto, datos.total) == (20.0, 3.8, 23.8)
+
+
+def test_render_factura_genera_pdf():
+    assert factura_pdf.render_factura(FACTURA_EJEMPLO).startswith(b"%PDF")
+
+
+def test_plantillas_registrables(monkeypatch):
+    monkeypatch.setattr(factura_pdf, "_plantillas", dict(factura_pdf._plantillas))
+
+    class SoloTotales(factura_pdf.PlantillaFactura):
+        nombre = "solo-totales"
+
+        def elementos(self, datos):
+            return super().elementos(datos)[-1:]
+
+    factura_pdf.registrar_plantilla(SoloTotales())
+
+    pdf = factura_pdf.render_factura(FACTURA_EJEMPLO, plantilla="solo-totales")
+    assert pdf.startswith(b"%PDF")
+    with pytest.raises(ValueError):
+        factura_pdf.render_factura(FACTURA_EJEMPLO, plantilla="no-existe")
+
+
+def test_factura_grande_se_parte_en_tramos_con_subtotal_acumulado(monkeypatch):
+    monkeypatch.setattr(factura_pdf, "FACTURA_GRANDE_UMBRAL", 10)
+    monkeypatch.setattr(factura_pdf, "FILAS_POR_TABLA", 20)
+    factura = factura_ejemplo("grande-45")
+    datos = factura_pdf.normalizar_factura(factura)
+
+    tablas = factura_pdf.PlantillaFactura().elementos_detalle(datos)
+
+    assert factura_pdf.es_factura_grande(factura)
+    assert [len(t._cellvalues) for t in tablas] == [22, 22, 7]
+    assert tablas[-1]._cellvalues[-1][-1] == f"${factura['subtotal']:,.2f}"
+    assert all(t._cellvalues[0] == factura_pdf.ENCABEZADO_DETALLE for t in tablas)
@@ -0,0 +1,87 @@
+import pytest
+
+from cliente_backend import ClienteBackend
+from generador import Generador
+from utilidades import cliente_backend_en_proceso
+
+
+def agregar_por_diccionarios(facturas):
+    """Agregación de referencia, factura a factura y en céntimos"""
+    por_mes, por_cliente = {}, {}
+    for f in facturas:
+        centimos = [
+            round(f[campo] * 100) for campo in ("subtotal", "impuesto", "total")
+        ]
+        for grupos, clave in (
+            (por_mes, f["fecha_emision"][:7]),
+            (por_cliente, f["cliente"]["nombre"]),
+        ):
+            suma = grupos.setdefault(clave, [0, 0, 0, 0])
+            suma[0] += 1
+            for k in range(3):
+                suma[k + 1] += centimos[k]
+    return por_mes, por_cliente
+
+
+def en_centimos(filas):
+    return {
+        nombre: [facturas, *(round(importe * 100) for importe in importes)]
+        for nombre, facturas, *importes in filas
+    }
+
+
+def test_agregacion_por_bloques_coincide_con_la_de_referencia():
+    import resumen
+
+    facturas = Generador(tamano_pool=16).generar_lote(range(1, 3001))
+    agregado = resumen.Resumen()
+    # Bloques de tamaños distintos para que las matrices crezcan varias veces
+    for inicio, fin in [(0, 1), (1, 40), (40, 1000), (1000, 3000)]:
+        agregado.agregar(facturas[inicio:fin])
+
+    por_mes, por_cliente = agregar_por_diccionarios(facturas)
+    assert en_centimos(agregado.por_mes()) == por_mes
+    assert en_centimos(agregado.por_cliente()) == por_cliente
+    totales = [f[-1] for f in agregado.por_cliente()]
+    assert totales == sorted(totales, reverse=True)
+    assert agregado.totales()[0] == agregado.facturas == 3000
+    assert round(agregado.totales()[3] * 100) == sum(s[3] for s in por_mes.values())
+
+
+def test_agregar_rango_consulta_el_stream_del_backend(backend):
+    import resumen
+
+    agregado = resumen.agregar_rango(
+        cliente_backend_en_proceso(backend.app), 1, 250, tamano_bloque=60
+    )
+
+    por_mes, _ = agregar_por_diccionarios(backend.generador.generar_lote(range(1, 251)))
+    assert en_centimos(agregado.por_mes()) == por_mes
+
+
+def test_agregar_rango_detecta_respuestas_incompletas(backend_falso):
+    import resumen
+
+    with pytest.raises(resumen.ErrorResumen):
+        resumen.agregar_rango(ClienteBackend(backend_falso), 1, 10)
+
+
+def test_generar_resumen_devuelve_pdf(frontend, backend, monkeypatch):
+    monkeypatch.setattr(frontend, "backend", cliente_backend_en_proceso(backend.app))
+
+    resp = frontend.app.test_client().post(
+        "/generar-resumen", json={"desde": 1, "hasta": 400}
+    )
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/pdf"
+    assert resp.data.startswith(b"%PDF")
+    assert "resumen_1_400.pdf" in resp.headers["Content-Disposition"]
+
+
+@pytest.mark.parametrize(
+    "datos", [{}, {"desde": 5, "hasta": 1}, {"desde": 1, "hasta": 10**9}]
+)
+def test_generar_resumen_rechaza_rangos_invalidos(frontend, datos):
+    resp = frontend.app.test_client().post("/generar-resumen", json=datos)
+    assert resp.status_code == 400
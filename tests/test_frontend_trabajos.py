@@ -0,0 +1,133 @@
+import io
+import shutil
+import threading
+import time
+import zipfile
+
+import pytest
+
+from cliente_backend import ClienteBackend
+from trabajos import ColaTrabajos
+
+
+@pytest.fixture
+def client(frontend, backend_falso, monkeypatch, tmp_path):
+    monkeypatch.setattr(frontend, "backend", ClienteBackend(backend_falso))
+    monkeypatch.setattr(frontend, "trabajos_pdf", ColaTrabajos(str(tmp_path)))
+    return frontend.app.test_client()
+
+
+def esperar(client, url, limite=30):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        estado = client.get(url).get_json()
+        if estado["estado"] in ("terminado", "error"):
+            return estado
+        time.sleep(0.05)
+    raise AssertionError("el trabajo no terminó a tiempo")
+
+
+def test_trabajo_de_una_factura_devuelve_el_pdf(client):
+    resp = client.post("/trabajos", json={"id_factura": "7"})
+
+    assert resp.status_code == 202
+    trabajo = resp.get_json()
+    assert resp.headers["Location"] == trabajo["url_estado"]
+    assert esperar(client, trabajo["url_estado"])["estado"] == "terminado"
+    pdf = client.get(trabajo["url_resultado"] + "?descarga=1")
+    assert pdf.data.startswith(b"%PDF")
+    assert pdf.headers["Content-Disposition"].startswith("attachment")
+    assert "factura_7.pdf" in pdf.headers["Content-Disposition"]
+
+
+def test_trabajo_de_lote_devuelve_un_zip(client):
+    trabajo = client.post("/trabajos", json={"desde": 1, "hasta": 2}).get_json()
+
+    assert trabajo["total"] == 2
+    assert esperar(client, trabajo["url_estado"])["estado"] == "terminado"
+    contenido = client.get(trabajo["url_resultado"]).data
+    nombres = zipfile.ZipFile(io.BytesIO(contenido)).namelist()
+    assert sorted(nombres) == ["factura_1.pdf", "factura_2.pdf", "resumen.json"]
+
+
+def test_trabajo_fallido_responde_409_con_el_error(client):
+    trabajo = client.post("/trabajos", data={"id_factura": "404"}).get_json()
+
+    estado = esperar(client, trabajo["url_estado"])
+    assert estado["estado"] == "error" and "404" in estado["error"]
+    assert client.get(trabajo["url_resultado"]).status_code == 409
+
+
+def test_cola_llena_responde_429_con_retry_after(
+    frontend, client, monkeypatch, tmp_path
+):
+    cola = ColaTrabajos(str(tmp_path / "llena"), hilos=1, cola_max=1)
+    monkeypatch.setattr(frontend, "trabajos_pdf", cola)
+    liberar = threading.Event()
+    cola.enviar(lambda archivo: liberar.wait(10))
+    try:
+        resp = client.post("/trabajos", json={"id_factura": "7"})
+    finally:
+        liberar.set()
+
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_trabajos_caducan_y_se_purgan(client, tmp_path):
+    cola = ColaTrabajos(str(tmp_path / "ttl"), ttl=0)
+    estado = cola.enviar(lambda archivo: archivo.write(b"x"))
+    for _ in range(200):
+        if cola.en_cola() == 0:
+            break
+        time.sleep(0.01)
+
+    assert cola.estado(estado["id"]) is None
+    cola.purgar(forzar=True)
+    assert not (tmp_path / "ttl" / estado["id"]).exists()
+    assert client.get("/trabajos/" + "0" * 32).status_code == 404
+    assert client.get("/trabajos/../../etc").status_code == 404
+
+
+def test_factura_grande_con_prefer_respond_async_se_encola(client):
+    cabeceras = {"Prefer": "respond-async"}
+    pequena = client.get("/generar-pdf?id_factura=7", headers=cabeceras)
+    grande = client.get("/generar-pdf?id_factura=grande-450", headers=cabeceras)
+
+    assert pequena.status_code == 200 and pequena.data.startswith(b"%PDF")
+    assert grande.status_code == 202
+    trabajo = grande.get_json()
+    assert esperar(client, trabajo["url_estado"])["estado"] == "terminado"
+    assert client.get(trabajo["url_resultado"]).data.startswith(b"%PDF")
+
+
+def test_fallo_al_registrar_el_trabajo_devuelve_su_hueco(tmp_path, monkeypatch):
+    cola = ColaTrabajos(str(tmp_path), cola_max=1)
+
+    def disco_lleno(estado):
+        raise OSError("No queda espacio en el dispositivo")
+
+    monkeypatch.setattr(cola, "_escribir_estado", disco_lleno)
+    with pytest.raises(OSError):
+        cola.enviar(lambda archivo: None)
+
+    assert cola.en_cola() == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_trabajo_purgado_mientras_corre_devuelve_su_hueco(tmp_path):
+    cola = ColaTrabajos(str(tmp_path), cola_max=1)
+
+    def purgado(archivo):
+        # Como si otro worker lo hubiera purgado por superar la duración máxima
+        for directorio in tmp_path.iterdir():
+            shutil.rmtree(directorio)
+
+    cola.enviar(purgado)
+    for _ in range(200):
+        if cola.en_cola() == 0:
+            break
+        time.sleep(0.01)
+
+    assert cola.en_cola() == 0
+    cola.enviar(lambda archivo: archivo.write(b"x"))
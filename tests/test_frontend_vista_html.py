@@ -0,0 +1,57 @@
+import pytest
+
+from cliente_backend import ClienteBackend
+from factura_pdf import moneda, normalizar_factura
+
+
+@pytest.fixture
+def client(frontend, backend_falso, monkeypatch):
+    monkeypatch.setattr(frontend, "backend", ClienteBackend(backend_falso))
+    return frontend.app.test_client()
+
+
+def test_vista_previa_html_no_renderiza_pdf(frontend, client, monkeypatch):
+    def no_renderizar(factura):
+        raise AssertionError("la vista previa HTML no debe renderizar el PDF")
+
+    monkeypatch.setattr(frontend.renderizador, "renderizar", no_renderizar)
+
+    resp = client.get("/vista-previa-html?id_factura=15")
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/html"
+    html = resp.get_data(as_text=True)
+    assert "FACTURA #15" in html
+    assert "Industrias López" in html
+    for importe in ("$150.50", "$301.00", "$721.00", "$136.99", "$857.99"):
+        assert importe in html
+
+
+def test_vista_previa_html_responde_304_con_etag(client):
+    etag = client.get("/vista-previa-html?id_factura=15").headers["ETag"]
+
+    resp = client.get(
+        "/vista-previa-html?id_factura=15", headers={"If-None-Match": etag}
+    )
+
+    assert resp.status_code == 304
+
+
+def test_vista_previa_html_sin_id_devuelve_400(client):
+    assert client.get("/vista-previa-html").status_code == 400
+
+
+def test_plantilla_html_usa_la_misma_normalizacion_que_el_pdf(frontend):
+    factura = {
+        "numero_factura": "X-1",
+        "items": [{"descripcion": "Caja", "qty": 3, "precio": 2.5}],
+    }
+
+    with frontend.app.test_request_context():
+        html = frontend.render_template(
+            "factura.html", datos=normalizar_factura(factura)
+        )
+
+    # Subtotal, IVA y total calculados igual que en el PDF
+    assert "$7.50" in html and "$1.43" in html and "$8.93" in html
+    assert moneda(1234.5) == "$1,234.50"
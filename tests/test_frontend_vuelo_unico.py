@@ -0,0 +1,106 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from prometheus_client import REGISTRY
+
+from cache_pdf import CachePDF
+from cliente_backend import ClienteBackend
+from vuelo_unico import VueloUnico
+
+HILOS = 8
+
+
+def esperar_hasta(condicion, limite=10):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, "tiempo agotado"
+        time.sleep(0.005)
+
+
+def test_llamadas_simultaneas_comparten_una_ejecucion():
+    vuelo = VueloUnico()
+    llamadas = []
+
+    def lenta():
+        llamadas.append(1)
+        # No termina hasta que el resto de hilos está esperando su resultado
+        esperar_hasta(lambda: vuelo.compartidas == HILOS - 1)
+        return object()
+
+    with ThreadPoolExecutor(HILOS) as pool:
+        resultados = list(pool.map(lambda _: vuelo.ejecutar("7", lenta), range(HILOS)))
+
+    assert len(llamadas) == 1
+    assert len({id(resultado) for resultado, _ in resultados}) == 1
+    assert sorted(compartido for _, compartido in resultados) == [False] + [True] * (
+        HILOS - 1
+    )
+    assert vuelo.estadisticas() == {
+        "ejecutadas": 1,
+        "compartidas": HILOS - 1,
+        "en_vuelo": 0,
+    }
+
+
+def test_la_excepcion_llega_a_todos_y_la_clave_queda_libre():
+    vuelo = VueloUnico()
+    en_curso = threading.Event()
+
+    def falla():
+        en_curso.set()
+        esperar_hasta(lambda: vuelo.compartidas == 1)
+        raise ValueError("backend caído")
+
+    with ThreadPoolExecutor(2) as pool:
+        primera = pool.submit(vuelo.ejecutar, "7", falla)
+        en_curso.wait()
+        segunda = pool.submit(vuelo.ejecutar, "7", falla)
+        for futuro in (primera, segunda):
+            with pytest.raises(ValueError, match="backend caído"):
+                futuro.result()
+
+    assert vuelo.ejecutar("7", lambda: "de nuevo") == ("de nuevo", False)
+
+
+def test_peticiones_simultaneas_de_una_factura_renderizan_una_vez(
+    frontend, backend_falso, monkeypatch
+):
+    monkeypatch.setattr(frontend, "backend", ClienteBackend(backend_falso))
+    monkeypatch.setattr(frontend, "cache_pdf", CachePDF(capacidad_memoria=8))
+    renders = VueloUnico()
+    monkeypatch.setattr(frontend, "consultas_en_curso", VueloUnico())
+    monkeypatch.setattr(frontend, "renders_en_curso", renders)
+
+    def coalescidas():
+        return (
+            REGISTRY.get_sample_value(
+                "frontend_coalescidas_total", {"operacion": "render"}
+            )
+            or 0
+        )
+
+    antes = coalescidas()
+
+    llamadas = []
+    renderizar = frontend.renderizador.renderizar
+
+    def renderizar_lento(factura):
+        llamadas.append(factura)
+        esperar_hasta(lambda: renders.compartidas == HILOS - 1)
+        return renderizar(factura)
+
+    monkeypatch.setattr(frontend.renderizador, "renderizar", renderizar_lento)
+
+    def pedir(ruta):
+        return frontend.app.test_client().get(f"{ruta}?id_factura=7")
+
+    rutas = ["/generar-pdf", "/vista-previa-pdf"] * (HILOS // 2)
+    with ThreadPoolExecutor(HILOS) as pool:
+        respuestas = list(pool.map(pedir, rutas))
+
+    assert [r.status_code for r in respuestas] == [200] * HILOS
+    assert len({r.data for r in respuestas}) == 1
+    assert len(llamadas) == 1
+    assert coalescidas() - antes == HILOS - 1
@@ -0,0 +1,93 @@
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from cache_pdf import CachePDF
+from cliente_backend import ClienteBackend
+
+
+def muestras(texto):
+    """Diccionario {(nombre, etiquetas ordenadas): valor} de una exposición."""
+    return {
+        (m.name, tuple(sorted(m.labels.items()))): m.value
+        for familia in text_string_to_metric_families(texto)
+        for m in familia.samples
+    }
+
+
+def test_frontend_expone_etapas_tamano_y_cache(frontend, backend_falso, monkeypatch):
+    monkeypatch.setattr(frontend, "backend", ClienteBackend(backend_falso))
+    monkeypatch.setattr(frontend, "cache_pdf", CachePDF(capacidad_memoria=8))
+    client = frontend.app.test_client()
+    antes = muestras(client.get("/metrics").get_data(as_text=True))
+
+    for _ in range(2):
+        respuesta = client.get("/generar-pdf?id_factura=met-1")
+        assert respuesta.status_code == 200
+        respuesta.close()
+    resp = client.get("/metrics")
+
+    assert resp.mimetype == "text/plain"
+    despues = muestras(resp.get_data(as_text=True))
+
+    def incremento(nombre, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        return despues.get(clave, 0) - antes.get(clave, 0)
+
+    for etapa in ("consulta_backend", "cola_render", "elementos", "doc_build"):
+        assert incremento("frontend_etapa_segundos_count", etapa=etapa) >= 1
+    assert incremento("frontend_etapa_segundos_count", etapa="envio") == 2
+    assert incremento("frontend_pdf_bytes_count", modo="normal") == 1
+    assert incremento("frontend_cache_pdf_total", resultado="hit") == 1
+    assert (
+        incremento(
+            "frontend_peticion_segundos_count",
+            ruta="/generar-pdf",
+            metodo="GET",
+            estado="200",
+        )
+        == 2
+    )
+    assert incremento("frontend_peticiones_en_curso", ruta="/generar-pdf") == 0
+
+
+def test_backend_mide_rutas_por_plantilla_y_generacion(backend):
+    backend.cache_facturas.limpiar()
+    client = TestClient(backend.app)
+
+    client.get("/facturas/v1/MET-1")
+    client.get("/facturas/v1/MET-1")
+    texto = client.get("/metrics").text
+
+    valores = muestras(texto)
+    ruta = (
+        ("estado", "200"),
+        ("metodo", "GET"),
+        ("ruta", "/facturas/v1/{numero_factura}"),
+    )
+    assert valores[("backend_peticion_segundos_count", ruta)] >= 2
+    assert valores[("backend_cache_facturas_total", (("resultado", "hit"),))] >= 1
+    assert valores[("backend_generacion_segundos_count", (("modo", "individual"),))]
+    assert "MET-1" not in texto
+
+
+def test_backend_cuenta_aciertos_de_numeros_repetidos_una_vez(backend):
+    backend.cache_facturas.limpiar()
+    client = TestClient(backend.app)
+    backend.obtener_facturas(["REP-1"])
+    antes = muestras(client.get("/metrics").text)
+
+    facturas = backend.obtener_facturas(["REP-1", "REP-1", "REP-2", "REP-2"])
+    despues = muestras(client.get("/metrics").text)
+
+    def incremento(resultado):
+        clave = ("backend_cache_facturas_total", (("resultado", resultado),))
+        return despues.get(clave, 0) - antes.get(clave, 0)
+
+    assert [f["numero_factura"] for f in facturas] == [
+        "REP-1",
+        "REP-1",
+        "REP-2",
+        "REP-2",
+    ]
+    assert incremento("hit") == 1
+    assert incremento("miss") == 1
@@ -0,0 +1,126 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import cache_pdf
+import generador as modulo_generador
+from generador import Generador
+
+BACKEND_APP = Path(modulo_generador.__file__).parent
+FRONTEND_APP = Path(cache_pdf.__file__).parent
+
+
+def test_backend_health_responde_y_ready_espera_a_la_preparacion(backend, monkeypatch):
+    client = TestClient(backend.app)
+    assert backend.preparado.wait(30)
+
+    assert client.get("/health").json() == {"estado": "ok"}
+    assert client.get("/ready").json()["estado"] == "preparado"
+
+    monkeypatch.setattr(backend, "preparado", threading.Event())
+    assert client.get("/health").status_code == 200
+    assert client.get("/ready").status_code == 503
+
+
+def test_frontend_health_responde_y_ready_espera_a_la_preparacion(
+    frontend, monkeypatch
+):
+    client = frontend.app.test_client()
+    assert frontend.preparado.wait(30)
+
+    assert client.get("/health").get_json() == {"estado": "ok"}
+    ready = client.get("/ready").get_json()
+    assert ready["estado"] == "preparado"
+    assert ready["segundos_preparacion"] >= 0
+
+    monkeypatch.setattr(frontend, "preparado", threading.Event())
+    assert client.get("/health").status_code == 200
+    assert client.get("/ready").status_code == 503
+
+
+def test_generador_crea_los_pools_en_el_primer_uso():
+    generador = Generador(tamano_pool=16)
+    assert generador._pools is None
+
+    factura = generador.generar("1")
+
+    assert generador._pools is generador.preparar()
+    assert factura == Generador(tamano_pool=16).generar("1")
+
+
+def modulos_cargados(directorio, codigo):
+    codigo += "; import sys; print(' '.join(sys.modules))"
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=directorio,
+        env={**os.environ, "BACKEND_API_URL": "http://127.0.0.1:9"},
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60,
+    )
+    return set(salida.stdout.split())
+
+
+def test_importaciones_pesadas_se_difieren():
+    assert "faker" not in modulos_cargados(BACKEND_APP, "import generador")
+    cargados = modulos_cargados(
+        FRONTEND_APP,
+        "import main; main.app.test_client().post('/trabajos', "
+        "json={'id_factura': '1'})",
+    )
+    assert "resumen" not in cargados
+    assert "numpy" not in cargados
+
+
+@pytest.fixture
+def sin_esperas(monkeypatch):
+    esperas, senales = [], []
+    monkeypatch.setattr(time, "sleep", esperas.append)
+    monkeypatch.setattr(os, "kill", lambda pid, senal: senales.append(senal))
+    return esperas, senales
+
+
+def test_backend_reintenta_la_preparacion_con_backoff(
+    backend, monkeypatch, sin_esperas
+):
+    esperas, senales = sin_esperas
+    fallos = [RuntimeError("uno"), RuntimeError("dos")]
+    preparar_pools = backend.generador.preparar
+
+    def preparar_con_fallos():
+        if fallos:
+            raise fallos.pop(0)
+        return preparar_pools()
+
+    monkeypatch.setattr(backend.generador, "preparar", preparar_con_fallos)
+    monkeypatch.setattr(backend, "preparado", threading.Event())
+    backend.preparar()
+
+    assert backend.preparado.is_set()
+    assert esperas == [1, 2] and senales == []
+
+
+def test_frontend_termina_el_worker_si_no_se_puede_preparar(
+    frontend, monkeypatch, sin_esperas
+):
+    esperas, senales = sin_esperas
+
+    def falla():
+        raise RuntimeError("pool roto")
+
+    monkeypatch.setattr(frontend.renderizador, "preparar", falla)
+    monkeypatch.setattr(frontend, "preparado", threading.Event())
+    monkeypatch.setattr(frontend, "PREPARACION_INTENTOS", 3)
+    frontend.preparar()
+
+    assert not frontend.preparado.is_set()
+    assert esperas == [1, 2]
+    assert senales == [signal.SIGTERM]
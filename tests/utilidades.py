@@ -0,0 +1,179 @@
+"""Datos y servidores de apoyo compartidos por las pruebas y los benchmarks."""
+
+import io
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from requests import Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+FACTURA_EJEMPLO = {
+    "numero_factura": "FAC-001",
+    "fecha_emision": "2025-08-15",
+    "empresa": {
+        "nombre": "Tech Solutions S.L.",
+        "direccion": "Calle Mayor 123, Madrid",
+        "telefono": "+34 912 345 678",
+        "email": "contacto@techsolutions.es",
+        "nit": 123456,
+    },
+    "cliente": {
+        "nombre": "Industrias López",
+        "direccion": "Av. Libertad 456, Barcelona",
+        "telefono": "+34 933 456 789",
+        "email": "compras@industriaslopez.es",
+        "documento": 654321,
+    },
+    "detalle": [
+        {
+            "descripcion": "Soporte técnico",
+            "cantidad": 2,
+            "precio_unitario": 150.5,
+            "total": 301.0,
+        },
+        {
+            "descripcion": "Licencia anual",
+            "cantidad": 1,
+            "precio_unitario": 420.0,
+            "total": 420.0,
+        },
+    ],
+    "subtotal": 721.0,
+    "impuesto": 136.99,
+    "total": 857.99,
+}
+
+
+def factura_ejemplo(numero_factura):
+    """Copia de FACTURA_EJEMPLO con el número de factura indicado.
+
+    El número "roto" devuelve un subtotal no numérico que hace fallar el PDF y
+    "grande-<n>" devuelve una factura con n líneas de detalle.
+    """
+    factura = {**FACTURA_EJEMPLO, "numero_factura": str(numero_factura)}
+    if numero_factura == "roto":
+        factura["subtotal"] = "no-numerico"
+    if str(numero_factura).startswith("grande-"):
+        factura.update(lineas_detalle(int(numero_factura.split("-")[1])))
+    return factura
+
+
+def lineas_detalle(n):
+    """Detalle de n líneas con sus totales, para probar facturas grandes."""
+    detalle = [
+        {
+            "descripcion": f"Artículo {i}",
+            "cantidad": i % 10 + 1,
+            "precio_unitario": 12.5,
+            "total": round((i % 10 + 1) * 12.5, 2),
+        }
+        for i in range(n)
+    ]
+    subtotal = round(sum(item["total"] for item in detalle), 2)
+    impuesto = round(subtotal * 0.19, 2)
+    return {
+        "detalle": detalle,
+        "subtotal": subtotal,
+        "impuesto": impuesto,
+        "total": round(subtotal + impuesto, 2),
+    }
+
+
+class _ManejadorBackend(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/facturas/v1/batch/stream":
+            numeros = parse_qs(url.query).get("numeros", [])
+            cuerpo = "".join(json.dumps(factura_ejemplo(n)) + "\n" for n in numeros)
+            self._responder(cuerpo.encode(), "application/x-ndjson")
+            return
+        numero = url.path.rstrip("/").rsplit("/", 1)[-1]
+        if numero == "404":
+            self.send_error(404)
+            return
+        self._responder(
+            json.dumps(factura_ejemplo(numero)).encode(), "application/json"
+        )
+
+    def _responder(self, cuerpo, tipo):
+        self.send_response(200)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def servidor_backend_falso():
+    """Levanta un backend HTTP mínimo en un hilo y devuelve su URL base.
+
+    Responde FACTURA_EJEMPLO para cualquier `/facturas/v1/<numero>` (404
+    cuando el número es "404") y para cada número de
+    `/facturas/v1/batch/stream?numeros=...` en NDJSON.
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _ManejadorBackend)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+class AdaptadorASGI(BaseAdapter):
+    """Adaptador de requests que despacha las peticiones a una app ASGI.
+
+    Permite apuntar un ClienteBackend al backend FastAPI real dentro del mismo
+    proceso, sin red ni contenedores.
+    """
+
+    def __init__(self, app):
+        super().__init__()
+        from fastapi.testclient import TestClient
+
+        self.cliente = TestClient(app)
+
+    def send(self, request, stream=False, timeout=None, **kwargs):
+        url = urlsplit(request.url)
+        ruta = url.path + (f"?{url.query}" if url.query else "")
+        resp = self.cliente.request(
+            request.method, ruta, headers=dict(request.headers), content=request.body
+        )
+        respuesta = Response()
+        respuesta.status_code = resp.status_code
+        # httpx ya descomprimió el cuerpo
+        respuesta.headers = CaseInsensitiveDict(resp.headers)
+        respuesta.headers.pop("Content-Encoding", None)
+        respuesta.headers.pop("Content-Length", None)
+        respuesta.raw = io.BytesIO(resp.content)
+        respuesta.url = request.url
+        respuesta.request = request
+        respuesta.encoding = resp.encoding
+        return respuesta
+
+    def close(self):
+        self.cliente.close()
+
+
+def cliente_backend_en_proceso(app):
+    """ClienteBackend del frontend conectado en memoria a la app FastAPI."""
+    from cliente_backend import ClienteBackend
+
+    cliente = ClienteBackend("http://backend-en-proceso")
+    cliente.sesion.mount("http://backend-en-proceso", AdaptadorASGI(app))
+    return cliente
+
+
+def percentiles(valores, *ps):
+    """Percentiles por rango más cercano de una lista de valores."""
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    return [ordenados[min(n - 1, int(p / 100 * n))] for p in ps]